@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from ControllerH import ServoController
+
+# Standard moves used for the per-move and settle measurements, in degrees from the home position
+STANDARD_MOVES = {'small': 10.0, 'medium': 45.0, 'large': 90.0}
+HOME_ANGLE = 45.0
+
+# Cold start of the eye stack in a fresh interpreter: imports, construction, and the first
+# servo command once the control loop runs. Times are seconds since the script started.
+STARTUP_SCRIPT = '''
+import time
+start = time.perf_counter()
+import asyncio, contextlib, json, os
+from EyeControllerH import EyeDataController
+imported = time.perf_counter()
+
+async def main():
+    controller = EyeDataController(backend='simulated')
+    constructed = time.perf_counter()
+    controller.start()
+    servo_controller = controller.servo_controller
+    while servo_controller.first_write_time is None:
+        await asyncio.sleep(0.0005)
+    await controller.stop()
+    controller.close()
+    return constructed, servo_controller.first_write_time
+
+with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    constructed, first_write = asyncio.run(main())
+print(json.dumps({'import_s': imported - start, 'construct_s': constructed - start,
+                  'first_command_s': first_write - start}))
+'''
+
+
+def distribution(values):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {}
+    return {
+        'count': int(values.size),
+        'min': float(values.min()),
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def make_boards(args):
+    # Spread the channels over args.boards PCA9685s, each on its own bus
+    per_board = np.array_split(np.arange(args.channels), args.boards)
+    return [{'address': 0x40, 'bus': bus, 'channels': len(channels)} for bus, channels in enumerate(per_board)]
+
+
+def make_controller(args):
+    controller = ServoController(rate_hz=args.rate, backend='simulated', boards=make_boards(args))
+    controller.open()
+    for pca in controller.pcas:
+        pca.i2c_device.clock_hz = args.bus_clock
+        pca.i2c_device.realtime = args.realtime_bus
+    for servo_index in range(args.channels):
+        controller.set_angle_limits(servo_index, 0, 180)
+        controller.set_smoothing_factor(servo_index, args.smoothing)
+        if args.max_velocity:
+            controller.set_motion_limits(servo_index, args.max_velocity, args.max_acceleration, args.profile)
+    return controller
+
+
+def settle(controller, limit=100000):
+    # Step without sleeping until every channel is on target; returns the number of ticks
+    ticks = 1
+    while controller.step() and ticks < limit:
+        ticks += 1
+    return ticks
+
+
+def home(controller):
+    for servo_index in range(controller.num_channels):
+        controller.set_absolute_angle(servo_index, HOME_ANGLE)
+    settle(controller)
+
+
+def bench_tick_rate(args):
+    # Raw control-loop throughput: all channels kept moving, no pacing
+    controller = make_controller(args)
+    rng = np.random.default_rng(0)
+    targets = rng.uniform(0, 180, size=(args.ticks // 20 + 1, args.channels))
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for tick in range(args.ticks):
+        if tick % 20 == 0:
+            for servo_index, angle in enumerate(targets[tick // 20]):
+                controller.set_absolute_angle(servo_index, angle)
+        controller.step()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        'ticks': args.ticks,
+        'ticks_per_second': args.ticks / wall,
+        'cpu_time_per_tick_us': cpu / args.ticks * 1e6,
+        'wall_time_per_tick_us': wall / args.ticks * 1e6,
+    }
+
+
+def bench_moves(args):
+    # Bus cost and tick count of each standard move, all channels moving together
+    controller = make_controller(args)
+    devices = [pca.i2c_device for pca in controller.pcas]
+    results = {}
+    for name, distance in STANDARD_MOVES.items():
+        home(controller)
+        controller.writer.stats.reset()
+        writes_before = [len(device.writes) for device in devices]
+        bus_time_before = [device.bus_time for device in devices]
+        for servo_index in range(args.channels):
+            controller.set_absolute_angle(servo_index, HOME_ANGLE + distance)
+        ticks = settle(controller)
+        writes = [write for device, before in zip(devices, writes_before) for write in device.writes[before:]]
+        payload = sum(len(payload) for _, _, payload in writes)
+        # Buses run in parallel, so the slowest one bounds the bus time of the move
+        bus_time = max(device.bus_time - before for device, before in zip(devices, bus_time_before))
+        stats = controller.writer.stats.as_dict()
+        results[name] = {
+            'distance_deg': distance,
+            'ticks': ticks,
+            'settle_time_s': ticks * controller.scheduler.period,
+            'transactions': stats['transactions'],
+            'bytes': stats['bytes'],
+            'transactions_saved': stats['transactions_saved'],
+            'bytes_saved': stats['bytes_saved'],
+            'recorded_writes': len(writes),
+            'recorded_payload_bytes': payload,
+            'bus_time_s': bus_time,
+        }
+    return results
+
+
+async def bench_latency(args):
+    # Time from a target write to the first register write it causes, and wall-clock settle
+    # time, measured on the persistent control loop at its configured rate
+    controller = make_controller(args)
+    device = controller.pca.i2c_device
+    home(controller)
+    controller.start()
+    latencies = []
+    settle_times = {name: [] for name in STANDARD_MOVES}
+    for repeat in range(args.repeats):
+        for name, distance in STANDARD_MOVES.items():
+            await controller.wait_idle()
+            await asyncio.sleep(controller.scheduler.period * 1.5)
+            writes_before = len(device.writes)
+            angle = HOME_ANGLE + distance
+            start = time.perf_counter()
+            # Alternate between the absolute and fractional target APIs
+            if repeat % 2 == 0:
+                controller.set_absolute_angle(0, angle)
+            else:
+                controller.set_fractional_angle(0, angle / 180)
+            await controller.wait_idle()
+            settle_times[name].append(time.perf_counter() - start)
+            if len(device.writes) > writes_before:
+                latencies.append(device.writes[writes_before][0] - start)
+            # Return to home before the next move
+            controller.set_absolute_angle(0, HOME_ANGLE)
+    await controller.stop()
+    return {
+        'target_to_first_write_s': distribution(latencies),
+        'settle_time_s': {name: distribution(times) for name, times in settle_times.items()},
+        'tick_stats': controller.get_tick_stats(),
+    }
+
+
+def bench_startup(args):
+    # Each run is a new process, so module imports are measured cold (apart from the OS page
+    # cache); process_s also includes interpreter startup and shutdown
+    runs = {'import_s': [], 'construct_s': [], 'first_command_s': [], 'process_s': []}
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(args.startup_runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=directory, check=True,
+                                capture_output=True, text=True).stdout
+        runs['process_s'].append(time.perf_counter() - start)
+        for name, value in json.loads(output.splitlines()[-1]).items():
+            runs[name].append(value)
+    return {name: distribution(values) for name, values in runs.items()}
+
+
+def run_benchmarks(args):
+    # Keep controller status prints off the JSON output
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        tick_rate = bench_tick_rate(args)
+        moves = bench_moves(args)
+        latency = asyncio.run(bench_latency(args))
+        startup = bench_startup(args) if args.startup_runs else {}
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'config': vars(args),
+        },
+        'tick_rate': tick_rate,
+        'moves': moves,
+        'latency': latency,
+        'startup': startup,
+    }
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Servo control stack benchmarks (simulated PCA9685)")
+    parser.add_argument("--channels", type=int, default=8, help="Number of servo channels")
+    parser.add_argument("--rate", type=float, default=100, help="Control loop rate in Hz")
+    parser.add_argument("--ticks", type=int, default=5000, help="Ticks for the throughput benchmark")
+    parser.add_argument("--repeats", type=int, default=10, help="Repeats per move for the latency benchmark")
+    parser.add_argument("--smoothing", type=float, default=0.1, help="Smoothing factor for all channels")
+    parser.add_argument("--max-velocity", type=float, default=0, help="Use planned trajectories with this max velocity (deg/s)")
+    parser.add_argument("--max-acceleration", type=float, default=720, help="Max acceleration for planned trajectories (deg/s^2)")
+    parser.add_argument("--profile", default="trapezoidal", choices=["trapezoidal", "minimum_jerk"], help="Trajectory profile")
+    parser.add_argument("--boards", type=int, default=1, help="Spread the channels over this many PCA9685s, one bus each")
+    parser.add_argument("--bus-clock", type=int, default=400000, help="Simulated I2C clock in Hz")
+    parser.add_argument("--realtime-bus", action="store_true", help="Block for the modelled transfer time of each write")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Cold-start runs for the startup benchmark (0 to skip)")
+    parser.add_argument("--output", "-o", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    results = run_benchmarks(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,150 @@
+import asyncio
+import numpy as np
+
+# Lid closure curves: 0 is the lid at its base position, 1 fully closed.
+# (close seconds, hold seconds, open seconds, depth) per stroke; strokes are separated by gaps.
+BLINK_SHAPES = {
+    'blink': [(0.07, 0.03, 0.15, 1.0)],
+    'slow_blink': [(0.15, 0.10, 0.35, 1.0)],
+    'half_blink': [(0.06, 0.02, 0.12, 0.5)],
+    'double_blink': [(0.07, 0.02, 0.12, 1.0), (0.07, 0.03, 0.15, 1.0)],
+}
+DOUBLE_BLINK_GAP = 0.08
+# Weights for the blink picked by the automatic schedule
+AUTO_BLINK_CHOICES = {'blink': 0.85, 'double_blink': 0.1, 'slow_blink': 0.05}
+
+
+def ease_steps(duration, dt):
+    steps = max(1, int(round(duration / dt)))
+    return np.arange(1, steps + 1) / steps
+
+
+def blink_stroke(close, hold, open_, depth, dt):
+    # Eased close (fast at the end, like a real lid) and a slower eased opening
+    closing = 1 - np.cos(ease_steps(close, dt) * np.pi / 2)
+    holding = np.ones(int(round(hold / dt)))
+    opening = np.cos(ease_steps(open_, dt) * np.pi / 2) ** 2
+    return depth * np.concatenate([closing, holding, opening])
+
+
+def build_waveforms(dt):
+    waveforms = {}
+    gap = np.zeros(int(round(DOUBLE_BLINK_GAP / dt)))
+    for name, strokes in BLINK_SHAPES.items():
+        parts = []
+        for i, stroke in enumerate(strokes):
+            if i:
+                parts.append(gap)
+            parts.append(blink_stroke(*stroke, dt))
+        waveforms[name] = np.concatenate(parts)
+    return waveforms
+
+
+class BlinkPlayer:
+    # Plays cached lid waveforms as a ServoController mixer, so a blink is sampled inside the
+    # same control tick as gaze and neck motion instead of being planned or scheduled
+    # separately. The lid channels keep their own targets (eye_open); the blink pulls them
+    # towards the closed fraction by the waveform value. The waveforms are sampled at the
+    # servo tick period and resampled when the tick rate changes.
+    def __init__(self, servo_controller, lid_channels, closed_fraction=0.0, auto_blink=True,
+                 interval=(2.0, 6.0), poll_rate=30.0, seed=None):
+        self.servo_controller = servo_controller
+        self.lid_channels = np.asarray(lid_channels, dtype=np.int64)
+        self.closed_fraction = closed_fraction
+        self.auto_blink = auto_blink
+        self.interval = interval
+        self.poll_period = 1.0 / poll_rate
+        self.rng = np.random.default_rng(seed)
+        self.period = servo_controller.scheduler.period
+        self.waveforms = build_waveforms(self.period)
+        self.auto_names = list(AUTO_BLINK_CHOICES)
+        self.auto_weights = np.array([AUTO_BLINK_CHOICES[name] for name in self.auto_names])
+        self.auto_weights /= self.auto_weights.sum()
+        self.waveform = None
+        self.playing = None
+        self.position = 0
+        self.pending = None
+        self.loop_task = None
+        self.running = False
+        servo_controller.add_mixer(self)
+
+    def trigger(self, name='blink'):
+        # Call from the event loop thread; a blink already playing is not interrupted
+        if name not in self.waveforms:
+            raise ValueError(f"Unknown blink waveform: {name}")
+        self.pending = name
+        self.servo_controller.wake()
+
+    def is_blinking(self):
+        return self.waveform is not None
+
+    def set_period(self, period):
+        # Resample the waveforms for a new tick period; a blink in progress carries on from the
+        # same time into it
+        elapsed = self.position * self.period
+        self.period = period
+        self.waveforms = build_waveforms(period)
+        if self.waveform is not None:
+            self.waveform = self.waveforms[self.playing]
+            self.position = min(int(round(elapsed / period)), self.waveform.size - 1)
+
+    def mix(self, controller, offsets):
+        if controller.scheduler.period != self.period:
+            self.set_period(controller.scheduler.period)
+        if self.waveform is None and self.pending is not None:
+            self.waveform = self.waveforms[self.pending]
+            self.playing = self.pending
+            self.position = 0
+        self.pending = None
+        if self.waveform is None:
+            return False
+        value = self.waveform[self.position]
+        self.position += 1
+        channels = self.lid_channels
+        min_angles, max_angles = controller.min_angles[channels], controller.max_angles[channels]
+        closed = min_angles + (max_angles - min_angles) * self.closed_fraction
+        offsets[channels] = value * (closed - controller.current_angles[channels])
+        if self.position >= self.waveform.size:
+            self.waveform = None
+            # Leave the offsets at zero on the last sample so the lids land on their base angle
+            offsets[channels] = 0.0
+            return False
+        return True
+
+    def next_interval(self):
+        return self.rng.uniform(*self.interval)
+
+    async def run(self, eye_data=None):
+        # Fires the automatic schedule and, with an eye data slot, blinks on each rising
+        # edge of its 'blink' field
+        blink_field = None if eye_data is None else eye_data.index.get('blink')
+        sample = None if eye_data is None else np.empty(len(eye_data.fields))
+        version = -1
+        blink_was_set = False
+        next_blink = asyncio.get_running_loop().time() + self.next_interval()
+        while self.running:
+            now = asyncio.get_running_loop().time()
+            if self.auto_blink and now >= next_blink:
+                self.trigger(str(self.rng.choice(self.auto_names, p=self.auto_weights)))
+                next_blink = now + self.next_interval()
+            if blink_field is not None:
+                version, sample, _, is_new = eye_data.read(version, sample)
+                if is_new:
+                    blink_set = sample[blink_field] >= 0.5
+                    if blink_set and not blink_was_set:
+                        self.trigger()
+                    blink_was_set = blink_set
+            await asyncio.sleep(self.poll_period)
+
+    def start(self, eye_data=None):
+        if self.loop_task is None or self.loop_task.done():
+            self.running = True
+            self.loop_task = asyncio.get_running_loop().create_task(self.run(eye_data))
+        return self.loop_task
+
+    async def stop(self):
+        if self.loop_task is None:
+            return
+        self.running = False
+        await self.loop_task
+        self.loop_task = None
@@ -0,0 +1,108 @@
+import json
+import numpy as np
+
+MAX_COUNT = 2 ** 16 - 1
+# The PCA9685 has 12-bit on/off registers (4096 ticks per period); a 16-bit duty_cycle count
+# is written as count >> 4, and MAX_COUNT itself means FULL_ON, a constant-high output
+COUNTS_PER_TICK = 16
+
+
+def pulse_width_to_count(pulse_width_us, frequency=50):
+    # duty_cycle counts are a 16-bit fraction of the PWM period
+    period_us = 1e6 / frequency
+    return np.asarray(pulse_width_us, dtype=float) / period_us * MAX_COUNT
+
+
+class ServoCalibration:
+    def __init__(self, num_channels=8, frequency=50):
+        self.num_channels = num_channels
+        self.frequency = frequency
+        self.min_angles = np.zeros(num_channels)
+        self.max_angles = np.full(num_channels, 180.0)
+        # Closed-form default: count = offset + slope * angle (the old angle / 180 * 65535 table)
+        self.slopes = np.full(num_channels, MAX_COUNT / 180)
+        self.offsets = np.zeros(num_channels)
+        # Measured (angles, counts) breakpoints per channel, None for channels on the closed form
+        self.points = [None] * num_channels
+        # Counts at each channel's limits, recomputed lazily for channels marked dirty
+        self.min_counts = np.zeros(num_channels)
+        self.max_counts = np.zeros(num_channels)
+        self.dirty = np.ones(num_channels, dtype=bool)
+
+    def set_limits(self, channel, min_angle=None, max_angle=None):
+        # Raises ValueError, leaving the limits as they were, if they map outside the pulse range
+        self.limit_counts(channel, self.min_angles[channel] if min_angle is None else min_angle,
+                          self.max_angles[channel] if max_angle is None else max_angle)
+        if min_angle is not None:
+            self.min_angles[channel] = min_angle
+        if max_angle is not None:
+            self.max_angles[channel] = max_angle
+        self.dirty[channel] = True
+
+    def set_linear(self, channel, slope, offset=0.0):
+        self.slopes[channel] = slope
+        self.offsets[channel] = offset
+        self.points[channel] = None
+        self.dirty[channel] = True
+
+    def set_ticks(self, channel):
+        # Positions on this channel are PCA9685 12-bit ticks (0..4095 per period), the unit the
+        # servo_N_min/max config limits are written in
+        self.set_linear(channel, COUNTS_PER_TICK)
+
+    def set_points(self, channel, angles, counts):
+        angles = np.asarray(angles, dtype=float)
+        counts = np.asarray(counts, dtype=float)
+        if angles.shape != counts.shape or angles.size < 2:
+            raise ValueError(f"Channel {channel} needs at least two matching calibration points")
+        order = np.argsort(angles)
+        self.points[channel] = (angles[order], counts[order])
+        self.dirty[channel] = True
+
+    def set_pulse_widths(self, channel, angles, pulse_widths_us):
+        self.set_points(channel, angles, pulse_width_to_count(pulse_widths_us, self.frequency))
+
+    def load_file(self, path):
+        # {"<channel>": [[angle, pulse_width_us], ...], ...}
+        with open(path) as f:
+            data = json.load(f)
+        for channel, pairs in data.items():
+            angles, pulse_widths = zip(*pairs)
+            self.set_pulse_widths(int(channel), angles, pulse_widths)
+
+    def limit_counts(self, channel, min_angle, max_angle):
+        # Counts at the given limits on the channel's current map; both must fit the 16-bit
+        # duty_cycle range, since to_counts clamps every position to them
+        counts = self.channel_counts(channel, np.array([min_angle, max_angle], dtype=float))
+        if counts.min() < 0 or counts.max() > MAX_COUNT:
+            raise ValueError(f"Channel {channel} limits {min_angle}..{max_angle} map to counts "
+                             f"{counts[0]:.0f}..{counts[1]:.0f}, outside the pulse range 0..{MAX_COUNT}")
+        return counts
+
+    def refresh(self):
+        # Raises ValueError if a channel's map moved its limits out of the pulse range
+        for channel in np.flatnonzero(self.dirty):
+            self.min_counts[channel], self.max_counts[channel] = self.limit_counts(
+                channel, self.min_angles[channel], self.max_angles[channel])
+            self.dirty[channel] = False
+
+    def channel_counts(self, channel, angles):
+        if self.points[channel] is None:
+            return self.offsets[channel] + self.slopes[channel] * angles
+        point_angles, point_counts = self.points[channel]
+        return np.interp(angles, point_angles, point_counts)
+
+    def to_counts(self, angles, channels=None):
+        # Map (possibly fractional) angles to integer duty_cycle counts in one vectorized pass
+        if self.dirty.any():
+            self.refresh()
+        channels = np.arange(self.num_channels) if channels is None else np.asarray(channels, dtype=np.int64)
+        angles = np.clip(np.asarray(angles, dtype=float), self.min_angles[channels], self.max_angles[channels])
+        counts = self.offsets[channels] + self.slopes[channels] * angles
+        for i, channel in enumerate(channels):
+            if self.points[channel] is not None:
+                counts[i] = self.channel_counts(channel, angles[i])
+        low = np.minimum(self.min_counts[channels], self.max_counts[channels])
+        high = np.maximum(self.min_counts[channels], self.max_counts[channels])
+        # The limit counts are checked to be in the pulse range, so this keeps every count in it
+        return np.round(np.clip(counts, low, high)).astype(np.int64)
@@ -0,0 +1,117 @@
+import threading
+import time
+from HistogramH import LatencyHistogram
+
+
+class CallbackStats:
+    # Counters a GStreamer probe bumps once per buffer. They are plain attributes written only
+    # by one streaming thread (one CallbackStats per source); StatsReporter reads them from its
+    # own thread and does all the formatting, so the probe's per-buffer cost is a few
+    # increments and one histogram record.
+    def __init__(self):
+        self.frames = 0
+        self.detections = 0
+        self.persons = 0
+        self.frames_with_person = 0
+        # Time spent inside the probe per buffer
+        self.probe_time = LatencyHistogram()
+        # Capture to probe, for live sources whose PTS is the capture time
+        self.pipeline_latency = LatencyHistogram()
+
+    def snapshot(self):
+        return (time.perf_counter(), self.frames, self.detections, self.persons, self.frames_with_person,
+                (self.frames,))
+
+
+class AggregateCallbackStats:
+    # Read-only totals over one CallbackStats per source, each written by its own streaming
+    # thread, with the same attributes and snapshot(). Sums are taken when read, so the
+    # writers never share a counter.
+    def __init__(self, stats):
+        self.stats = stats
+
+    @property
+    def frames(self):
+        return sum(stats.frames for stats in self.stats)
+
+    @property
+    def detections(self):
+        return sum(stats.detections for stats in self.stats)
+
+    @property
+    def persons(self):
+        return sum(stats.persons for stats in self.stats)
+
+    @property
+    def frames_with_person(self):
+        return sum(stats.frames_with_person for stats in self.stats)
+
+    @property
+    def stream_frames(self):
+        # Frames per source, indexed by source id
+        return [stats.frames for stats in self.stats]
+
+    @property
+    def probe_time(self):
+        histogram = LatencyHistogram()
+        for stats in self.stats:
+            histogram.merge(stats.probe_time)
+        return histogram
+
+    @property
+    def pipeline_latency(self):
+        histogram = LatencyHistogram()
+        for stats in self.stats:
+            histogram.merge(stats.pipeline_latency)
+        return histogram
+
+    def snapshot(self):
+        snapshots = [stats.snapshot() for stats in self.stats]
+        totals = [sum(snapshot[i] for snapshot in snapshots) for i in range(1, 5)]
+        return (time.perf_counter(), *totals, tuple(snapshot[1] for snapshot in snapshots))
+
+
+class StatsReporter:
+    # Background thread that logs one aggregated line per interval: FPS, detections per frame,
+    # the share of frames with a person, and the probe's own cost (since start)
+    def __init__(self, stats, interval=5.0, log=print):
+        self.stats = stats
+        self.interval = interval
+        self.log = log
+        self.previous = stats.snapshot()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.previous = self.stats.snapshot()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.report()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.report()
+
+    def report(self):
+        current = self.stats.snapshot()
+        elapsed = current[0] - self.previous[0]
+        frames, detections, persons, frames_with_person = (now - before for now, before in zip(current[1:5], self.previous[1:5]))
+        stream_frames = [now - before for now, before in zip(current[5], self.previous[5])]
+        self.previous = current
+        if frames == 0 or elapsed <= 0:
+            return
+        probe = self.stats.probe_time.summary()
+        self.log(f"FPS: {frames / elapsed:.1f}, detections/frame: {detections / frames:.2f}, "
+                 f"persons/frame: {persons / frames:.2f} (in {100.0 * frames_with_person / frames:.0f}% of frames), "
+                 f"probe: p50 {probe['p50'] * 1e6:.0f} us, p99 {probe['p99'] * 1e6:.0f} us, max {probe['max'] * 1e6:.0f} us")
+        if len(stream_frames) > 1:
+            self.log("FPS per source: " + ", ".join(f"{i}: {count / elapsed:.1f}" for i, count in enumerate(stream_frames)))
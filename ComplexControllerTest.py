@@ -1,12 +1,9 @@
 # test_servo_controller.py
 import asyncio
 from ControllerH import ServoController
-from board import SCL, SDA
-import busio
 
 async def test_servo_movement():
-    i2c = busio.I2C(SCL, SDA)
-    controller = ServoController(i2c)
+    controller = ServoController()
 
     print("Testing individual servo movement...")
     for servo_index in range(8):
@@ -68,16 +65,14 @@ async def test_servo_movement():
     print("Servo testing complete!")
 
 async def test_homing():
-    i2c = busio.I2C(SCL, SDA)
-    controller = ServoController(i2c)
+    controller = ServoController()
 
     print("Testing homing function...")
     await controller.homing()
     print("Homing test complete.")
 
 async def test_smoothing_factors():
-    i2c = busio.I2C(SCL, SDA)
-    controller = ServoController(i2c)
+    controller = ServoController()
 
     print("Testing different smoothing factors...")
     controller.set_smoothing_factor(0, 0.1)  # Slow and smooth movement for servo 0
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import tempfile
+
+
+def load_config(path):
+    # Flat JSON object of name -> number, same keys as EyeDataController.ConfigData
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: config must be a JSON object")
+    config = {}
+    for key, value in data.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{path}: {key} must be a number, got {value!r}")
+        config[key] = float(value)
+    return config
+
+
+def save_config(path, config):
+    # Write to a temporary file next to the target and rename it over, so readers (and the
+    # watcher) never see a half-written file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=4, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def diff_config(old, new):
+    # Keys whose value changed or that were added; removed keys keep their old value
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+class ConfigWatcher:
+    # Polls a config file's modification time and size and reports when it changed
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.signature = self.read_signature()
+        self.loop_task = None
+
+    def read_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def changed(self):
+        signature = self.read_signature()
+        if signature is None or signature == self.signature:
+            return False
+        self.signature = signature
+        return True
+
+    async def run(self, on_change):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                on_change()
+
+    def start(self, on_change):
+        if self.loop_task is None or self.loop_task.done():
+            self.loop_task = asyncio.get_running_loop().create_task(self.run(on_change))
+        return self.loop_task
+
+    async def stop(self):
+        if self.loop_task is None:
+            return
+        self.loop_task.cancel()
+        try:
+            await self.loop_task
+        except asyncio.CancelledError:
+            pass
+        self.loop_task = None
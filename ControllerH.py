@@ -1,39 +1,107 @@
 import asyncio
-from adafruit_pca9685 import PCA9685
-from board import SCL, SDA
-import busio
+import time
+import numpy as np
+from PCA9685BusH import ChannelMap, MultiBoardWriter
+from CalibrationH import ServoCalibration
+from SchedulerH import FixedRateScheduler
+from TrajectoryH import TrajectoryPlanner
+from ServoBackendH import create_i2c, create_pca
+from TelemetryH import TelemetryRecorder
+from HistogramH import LatencyHistogram
+
+# PWM frequency the boards are set to; servo pulses are 1-2 ms in a 20 ms period
+PWM_FREQUENCY = 50
 
 class ServoController:
-    def __init__(self, i2c):
-        self.pca = PCA9685(i2c)
-        self.pca.frequency = 50
-        self.min_angles = [0] * 8
-        self.max_angles = [180] * 8
-        self.servo_counts = []
-        self.current_angles = [0] * 8
-        self.target_angles = [0] * 8
-        self.smoothing_factors = [0.1] * 8  # Default smoothing factor of 0.1 for all servos
-        self.update_servo_counts()
-
-    def update_servo_counts(self):
-        self.servo_counts = []
-        for min_angle, max_angle in zip(self.min_angles, self.max_angles):
-            self.servo_counts.append(self.angle_to_count(min_angle, max_angle))
-
-    def angle_to_count(self, min_angle, max_angle):
-        counts = []
-        for angle in range(min_angle, max_angle + 1):
-            count = int((angle / 180) * (2 ** 16 - 1))
-            counts.append(count)
-        return counts
+    def __init__(self, i2c=None, num_channels=None, rate_hz=100, overrun_policy='skip', backend=None, boards=None):
+        # backend is 'hardware' or 'simulated'; defaults to $SERVO_BACKEND, then hardware.
+        # boards lists the PCA9685s to drive (see PCA9685BusH.ChannelMap); by default one board
+        # at 0x40 on the default bus, with num_channels (8 if not given) servos.
+        if boards is None:
+            boards = [{'channels': num_channels or 8}]
+        self.channel_map = ChannelMap(boards)
+        if num_channels is not None and num_channels != self.channel_map.num_channels:
+            raise ValueError(f"num_channels={num_channels} but the boards provide {self.channel_map.num_channels}")
+        num_channels = self.channel_map.num_channels
+
+        # The buses and boards are opened on the first write (see open()), so constructing a
+        # controller is cheap and needs no hardware until something moves
+        self.i2c = i2c
+        self.backend = backend
+        self.pcas = None
+        self.pca = None
+        self.writer = None
+        self.first_write_time = None
+        # Time from the frame behind a target update (source_time) to the first servo write of
+        # a channel it moved (source_channels)
+        self.source_time = None
+        self.source_channels = np.zeros(num_channels, dtype=bool)
+        self.frame_latency = LatencyHistogram()
+        # Every channel write lands in this ring; attach a TelemetryDrain to log or save it
+        self.telemetry = TelemetryRecorder()
+        # Optional MotionLogH.MotionRecorder fed with every target update and written count
+        self.recorder = None
+        self.num_channels = num_channels
+        # Per-channel motion state, advanced together once per tick
+        self.calibration = ServoCalibration(num_channels, PWM_FREQUENCY)
+        self.min_angles = self.calibration.min_angles
+        self.max_angles = self.calibration.max_angles
+        self.current_angles = np.zeros(num_channels)
+        self.target_angles = np.zeros(num_channels)
+        self.smoothing_factors = np.full(num_channels, 0.1)  # Default smoothing factor of 0.1 for all servos
+        self.scheduler = FixedRateScheduler(rate_hz, overrun_policy)
+        # Channels with motion limits follow planned profiles instead of exponential smoothing
+        self.planner = TrajectoryPlanner(num_channels)
+        # Additive layers mixed onto the written angles each tick (see add_mixer)
+        self.mixers = []
+        self.output_offsets = np.zeros(num_channels)
+        # Persistent control loop state (see start/stop/pause/resume)
+        self.loop_task = None
+        self.running = False
+        self.paused = False
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+
+    def open(self):
+        # Open the I2C buses and PCA9685s; called by the first write, or early to surface
+        # hardware errors at startup. The hardware modules are imported here too.
+        if self.writer is not None:
+            return
+        # One I2C object per bus, shared by the boards on it
+        buses = {}
+        pcas = []
+        for board in self.channel_map.boards:
+            if board['bus'] not in buses:
+                if self.i2c is not None and board['bus'] is None:
+                    buses[board['bus']] = self.i2c
+                else:
+                    buses[board['bus']] = create_i2c(board['bus'], self.backend)
+            pca = create_pca(buses[board['bus']], self.backend, board['address'])
+            pca.frequency = PWM_FREQUENCY
+            pcas.append(pca)
+        self.pcas = pcas
+        self.pca = pcas[0]
+        self.writer = MultiBoardWriter(pcas, self.channel_map)
+
+    def is_open(self):
+        return self.writer is not None
 
     def set_min_angle(self, servo_index, angle):
-        self.min_angles[servo_index] = angle
-        self.update_servo_counts()
+        self.calibration.set_limits(servo_index, min_angle=angle)
 
     def set_max_angle(self, servo_index, angle):
-        self.max_angles[servo_index] = angle
-        self.update_servo_counts()
+        self.calibration.set_limits(servo_index, max_angle=angle)
+
+    def set_angle_limits(self, servo_index, min_angle, max_angle):
+        self.calibration.set_limits(servo_index, min_angle, max_angle)
+
+    def set_tick_units(self, servo_index):
+        # Positions on this channel are PCA9685 ticks, see ServoCalibration.set_ticks
+        self.calibration.set_ticks(servo_index)
+
+    def load_calibration(self, path):
+        # Measured pulse widths per channel, see ServoCalibration.load_file
+        self.calibration.load_file(path)
 
     def set_absolute_angle(self, servo_index, angle):
         min_angle, max_angle = self.min_angles[servo_index], self.max_angles[servo_index]
@@ -42,45 +110,237 @@ class ServoController:
         elif angle > max_angle:
             angle = max_angle
         self.target_angles[servo_index] = angle
+        self.targets_changed()
 
     def set_fractional_angle(self, servo_index, fraction):
         min_angle, max_angle = self.min_angles[servo_index], self.max_angles[servo_index]
         angle = min_angle + (max_angle - min_angle) * fraction
-        angle = int(round(angle))
         self.target_angles[servo_index] = angle
+        self.targets_changed()
+
+    def select_channels(self, channels=None, mask=None):
+        # Channel indices from an index list, a boolean mask over all channels, or all channels
+        if mask is not None:
+            return np.flatnonzero(np.asarray(mask, dtype=bool))
+        if channels is None:
+            return np.arange(self.num_channels)
+        return np.atleast_1d(np.asarray(channels, dtype=np.int64))
+
+    def set_targets(self, values, channels=None, mask=None, fractional=False, source_time=None):
+        # Bulk target update: values are angles (or fractions of each channel's range) for the
+        # selected channels, or a full-length array to pick them from; a scalar applies to all,
+        # and a shorter list with no channels or mask sets the first channels, as the
+        # per-channel setters always did. NaN leaves a channel's target unchanged. Everything
+        # is clamped and converted in one array step, and the new target array replaces the
+        # old one in a single assignment, so a tick never sees half of an update. source_time
+        # (time.perf_counter clock) is when the input behind the update was captured, for the
+        # frame_latency histogram; it is only kept if the update moved a target.
+        values = np.asarray(values, dtype=float)
+        if channels is None and mask is None and values.ndim == 1 and values.size < self.num_channels:
+            channels = np.arange(values.size)
+        indices = self.select_channels(channels, mask)
+        if values.ndim and values.size == self.num_channels and indices.size != self.num_channels:
+            values = values[indices]
+        values = np.broadcast_to(values, indices.shape)
+        valid = ~np.isnan(values)
+        indices, values = indices[valid], values[valid]
+        min_angles, max_angles = self.min_angles[indices], self.max_angles[indices]
+        if fractional:
+            values = min_angles + (max_angles - min_angles) * values
+        targets = self.target_angles.copy()
+        targets[indices] = np.clip(values, min_angles, max_angles)
+        if source_time is not None:
+            moved = indices[targets[indices] != self.target_angles[indices]]
+            self.source_channels[:] = False
+            self.source_channels[moved] = True
+            self.source_time = source_time if moved.size else None
+        self.target_angles = targets
+        self.targets_changed()
+
+    def targets_changed(self):
+        if self.recorder is not None:
+            self.recorder.record_targets(self.target_angles)
+        self.wake()
+
+    def set_absolute_angles(self, angles, channels=None, mask=None, source_time=None):
+        self.set_targets(angles, channels, mask, source_time=source_time)
+
+    def set_fractional_angles(self, fractions, channels=None, mask=None, source_time=None):
+        self.set_targets(fractions, channels, mask, fractional=True, source_time=source_time)
 
     def set_smoothing_factor(self, servo_index, smoothing_factor):
+        # Switches the channel back to exponential smoothing
         self.smoothing_factors[servo_index] = smoothing_factor
+        self.planner.disable(servo_index)
 
-    async def move_servo(self, servo_index, delay=0.01):
-        servo_count = self.servo_counts[servo_index]
-        min_angle, max_angle = self.min_angles[servo_index], self.max_angles[servo_index]
-        current_angle = self.current_angles[servo_index]
-        target_angle = self.target_angles[servo_index]
-        smoothing_factor = self.smoothing_factors[servo_index]
-
-        while abs(current_angle - target_angle) > 1:
-            current_angle += (target_angle - current_angle) * smoothing_factor
-            current_angle = int(round(current_angle))
-            count = servo_count[current_angle - min_angle]
-            self.pca.channels[servo_index].duty_cycle = count
-            print(f"Moving servo {servo_index} to angle {current_angle}")
-            self.current_angles[servo_index] = current_angle
-            await asyncio.sleep(delay)
-
-        # Set the servo to the final target angle
-        count = servo_count[target_angle - min_angle]
-        self.pca.channels[servo_index].duty_cycle = count
-        print(f"Moving servo {servo_index} to angle {target_angle}")
-        self.current_angles[servo_index] = target_angle
+    def set_motion_limits(self, servo_index, max_velocity, max_acceleration, profile='trapezoidal'):
+        # Velocity in degrees/s, acceleration in degrees/s^2; profile is 'trapezoidal' or 'minimum_jerk'
+        self.planner.configure(servo_index, max_velocity, max_acceleration, profile)
+        self.wake()
+
+    def step(self, channels=None):
+        # Advance every selected channel by one tick: planned channels play the next sample of
+        # their profile, the rest take one smoothing step. Returns True while any selected
+        # channel is still moving.
+        if channels is None:
+            active = np.ones(self.num_channels, dtype=bool)
+        else:
+            active = np.zeros(self.num_channels, dtype=bool)
+            active[channels] = True
+        planned = active & self.planner.enabled
+        smoothed = active & ~planned
+
+        # Bulk updates swap in a new target array; work from one snapshot for the whole tick
+        targets = self.target_angles
+        delta = targets - self.current_angles
+        moving = smoothed & (np.abs(delta) > 1)
+        # Channels within 1 degree snap to the final target angle
+        settling = smoothed & ~moving & (delta != 0)
+
+        new_angles = self.current_angles.copy()
+        new_angles[moving] = self.current_angles[moving] + delta[moving] * self.smoothing_factors[moving]
+        new_angles[settling] = targets[settling]
+        changed = moving | settling
+
+        # Profiles are computed once per retarget or tick rate change and then only sampled
+        replan = planned & ((targets != self.planner.goals) | self.planner.stale(self.scheduler.period))
+        for servo_index in np.flatnonzero(replan):
+            self.planner.plan(servo_index, self.current_angles[servo_index], targets[servo_index],
+                              self.scheduler.period)
+        playing, positions, remaining = self.planner.advance(planned)
+        new_angles[playing] = positions
+        changed[playing] = True
+        moving[playing[remaining]] = True
+
+        self.current_angles = new_angles
+        animating = False
+        if self.mixers:
+            previous = self.output_offsets.copy()
+            for mixer in self.mixers:
+                animating |= mixer.mix(self, self.output_offsets)
+            changed |= active & (self.output_offsets != previous)
+        self.write_channels(np.flatnonzero(changed))
+        return bool(moving.any()) or animating
+
+    def write_channels(self, channels):
+        # All changed channels go out in one auto-increment burst; unchanged counts are skipped
+        if channels.size == 0:
+            return
+        angles = self.current_angles[channels] + self.output_offsets[channels]
+        counts = self.calibration.to_counts(angles, channels)
+        if self.writer is None:
+            self.open()
+        self.writer.write(channels, counts)
+        now = time.perf_counter()
+        if self.first_write_time is None:
+            # Time to first servo command, for the startup benchmark
+            self.first_write_time = now
+        if self.source_time is not None and self.source_channels[channels].any():
+            self.frame_latency.record(now - self.source_time)
+            self.source_time = None
+        self.telemetry.record(channels, angles, counts)
+        if self.recorder is not None:
+            self.recorder.record_counts(channels, counts)
+
+    def set_recorder(self, recorder):
+        # Pass None to stop recording; the caller closes the recorder
+        if self.recorder is not None:
+            self.recorder.flush()
+        self.recorder = recorder
+
+    def add_mixer(self, mixer):
+        # mixer.mix(controller, offsets) runs inside every tick, writes angle offsets for its
+        # channels into offsets in place and returns True while it still needs ticks. Offsets
+        # are added to what is written, never to the motion state.
+        self.mixers.append(mixer)
+        self.wake()
+
+    def remove_mixer(self, mixer):
+        self.mixers.remove(mixer)
+
+    def get_bus_stats(self):
+        self.open()
+        return self.writer.stats.as_dict()
+
+    def close(self):
+        # Stop the per-bus writer threads
+        if self.writer is not None:
+            self.writer.close()
+
+    def set_tick_rate(self, rate_hz):
+        self.scheduler.set_rate(rate_hz)
+
+    def get_tick_stats(self):
+        return self.scheduler.stats.summary()
+
+    async def move_servo(self, servo_index):
+        self.scheduler.restart()
+        while self.step([servo_index]):
+            await self.scheduler.wait()
 
     async def run(self):
-        tasks = [self.move_servo(i) for i in range(8)]
-        await asyncio.gather(*tasks)
+        # One control loop for all channels: every tick advances and writes them in phase,
+        # paced on absolute deadlines by the scheduler
+        self.scheduler.restart()
+        while self.step():
+            await self.scheduler.wait()
+
+    def wake(self):
+        # New targets were written: let an idle control loop pick them up on its next tick
+        self.idle.clear()
+        self.wakeup.set()
+
+    async def control_loop(self):
+        # Long-lived loop: ticks while any channel is moving and sleeps on the wakeup event otherwise
+        self.scheduler.restart()
+        while self.running:
+            if self.paused or not self.step():
+                self.idle.set()
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                self.scheduler.restart()
+                continue
+            await self.scheduler.wait()
+        self.idle.set()
+
+    def start(self):
+        if self.loop_task is None or self.loop_task.done():
+            self.running = True
+            self.paused = False
+            self.idle.clear()
+            self.loop_task = asyncio.get_running_loop().create_task(self.control_loop())
+        return self.loop_task
+
+    async def stop(self):
+        if self.loop_task is None:
+            return
+        self.running = False
+        self.wakeup.set()
+        await self.loop_task
+        self.loop_task = None
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self.wake()
+
+    def is_running(self):
+        return self.loop_task is not None and not self.loop_task.done()
+
+    async def wait_idle(self):
+        # Wait until the control loop has settled every channel on its target
+        await self.idle.wait()
 
     async def homing(self):
         print("Homing all servos to 0.5 fractional angle...")
-        for servo_index in range(8):
+        for servo_index in range(self.num_channels):
             self.set_fractional_angle(servo_index, 0.5)
-        await self.run()
-        print("Homing complete.")
\ No newline at end of file
+        if self.is_running():
+            self.resume()
+            await self.wait_idle()
+        else:
+            await self.run()
+        print("Homing complete.")
+
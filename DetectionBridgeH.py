@@ -0,0 +1,116 @@
+import threading
+import time
+from GazeControllerH import EYE_DATA_CENTER
+
+# eyeData gaze targets span 0..EYE_DATA_SCALE over the frame, EYE_DATA_CENTER in the middle
+EYE_DATA_SCALE = 2 * EYE_DATA_CENTER
+
+
+class DetectionBridge:
+    # Streaming-thread stage from hailo detections to gaze targets. Picks the active person,
+    # converts the centre of its (normalized) bbox to eyeData coordinates and publishes one
+    # sample through EyeDataController.update_eye_data, stamped with the frame's time and
+    # carrying its buffer PTS and source id. Everything else (prediction, PIDs, servo writes)
+    # happens on the control loop, so the per-frame cost here is a scan over the detections.
+    # With several cameras, each calls process() from its own streaming thread; a lock keeps
+    # update_eye_data single-producer, and the active person is followed on the camera that
+    # found them until they are lost there, or that camera sends no frame for source_timeout
+    # seconds; then any camera may pick the next one.
+    # All cameras drive the same gaze axes. By default each is taken to see what the head
+    # sees, so a frame position maps straight to the gaze; source_maps gives a camera its own
+    # (scale_x, offset_x, scale_y, offset_y), mapping its normalized x, y to the gaze's
+    # normalized offset_x + scale_x * x, offset_y + scale_y * y (e.g. a camera covering the
+    # right half of the view: (0.5, 0.5, 1.0, 0.0)).
+    def __init__(self, eye_data_controller, label='person', min_confidence=0.3, hold_distance=0.15,
+                 max_missed=15, source_timeout=0.5, source_maps=None, clock=time.perf_counter):
+        self.eye_data_controller = eye_data_controller
+        self.label = label
+        self.min_confidence = min_confidence
+        # The active person keeps the gaze while a detection stays within hold_distance (in
+        # normalized frame units) of it; after max_missed frames without one it is dropped
+        self.hold_distance = hold_distance
+        self.max_missed = max_missed
+        self.source_timeout = source_timeout
+        self.source_maps = source_maps or {}
+        self.clock = clock
+        self.active = None
+        self.active_source = None
+        # When the active person's camera last delivered a frame (clock time)
+        self.active_seen = 0.0
+        # Bumped whenever the active person changes; published so the gaze predictor restarts
+        self.track = 0
+        self.lock = threading.Lock()
+        self.missed = 0
+        self.frames = 0
+        self.published = 0
+
+    def holds(self, candidate):
+        # True if candidate is close enough to the active person to be them
+        if self.active is None:
+            return False
+        ax, ay = self.active
+        return (candidate[0] - ax) ** 2 + (candidate[1] - ay) ** 2 <= self.hold_distance ** 2
+
+    def select(self, candidates):
+        # candidates: (x, y, area, confidence) per detection. Stay on the active person if
+        # they are still there, otherwise take the biggest confident one (the closest person).
+        if self.active is not None:
+            ax, ay = self.active
+            nearest = min(candidates, key=lambda c: (c[0] - ax) ** 2 + (c[1] - ay) ** 2)
+            if self.holds(nearest):
+                return nearest
+        return max(candidates, key=lambda c: c[2] * c[3])
+
+    def process(self, detections, pts=None, timestamp=None, source_id=0):
+        # Call from the streaming thread once per frame. timestamp is the frame's capture time
+        # on the time.perf_counter clock (arrival time if not given). Returns the published
+        # (x, y) target, or None when no person was found; then nothing is published and the
+        # gaze predictor coasts on the last target.
+        if timestamp is None:
+            timestamp = self.clock()
+        with self.lock:
+            return self.process_locked(detections, pts, timestamp, source_id)
+
+    def process_locked(self, detections, pts, timestamp, source_id):
+        self.frames += 1
+        now = self.clock()
+        if self.active is not None and source_id != self.active_source:
+            if now - self.active_seen <= self.source_timeout:
+                # Another camera has the active person
+                return None
+            # That camera stopped delivering frames; let this one pick a person
+            self.active = None
+        if source_id == self.active_source:
+            self.active_seen = now
+        candidates = []
+        for detection in detections:
+            if detection.get_label() != self.label:
+                continue
+            confidence = detection.get_confidence()
+            if confidence < self.min_confidence:
+                continue
+            bbox = detection.get_bbox()
+            width, height = bbox.width(), bbox.height()
+            candidates.append((bbox.xmin() + width / 2, bbox.ymin() + height / 2, width * height, confidence))
+        if not candidates:
+            self.missed += 1
+            if self.missed > self.max_missed:
+                self.active = None
+            return None
+        self.missed = 0
+        selected = self.select(candidates)
+        if not self.holds(selected):
+            self.track += 1
+        x, y = selected[:2]
+        self.active = (x, y)
+        self.active_source = source_id
+        self.active_seen = now
+        scale_x, offset_x, scale_y, offset_y = self.source_maps.get(source_id, (1.0, 0.0, 1.0, 0.0))
+        target_x = (offset_x + scale_x * x) * EYE_DATA_SCALE
+        target_y = (offset_y + scale_y * y) * EYE_DATA_SCALE
+        self.eye_data_controller.update_eye_data(timestamp, cam_x=target_x, cam_y=target_y,
+                                                 eye_x=target_x, eye_y=target_y,
+                                                 pts=-1.0 if pts is None else float(pts), source=float(source_id),
+                                                 track=float(self.track))
+        self.published += 1
+        return target_x, target_y
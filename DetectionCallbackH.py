@@ -0,0 +1,188 @@
+import time
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+import numpy as np
+from CallbackStatsH import AggregateCallbackStats, CallbackStats
+from FrameRingH import FrameReader, FrameRing
+
+# Try to import hailo python module
+try:
+    import hailo
+except ImportError:
+    exit("Failed to import hailo python module. Make sure you are in hailo virtual environment.")
+
+# The detection callback and its state, shared by the Gtk app (TestGstreamerApp.py) and the
+# headless runner (HeadlessApp.py). Nothing here needs a display.
+
+# -----------------------------------------------------------------------------------------------
+# User defined class to be used in the callback function
+# -----------------------------------------------------------------------------------------------
+# a sample class to be used in the callback function alowwing to count the number of frames
+class app_callback_class:
+    def __init__(self, streams=1):
+        # Number of sources (cameras); with more than one, each stream's frames reach
+        # app_callback from its own probe and streaming thread, tagged with its source id
+        self.set_streams(streams)
+        # Caps of the probed pad, updated from CAPS events (see caps_event_probe)
+        self.format = None
+        self.width = 0
+        self.height = 0
+        self.use_frame = False
+        # Frames go through a shared memory ring (see open_frame_ring); other processes can
+        # read it too with FrameRing.attach()
+        self.frame_ring = None
+        self.frame_reader = None
+        self.frames_skipped = 0
+        self.running = True
+        # Detection to gaze bridge, and what capture_time() needs to date frames
+        self.bridge = None
+        self.pipeline = None
+        self.live_source = False
+        # Launch time of the app, for the time-to-first-frame report
+        self.start_time = time.perf_counter()
+
+    def set_streams(self, streams):
+        # Before the pipeline starts; resets the counters. Per-buffer counters and probe timing,
+        # one CallbackStats per source so each streaming thread writes only its own; stats
+        # reads the totals for reporting off the streaming threads.
+        self.streams = streams
+        self.stream_stats = [CallbackStats() for _ in range(streams)]
+        self.stats = AggregateCallbackStats(self.stream_stats)
+
+    def increment(self):
+        self.stream_stats[0].frames += 1
+
+    def get_count(self):
+        return self.stats.frames
+
+    def set_caps(self, caps):
+        structure = caps.get_structure(0) if caps else None
+        if structure:
+            self.format = structure.get_value('format')
+            self.width = structure.get_value('width')
+            self.height = structure.get_value('height')
+
+    def open_frame_ring(self, shape):
+        self.frame_ring = FrameRing(shape)
+        print(f"Frames are in shared memory {self.frame_ring.name}; attach with FrameRing.attach(name)")
+        # The display wants BGR; the reader swaps channels while copying the frame out
+        self.frame_reader = FrameReader(self.frame_ring, convert='swap')
+
+    def close_frame_ring(self):
+        # Only once every in-process reader has stopped; readers in other processes keep
+        # their own mapping
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+            self.frame_reader = None
+
+    def set_frame(self, buffer):
+        # Copy the mapped GstBuffer straight into the next ring slot; never blocks
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            return
+        try:
+            data = np.frombuffer(map_info.data, dtype=np.uint8)
+            if (self.height, self.width) != self.frame_ring.shape[:2] or data.size < self.frame_ring.frame_size:
+                # Caps do not match the ring's frame shape
+                self.frames_skipped += 1
+                return
+            self.frame_ring.write(data[:self.frame_ring.frame_size].reshape(self.frame_ring.shape), buffer.pts)
+        finally:
+            buffer.unmap(map_info)
+
+    def get_frame(self):
+        # Newest frame not shown yet (BGR), or None
+        if self.frame_reader is None:
+            return None
+        frame = self.frame_reader.read()
+        return None if frame is None else frame[0]
+
+# -----------------------------------------------------------------------------------------------
+# User defined callback function
+# -----------------------------------------------------------------------------------------------
+
+def capture_time(buffer, arrival, user_data):
+    # For live sources the PTS is the capture running time, so the time the frame spent
+    # upstream of the callback is the pipeline's running time now minus the PTS. Files have no
+    # capture time; use the arrival time.
+    pipeline = user_data.pipeline
+    if not user_data.live_source or pipeline is None or buffer.pts == Gst.CLOCK_TIME_NONE:
+        return arrival
+    clock = pipeline.get_clock()
+    if clock is None:
+        return arrival
+    upstream = clock.get_time() - pipeline.get_base_time() - buffer.pts
+    return arrival - max(upstream, 0) / Gst.SECOND
+
+def stream_callback(source_id):
+    # app_callback for the probe of one stream's identity_callback_<source_id>
+    def callback(pad, info, user_data):
+        return app_callback(pad, info, user_data, source_id)
+    return callback
+
+def attach_callbacks(pipeline, user_data, names):
+    # Probe every identity element in names (see PipelineH.callback_names), one per stream in
+    # source id order. All streams share the network caps, so the first pad gives the caps.
+    for source_id, name in enumerate(names):
+        pad = pipeline.get_by_name(name).get_static_pad("src")
+        if source_id == 0:
+            user_data.set_caps(pad.get_current_caps())
+            pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, caps_event_probe, user_data)
+        pad.add_probe(Gst.PadProbeType.BUFFER, app_callback if len(names) == 1 else stream_callback(source_id), user_data)
+
+def caps_event_probe(pad, info, user_data):
+    # Keep the cached caps current, so app_callback never queries them per buffer
+    event = info.get_event()
+    if event.type == Gst.EventType.CAPS:
+        user_data.set_caps(event.parse_caps())
+    return Gst.PadProbeReturn.OK
+
+# This is the callback function that will be called when data is available from the pipeline.
+# It runs on the streaming thread, so it only counts, copies and hands off: formatting and
+# printing are done by the StatsReporter thread. source_id says which camera the frame is from.
+
+def app_callback(pad, info, user_data, source_id=0):
+    arrival = time.perf_counter()
+    # Get the GstBuffer from the probe info
+    buffer = info.get_buffer()
+    # Check if the buffer is valid
+    if buffer is None:
+        return Gst.PadProbeReturn.OK
+
+    stats = user_data.stream_stats[source_id]
+    stats.frames += 1
+    if stats.frames == 1:
+        print(f"Startup: first frame from source {source_id} {arrival - user_data.start_time:.3f} s after launch")
+
+    # If the user_data.use_frame is set to True, copy the video frame into the frame ring;
+    # colour conversion is left to whoever reads it. The ring holds the first camera's frames.
+    if user_data.use_frame and source_id == 0:
+        user_data.set_frame(buffer)
+    
+    # get the detections from the buffer
+    roi = hailo.get_roi_from_buffer(buffer)
+    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
+
+    # Hand the active person to the gaze loop, stamped with the frame's PTS and capture time
+    capture = capture_time(buffer, arrival, user_data)
+    if capture != arrival:
+        stats.pipeline_latency.record(arrival - capture)
+    if user_data.bridge is not None:
+        user_data.bridge.process(detections, buffer.pts, capture, source_id)
+    
+    # count the detections
+    persons = 0
+    for detection in detections:
+        if detection.get_label() == "person":
+            persons += 1
+    stats.detections += len(detections)
+    stats.persons += persons
+    if persons:
+        stats.frames_with_person += 1
+
+    stats.probe_time.record(time.perf_counter() - arrival)
+    return Gst.PadProbeReturn.OK
+    # Additional option is Gst.PadProbeReturn.DROP to drop the buffer not passing in to the rest of the pipeline
+    # See more options in Gstreamer documentation
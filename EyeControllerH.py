@@ -1,10 +1,15 @@
-from servo_controller import ServoController
-import asyncio
-import busio
-from board import SCL, SDA
+import os
+import re
+from ControllerH import ServoController
+from ConfigH import ConfigWatcher, diff_config, load_config, save_config
+from GazeControllerH import AXES, GazeController
+from LatestValueH import LatestValue
+from BlinkH import BlinkPlayer
+from MotionLogH import MotionRecorder
+import numpy as np
 
 class EyeDataController:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, backend=None, boards=None, config_path=None):
         self.eyeData = {
             'cam_x': 512.0,
             'cam_y': 512.0,
@@ -12,6 +17,13 @@ class EyeDataController:
             'eye_y': 512.0,
             'blink': 0.0,
             'mouth': 0.0,
+            # Buffer PTS (ns) of the frame the gaze targets came from, -1 if not from a frame
+            'pts': -1.0,
+            # Source id (camera index) of that frame, -1 if not from a frame
+            'source': -1.0,
+            # Id of the tracked person; a new value means a different target, and the gaze
+            # predictor restarts from it instead of reading the jump as motion
+            'track': 0.0,
         }
         self.ConfigData = {
             'auto_blink': 1.0,
@@ -28,6 +40,22 @@ class EyeDataController:
             'eye_y_i': 0.0,
             'eye_y_d': 0.0,
             'eye_open': 0.5,
+            'gaze_rate': 30.0,
+            'cam_x_servo': 6.0,
+            'cam_y_servo': 7.0,
+            'eye_x_servo': 0.0,
+            'eye_y_servo': 1.0,
+            'lid_0_servo': 4.0,
+            'lid_1_servo': 5.0,
+            'lid_closed': 0.0,
+            # Gaze target prediction (see PredictorH); predict_lead is the servo lag in seconds
+            'predict': 1.0,
+            'predict_alpha': 0.5,
+            'predict_beta': 0.1,
+            'predict_lead': 0.05,
+            'predict_max_horizon': 0.25,
+            # A residual this large (eyeData units) restarts the predictor at the measurement
+            'predict_reset_distance': 150.0,
             'servo_0_min': 270.0,
             'servo_0_max': 390.0,
             'servo_1_min': 280.0,
@@ -47,47 +75,170 @@ class EyeDataController:
         }
         self.debug = debug
 
-        # Set the minimum and maximum angles for the servos
-        self.min_angles = [self.ConfigData['servo_0_min'], self.ConfigData['servo_1_min'],
-                           self.ConfigData['servo_2_min'], self.ConfigData['servo_3_min'],
-                           self.ConfigData['servo_4_min'], self.ConfigData['servo_5_min'],
-                           self.ConfigData['servo_6_min'], self.ConfigData['servo_7_min']]
-        self.max_angles = [self.ConfigData['servo_0_max'], self.ConfigData['servo_1_max'],
-                           self.ConfigData['servo_2_max'], self.ConfigData['servo_3_max'],
-                           self.ConfigData['servo_4_max'], self.ConfigData['servo_5_max'],
-                           self.ConfigData['servo_6_max'], self.ConfigData['servo_7_max']]
-
-        # Create an instance of the ServoController
-        i2c = busio.I2C(SCL, SDA)
-        self.servo_controller = ServoController(i2c)
-
-        # Set the minimum and maximum angles for each servo
-        for i in range(8):
-            self.servo_controller.set_min_angle(i, self.min_angles[i])
-            self.servo_controller.set_max_angle(i, self.max_angles[i])
+        # Values from the config file, if there is one, override the defaults above
+        self.config_path = config_path
+        if config_path is not None and os.path.exists(config_path):
+            self.ConfigData.update(load_config(config_path))
+        self.config_watcher = None
+
+        # Live eyeData goes through this slot: publish from any single producer thread (e.g. the
+        # GStreamer callback) with update_eye_data(), read without locking on the event loop
+        self.eye_data_slot = LatestValue(self.eyeData.keys(), self.eyeData.values())
+
+        # Set the minimum and maximum angles for the servos, one servo_N_min/max pair per channel
+        self.num_servos = 0
+        while f'servo_{self.num_servos}_min' in self.ConfigData:
+            self.num_servos += 1
+        self.min_angles = [self.ConfigData[f'servo_{i}_min'] for i in range(self.num_servos)]
+        self.max_angles = [self.ConfigData[f'servo_{i}_max'] for i in range(self.num_servos)]
+
+        # Create an instance of the ServoController ('hardware' or 'simulated' backend).
+        # boards spreads the servos over several PCA9685s, see PCA9685BusH.ChannelMap
+        self.servo_controller = ServoController(num_channels=self.num_servos, backend=backend, boards=boards)
+
+        # The servo_N_min/max limits are PCA9685 12-bit ticks (250..450 is a 1.2-2.2 ms pulse), so
+        # every servo position is in ticks. Limits outside the pulse range raise ValueError.
+        for i in range(self.num_servos):
+            self.servo_controller.set_tick_units(i)
+            self.servo_controller.set_angle_limits(i, self.min_angles[i], self.max_angles[i])
+
+        # Fixed-rate PID stage turning eyeData gaze targets into servo targets
+        self.gaze_controller = GazeController(self)
+
+        # Eyelid blinks mixed onto the lid channels inside the servo tick
+        self.lid_channels = [int(self.ConfigData[f'lid_{i}_servo']) for i in range(2)]
+        self.blink_player = BlinkPlayer(self.servo_controller, self.lid_channels,
+                                        closed_fraction=self.ConfigData['lid_closed'],
+                                        auto_blink=self.ConfigData['auto_blink'] > 0)
 
     async def run(self):
         await self.servo_controller.homing()
 
-    def set_servo_angles(self, angles):
-        # Set the absolute angles for the servos
-        for i in range(len(angles)):
-            self.servo_controller.set_absolute_angle(i, angles[i])
+    def start(self):
+        # Start the persistent servo loop, the gaze controller feeding it and the blink player
+        self.servo_controller.set_fractional_angles(self.ConfigData['eye_open'], self.lid_channels)
+        self.servo_controller.start()
+        self.gaze_controller.start()
+        self.blink_player.start(self.eye_data_slot)
+        if self.config_path is not None:
+            self.watch_config()
+
+    def blink(self, name='blink'):
+        self.blink_player.trigger(name)
+
+    async def stop(self):
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+        await self.blink_player.stop()
+        await self.gaze_controller.stop()
+        await self.servo_controller.stop()
+
+    def reload_config(self, path=None):
+        # Parse the whole file before touching anything, then apply only the changed keys.
+        # Returns the applied changes; a file that fails to load leaves the config as it was.
+        new_config = dict(self.ConfigData)
+        new_config.update(load_config(path or self.config_path))
+        return self.apply_config(diff_config(self.ConfigData, new_config))
+
+    def apply_config(self, changes):
+        # Recompute only what the changed keys affect, between two control ticks
+        changes = dict(changes)
+        limits, axes, lids, predict = set(), set(), False, False
+        for key in list(changes):
+            servo = re.fullmatch(r'servo_(\d+)_(min|max)', key)
+            axis = re.fullmatch(r'(cam_x|cam_y|eye_x|eye_y)_(p|i|d|servo)', key)
+            if servo and int(servo.group(1)) >= self.num_servos:
+                print(f"Config key {key} adds a servo channel; restart to apply it")
+                del changes[key]
+            elif servo:
+                limits.add(int(servo.group(1)))
+            elif axis:
+                axes.add(axis.group(1))
+            elif key.startswith('lid_') or key == 'eye_open':
+                lids = True
+            elif key.startswith('predict'):
+                predict = True
+        # Check the new limits and rate before anything is applied
+        new_config = dict(self.ConfigData, **changes)
+        for i in limits:
+            self.servo_controller.calibration.limit_counts(i, new_config[f'servo_{i}_min'], new_config[f'servo_{i}_max'])
+        if new_config['gaze_rate'] <= 0:
+            raise ValueError(f"gaze_rate must be positive, got {new_config['gaze_rate']}")
+        self.ConfigData.update(changes)
+
+        for i in sorted(limits):
+            self.min_angles[i] = self.ConfigData[f'servo_{i}_min']
+            self.max_angles[i] = self.ConfigData[f'servo_{i}_max']
+            self.servo_controller.set_angle_limits(i, self.min_angles[i], self.max_angles[i])
+        if axes or predict or 'gaze_rate' in changes:
+            self.gaze_controller.load_config(self.ConfigData, [axis for axis in AXES if axis in axes])
+        if 'auto_blink' in changes:
+            self.blink_player.auto_blink = self.ConfigData['auto_blink'] > 0
+        if lids:
+            self.lid_channels = [int(self.ConfigData[f'lid_{i}_servo']) for i in range(2)]
+            self.blink_player.lid_channels = np.asarray(self.lid_channels, dtype=np.int64)
+            self.blink_player.closed_fraction = self.ConfigData['lid_closed']
+            self.servo_controller.set_fractional_angles(self.ConfigData['eye_open'], self.lid_channels)
+        return changes
+
+    def save_config(self, path=None):
+        save_config(path or self.config_path, self.ConfigData)
 
-    def set_fractional_servo_angles(self, fractions):
-        # Set the fractional angles for the servos
-        for i in range(len(fractions)):
-            self.servo_controller.set_fractional_angle(i, fractions[i])
+    def watch_config(self, interval=1.0):
+        # Poll the config file and hot-reload it while the control loop keeps running
+        if self.config_watcher is None:
+            self.config_watcher = ConfigWatcher(self.config_path, interval)
+        self.config_watcher.start(self.on_config_file_changed)
+
+    def on_config_file_changed(self):
+        try:
+            changes = self.reload_config()
+        except (OSError, ValueError) as e:
+            print(f"Config reload failed, keeping the current config: {e}")
+            return
+        if changes:
+            print(f"Config reloaded: {', '.join(sorted(changes))}")
+
+    def update_eye_data(self, timestamp=None, **values):
+        # Never blocks; unnamed fields keep their latest value. timestamp is when the frame was
+        # captured (time.perf_counter clock); the gaze predictor extrapolates from it
+        self.eye_data_slot.update(timestamp, **values)
+
+    def get_eye_data(self):
+        return self.eye_data_slot.as_dict()
+
+    def set_servo_angles(self, angles, channels=None, mask=None):
+        # Set the absolute angles for the servos: all of them, the listed channels, or the
+        # masked ones, applied as one pose (see ServoController.set_targets)
+        self.servo_controller.set_absolute_angles(angles, channels, mask)
+
+    def set_fractional_servo_angles(self, fractions, channels=None, mask=None):
+        # Set the fractional angles for the servos, same channel selection as set_servo_angles
+        self.servo_controller.set_fractional_angles(fractions, channels, mask)
 
     def set_servo_min_angle(self, servo_index, min_angle):
         # Set the minimum angle for a specific servo
-        self.min_angles[servo_index] = min_angle
         self.servo_controller.set_min_angle(servo_index, min_angle)
+        self.min_angles[servo_index] = min_angle
 
     def set_servo_max_angle(self, servo_index, max_angle):
         # Set the maximum angle for a specific servo
-        self.max_angles[servo_index] = max_angle
         self.servo_controller.set_max_angle(servo_index, max_angle)
+        self.max_angles[servo_index] = max_angle
+
+    def start_recording(self, path):
+        # Log eye data inputs, servo targets and written counts to path (see MotionLogH)
+        self.stop_recording()
+        recorder = MotionRecorder(path, self.num_servos, self.eye_data_slot.fields)
+        self.servo_controller.set_recorder(recorder)
+        return recorder
+
+    def stop_recording(self):
+        recorder = self.servo_controller.recorder
+        if recorder is not None:
+            self.servo_controller.set_recorder(None)
+            recorder.close()
 
     def close(self):
-        self.loop.close()
\ No newline at end of file
+        self.stop_recording()
+        self.servo_controller.close()
\ No newline at end of file
@@ -0,0 +1,135 @@
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+# Shared memory layout: HEADER (int64 fields below), one META record per slot, then the frame
+# slots, each starting on a DATA_ALIGN boundary
+MAGIC = 0x45594546524D5231  # 'EYEFRMR1'
+HEADER_FIELDS = ('magic', 'slots', 'height', 'width', 'channels', 'latest')
+HEADER_SIZE = 8 * len(HEADER_FIELDS)
+# seq is the frame number held by the slot, negated while the producer is writing it
+META_DTYPE = np.dtype([('seq', '<i8'), ('pts', '<i8'), ('timestamp', '<f8')])
+DATA_ALIGN = 64
+NAME_PREFIX = 'eyecatcher_frames'
+
+
+def default_name():
+    # One ring per producer process; consumers are told the name (FrameRing.name)
+    return f'{NAME_PREFIX}_{os.getpid()}'
+
+
+def align(offset):
+    return -(-offset // DATA_ALIGN) * DATA_ALIGN
+
+
+class FrameRing:
+    # Fixed ring of frame slots in shared memory, written by one producer (the GStreamer
+    # callback) and read by any number of consumers, in this process or another one attached
+    # by name (each producer process has its own, see default_name). The producer never waits:
+    # it always writes the next slot, so a slow consumer just skips to the newest frame. Each
+    # slot carries its frame number, so a reader can tell when the frame it copied was
+    # overwritten underneath it and read again.
+    def __init__(self, shape=(640, 640, 3), slots=4, name=None, create=True):
+        if create:
+            name = name or default_name()
+            height, width, channels = shape
+            size = align(HEADER_SIZE + META_DTYPE.itemsize * slots) + slots * align(height * width * channels)
+            try:
+                self.memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                # Never unlink it here: it may be the live ring of another running instance
+                raise FileExistsError(f"Shared memory {name} already exists; another producer is using it, "
+                                      f"or a crashed run left it behind (remove /dev/shm/{name})")
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            # Attaching registers the segment with this process's resource tracker, which would
+            # unlink it under the producer when this process exits
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+        self.owner = create
+        self.name = name
+        self.header = np.ndarray(len(HEADER_FIELDS), dtype='<i8', buffer=self.memory.buf)
+        if create:
+            self.header[:] = [MAGIC, slots, height, width, channels, 0]
+        elif self.header[0] != MAGIC:
+            raise ValueError(f"Shared memory {name} is not a frame ring")
+        self.slots = int(self.header[1])
+        self.shape = tuple(int(value) for value in self.header[2:5])
+        self.frame_size = int(np.prod(self.shape))
+        self.meta = np.ndarray(self.slots, dtype=META_DTYPE, buffer=self.memory.buf, offset=HEADER_SIZE)
+        data_offset = align(HEADER_SIZE + META_DTYPE.itemsize * self.slots)
+        slot_size = align(self.frame_size)
+        self.frames = [np.ndarray(self.shape, dtype=np.uint8, buffer=self.memory.buf,
+                                  offset=data_offset + i * slot_size)
+                       for i in range(self.slots)]
+        if create:
+            self.meta['seq'] = 0
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name=name, create=False)
+
+    @property
+    def latest(self):
+        return int(self.header[5])
+
+    def write(self, frame, pts=-1, timestamp=None):
+        # Producer side; frame is anything np.copyto accepts with the ring's shape (for example
+        # a view on a mapped GstBuffer), copied straight into the slot
+        seq = self.latest + 1
+        slot = seq % self.slots
+        meta = self.meta[slot]
+        meta['seq'] = -seq
+        np.copyto(self.frames[slot], frame)
+        meta['pts'] = pts
+        meta['timestamp'] = time.perf_counter() if timestamp is None else timestamp
+        meta['seq'] = seq
+        self.header[5] = seq
+
+    def close(self):
+        # Drop the numpy views first, shared memory refuses to close while they are exported
+        self.header = self.meta = self.frames = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class FrameReader:
+    # Consumer side of a FrameRing. read() returns the newest frame not read yet, copied out of
+    # the ring into a buffer owned by the reader; colour conversion is done in that same copy
+    # and only for frames actually read, so the producer never pays for it.
+    def __init__(self, ring, convert=None):
+        self.ring = ring
+        # None keeps the producer's channel order, 'swap' reverses it (RGB <-> BGR)
+        self.convert = convert
+        self.out = np.empty(ring.shape, dtype=np.uint8)
+        self.last = 0
+        self.read_count = 0
+        self.dropped = 0
+        self.torn = 0
+
+    def read(self, max_retries=3):
+        # Returns (frame, pts, timestamp) or None if there is no new frame. The frame buffer is
+        # reused by the next read.
+        for _ in range(max_retries):
+            seq = self.ring.latest
+            if seq == self.last:
+                return None
+            slot = seq % self.ring.slots
+            meta = self.ring.meta[slot]
+            if meta['seq'] != seq:
+                # Already being overwritten; try the newest frame instead
+                self.torn += 1
+                continue
+            pts, timestamp = int(meta['pts']), float(meta['timestamp'])
+            source = self.ring.frames[slot]
+            np.copyto(self.out, source[..., ::-1] if self.convert == 'swap' else source)
+            if meta['seq'] != seq:
+                self.torn += 1
+                continue
+            if self.last:
+                self.dropped += seq - self.last - 1
+            self.last = seq
+            self.read_count += 1
+            return self.out, pts, timestamp
+        return None
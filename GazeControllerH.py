@@ -0,0 +1,164 @@
+import asyncio
+import numpy as np
+from SchedulerH import FixedRateScheduler
+from PredictorH import AlphaBetaPredictor
+
+# Gaze axes in eyeData/ConfigData naming order; every per-axis array below follows it
+AXES = ('cam_x', 'cam_y', 'eye_x', 'eye_y')
+# eyeData targets are in 0..1024 image coordinates with 512 at the centre
+EYE_DATA_CENTER = 512.0
+
+
+class PIDArray:
+    # One PID per element, all updated with one set of array operations. The output is the
+    # servo fraction: 0.5 + P*e + I*integral(e) + D*filtered(de/dt), clamped to [0, 1], with
+    # e the normalized offset of the target from the centre. Integration stops while the
+    # output is saturated in the direction of the error (anti-windup), and the derivative
+    # goes through a first-order low-pass with cutoff derivative_cutoff_hz.
+    def __init__(self, size, derivative_cutoff_hz=5.0):
+        self.kp = np.zeros(size)
+        self.ki = np.zeros(size)
+        self.kd = np.zeros(size)
+        self.derivative_cutoff_hz = derivative_cutoff_hz
+        self.integral = np.zeros(size)
+        self.derivative = np.zeros(size)
+        self.previous_error = None
+
+    def set_gains(self, kp, ki, kd):
+        self.kp[:] = kp
+        self.ki[:] = ki
+        self.kd[:] = kd
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = slice(None)
+        self.integral[mask] = 0.0
+        self.derivative[mask] = 0.0
+        if self.previous_error is not None:
+            self.previous_error[mask] = np.nan
+
+    def update(self, error, dt):
+        if self.previous_error is None:
+            self.previous_error = error.copy()
+        previous = np.where(np.isnan(self.previous_error), error, self.previous_error)
+        tau = 1.0 / (2 * np.pi * self.derivative_cutoff_hz)
+        alpha = dt / (tau + dt)
+        self.derivative += alpha * ((error - previous) / dt - self.derivative)
+        self.previous_error = error.copy()
+
+        integral = self.integral + error * dt
+        output = 0.5 + self.kp * error + self.ki * integral + self.kd * self.derivative
+        saturated = ((output > 1.0) & (error * self.ki > 0)) | ((output < 0.0) & (error * self.ki < 0))
+        self.integral = np.where(saturated, self.integral, integral)
+        output = 0.5 + self.kp * error + self.ki * self.integral + self.kd * self.derivative
+        return np.clip(output, 0.0, 1.0)
+
+
+class GazeController:
+    # Fixed-rate stage between EyeDataController's eye data slot and the servo loop: reads the
+    # latest gaze targets, runs the per-axis PIDs as one array update and writes all axis channels'
+    # targets in one call. With prediction on, the targets are extrapolated from the frame's
+    # capture time (the eye data timestamp) to predict_lead seconds after the current tick, so
+    # the detection pipeline's latency and the servo lag are compensated.
+    def __init__(self, eye_data_controller, rate_hz=None, derivative_cutoff_hz=5.0):
+        self.eye_data_controller = eye_data_controller
+        self.servo_controller = eye_data_controller.servo_controller
+        config = eye_data_controller.ConfigData
+        self.scheduler = FixedRateScheduler(rate_hz or config.get('gaze_rate', 30.0))
+        self.pid = PIDArray(len(AXES), derivative_cutoff_hz)
+        self.channels = np.zeros(len(AXES), dtype=np.int64)
+        self.eye_data = eye_data_controller.eye_data_slot
+        # Positions of the gaze axes within an eye data sample
+        self.axis_fields = np.array([self.eye_data.index[axis] for axis in AXES], dtype=np.int64)
+        self.sample = np.empty(len(self.eye_data.fields))
+        self.sample_version = -1
+        self.track_field = self.eye_data.index.get('track')
+        self.track = None
+        # Capture time of a sample read this tick and not yet passed on to the servos
+        self.source_time = None
+        self.measured = np.full(len(AXES), EYE_DATA_CENTER)
+        self.targets = np.full(len(AXES), EYE_DATA_CENTER)
+        self.predictor = AlphaBetaPredictor(len(AXES))
+        self.predict = True
+        self.predict_lead = 0.0
+        self.outputs = np.full(len(AXES), 0.5)
+        self.load_config(config)
+        self.loop_task = None
+        self.running = False
+
+    def load_config(self, config, axes=AXES):
+        # Gains and servo channel for the given axes only; the others keep running untouched
+        for axis in axes:
+            index = AXES.index(axis)
+            self.pid.kp[index] = config[f'{axis}_p']
+            self.pid.ki[index] = config[f'{axis}_i']
+            self.pid.kd[index] = config[f'{axis}_d']
+            self.channels[index] = int(config[f'{axis}_servo'])
+        if 'gaze_rate' in config and config['gaze_rate'] != 1.0 / self.scheduler.period:
+            self.scheduler.set_rate(config['gaze_rate'])
+        if 'predict' in config:
+            self.predict = config['predict'] > 0
+            self.predict_lead = config['predict_lead']
+            self.predictor.alpha = config['predict_alpha']
+            self.predictor.beta = config['predict_beta']
+            self.predictor.max_horizon = config['predict_max_horizon']
+            self.predictor.reset_distance = config.get('predict_reset_distance', np.inf)
+
+    def read_targets(self):
+        # Newest consistent sample; between publishes the PIDs keep running on the last one
+        version, sample, timestamp, is_new = self.eye_data.read(self.sample_version, self.sample)
+        now = self.eye_data.clock()
+        if is_new:
+            self.sample_version = version
+            self.measured[:] = sample[self.axis_fields]
+            track = None if self.track_field is None else sample[self.track_field]
+            if track != self.track:
+                # A different person: start from their position rather than extrapolating the jump
+                self.track = track
+                self.predictor.reset(self.measured, timestamp)
+            self.predictor.update(self.measured, timestamp, now)
+            self.source_time = timestamp
+            # Log the input as consumed, on the recorder's clock like the targets and counts it
+            # leads to, with its capture time alongside
+            if self.servo_controller.recorder is not None:
+                self.servo_controller.recorder.record_eye_data(sample, source_time=timestamp)
+        if self.predict:
+            predicted = self.predictor.predict(now + self.predict_lead)
+            self.targets[:] = np.clip(predicted, 0.0, 2 * EYE_DATA_CENTER)
+        else:
+            self.targets[:] = self.measured
+        return self.targets
+
+    def step(self):
+        error = (self.read_targets() - EYE_DATA_CENTER) / EYE_DATA_CENTER
+        self.outputs = self.pid.update(error, self.scheduler.period)
+        self.servo_controller.set_fractional_angles(self.outputs, self.channels, source_time=self.source_time)
+        self.source_time = None
+        return self.outputs
+
+    async def run(self):
+        self.scheduler.restart()
+        while self.running:
+            self.step()
+            await self.scheduler.wait()
+
+    def start(self):
+        if self.loop_task is None or self.loop_task.done():
+            self.running = True
+            self.pid.reset()
+            self.loop_task = asyncio.get_running_loop().create_task(self.run())
+        return self.loop_task
+
+    async def stop(self):
+        if self.loop_task is None:
+            return
+        self.running = False
+        await self.loop_task
+        self.loop_task = None
+
+    def get_tick_stats(self):
+        return self.scheduler.stats.summary()
+
+    def get_latency(self):
+        # Smoothed time from frame capture to the gaze loop reading the sample, in seconds
+        return self.predictor.latency
@@ -1,7 +1,7 @@
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
-from eye_data_controller import EyeDataController
+from EyeControllerH import EyeDataController
 import asyncio
 
 class TestApp(Gtk.Window):
@@ -52,11 +52,11 @@ class TestApp(Gtk.Window):
 
     def on_angle_button_clicked(self, button, servo_index, entry):
         angle = float(entry.get_text())
-        self.eye_data_controller.set_servo_angles([angle])
+        self.eye_data_controller.set_servo_angles([angle], [servo_index])
 
     def on_fraction_button_clicked(self, button, servo_index, entry):
         fraction = float(entry.get_text())
-        self.eye_data_controller.set_fractional_servo_angles([fraction])
+        self.eye_data_controller.set_fractional_servo_angles([fraction], [servo_index])
 
     def on_min_button_clicked(self, button, servo_index, entry):
         min_angle = float(entry.get_text())
@@ -1,10 +1,8 @@
-from servo_controller import ServoController
+from ControllerH import ServoController
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 import asyncio
-import busio
-from board import SCL, SDA
 
 class TestApp(Gtk.Window):
     def __init__(self):
@@ -16,8 +14,7 @@ class TestApp(Gtk.Window):
         self.max_angles = [180, 180, 180, 180, 180, 180, 180, 180]
 
         # Create an instance of the ServoController
-        i2c = busio.I2C(SCL, SDA)
-        self.servo_controller = ServoController(i2c)
+        self.servo_controller = ServoController()
 
         # Set the minimum and maximum angles for each servo
         for i in range(8):
@@ -0,0 +1,207 @@
+import time
+# Launch time, for the startup report (time to first servo command and first frame)
+START_TIME = time.perf_counter()
+import argparse
+import asyncio
+import os
+import threading
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import GLib, Gst
+from CallbackStatsH import StatsReporter
+from DetectionBridgeH import DetectionBridge
+from DetectionCallbackH import app_callback_class, attach_callbacks
+from PipelineTraceH import DETECTION_TRACE_POINTS, PipelineTracer, stream_trace_points
+from PipelineH import DEFAULT_THRESHOLDS, PROFILES, Element, PipelineError, callback_names, get_profile, get_source_type, \
+    multi_source_pipeline
+from ServoBackendH import BACKEND_ENV, BACKENDS
+
+# Runs the detection pipeline and callback without Gtk or a display: the output goes to a
+# fakesink (or an appsink that keeps only the newest buffer), the overlay is left out, and the
+# run ends after --frames buffers or --seconds seconds with a throughput and latency summary.
+# The servos run on the simulated backend unless --servo-backend (or SERVO_BACKEND) says
+# hardware, so it needs no servo boards either.
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Headless detection runner")
+    parser.add_argument("--input", "-i", type=str, action="append", help="Input source: 'test' for videotestsrc, a file, \
+                        a /dev/video device or 'rpi'. Repeat for several cameras sharing one hailonet. Defaults to test")
+    parser.add_argument("--hef-path", required=True, help="HEF file for hailonet")
+    parser.add_argument("--network-name", default="yolov5", help="hailofilter function name")
+    parser.add_argument("--postprocess-so", default=None, help="hailofilter .so; defaults to the TAPPAS yolo postprocess")
+    parser.add_argument("--profile", default="default", choices=list(PROFILES), help="Pipeline tuning profile")
+    parser.add_argument("--sink", default="fakesink", choices=["fakesink", "appsink"], help="Sink at the end of the pipeline")
+    parser.add_argument("--frames", type=int, default=0, help="Stop after this many frames")
+    parser.add_argument("--seconds", type=float, default=0, help="Stop after this many seconds")
+    parser.add_argument("--no-servos", action="store_true", help="Only run the pipeline, without the gaze and servo loops")
+    parser.add_argument("--servo-backend", choices=BACKENDS, default=os.environ.get(BACKEND_ENV, 'simulated'),
+                        help="PCA9685 backend for the servo loop. Defaults to $SERVO_BACKEND, then simulated")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="Seconds between periodic stats lines (0 for none)")
+    parser.add_argument("--trace", action="store_true", help="Trace per-stage latency and queue fill levels")
+    args = parser.parse_args(argv)
+    args.input = args.input or ["test"]
+    return args
+
+
+def output_sink(kind, name):
+    # Items ending one stream's branch: a fakesink, or an appsink that keeps only the newest
+    # buffer, for a consumer that pulls when it wants to
+    if kind == 'appsink':
+        return [Element('appsink', name, sync=False, drop=True, max_buffers=1)]
+    return [Element('fakesink', name, sync=False)]
+
+
+def default_postprocess_so():
+    tappas_workspace = os.environ.get('TAPPAS_WORKSPACE', '')
+    if tappas_workspace == '':
+        print("TAPPAS_WORKSPACE environment variable is not set. Please set it or pass --postprocess-so.")
+        exit(1)
+    return os.path.join(tappas_workspace, 'apps/h8/gstreamer/libs/post_processes/libyolo_hailortpp_post.so')
+
+
+def format_latency(summary):
+    if summary['count'] == 0:
+        return "no samples"
+    return (f"n={summary['count']} mean {summary['mean'] * 1000:.2f} ms, p50 {summary['p50'] * 1000:.2f} ms, "
+            f"p90 {summary['p90'] * 1000:.2f} ms, p99 {summary['p99'] * 1000:.2f} ms, max {summary['max'] * 1000:.2f} ms")
+
+
+class HeadlessApp:
+    def __init__(self, args):
+        self.args = args
+        self.user_data = app_callback_class(len(args.input))
+        self.user_data.start_time = START_TIME
+        self.sources = [(get_source_type(video_source), video_source) for video_source in args.input]
+        self.user_data.live_source = all(source_type != 'file' for source_type, _ in self.sources)
+        self.profile = get_profile(args.profile, sync=False)
+        self.eye_data_controller = None
+        self.control_loop = None
+        if not args.no_servos:
+            # Imported here so --no-servos runs never load the servo stack
+            from EyeControllerH import EyeDataController
+            self.eye_data_controller = EyeDataController(backend=args.servo_backend)
+            self.user_data.bridge = DetectionBridge(self.eye_data_controller)
+            self.control_loop = asyncio.new_event_loop()
+            threading.Thread(target=self.control_loop.run_forever, daemon=True).start()
+        Gst.init(None)
+        self.pipeline = self.create_pipeline()
+        self.user_data.pipeline = self.pipeline
+        self.loop = GLib.MainLoop()
+        self.run_start = None
+        self.run_end = None
+        self.end_reason = None
+        self.tracer = None
+
+    def create_pipeline(self):
+        def sink(i):
+            return output_sink(self.args.sink, 'app_sink' if len(self.sources) == 1 else f'app_sink_{i}')
+        description = multi_source_pipeline(self.sources, self.args.hef_path,
+                                            self.args.postprocess_so or default_postprocess_so(),
+                                            self.args.network_name, self.profile, DEFAULT_THRESHOLDS,
+                                            sink=sink, overlay=False)
+        pipeline_string = description.validate(Gst).to_string()
+        print(pipeline_string)
+        try:
+            return Gst.parse_launch(pipeline_string)
+        except Exception as e:
+            raise PipelineError(f"{e}\n{pipeline_string}")
+
+    def run_control(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.control_loop).result()
+
+    async def start_control(self):
+        await self.eye_data_controller.servo_controller.homing()
+        self.eye_data_controller.start()
+
+    async def stop_control(self):
+        await self.eye_data_controller.stop()
+
+    def bus_call(self, bus, message):
+        if message.type == Gst.MessageType.EOS:
+            self.stop("end of stream")
+        elif message.type == Gst.MessageType.ERROR:
+            err, debug = message.parse_error()
+            print(f"Error: {err}, {debug}")
+            self.stop("error")
+        return True
+
+    def check_limits(self):
+        frames = self.user_data.stats.frames
+        if self.args.frames and frames >= self.args.frames:
+            self.stop(f"{frames} frames")
+            return False
+        if self.args.seconds and time.perf_counter() - self.run_start >= self.args.seconds:
+            self.stop(f"{self.args.seconds} s")
+            return False
+        return True
+
+    def stop(self, reason):
+        if self.end_reason is None:
+            self.end_reason = reason
+            self.run_end = time.perf_counter()
+            self.loop.quit()
+
+    def run(self):
+        if self.eye_data_controller is not None:
+            self.run_control(self.start_control())
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message", self.bus_call)
+        attach_callbacks(self.pipeline, self.user_data, callback_names(len(self.sources)))
+        stats_reporter = StatsReporter(self.user_data.stats, self.args.report_interval) if self.args.report_interval else None
+        if stats_reporter is not None:
+            stats_reporter.start()
+        if self.args.trace:
+            # With several cameras, the first one's path is traced
+            points = DETECTION_TRACE_POINTS if len(self.sources) == 1 else stream_trace_points(0)
+            self.tracer = PipelineTracer(self.pipeline, points, report_interval=self.args.report_interval).start()
+        GLib.timeout_add(10, self.check_limits)
+
+        self.run_start = time.perf_counter()
+        self.pipeline.set_state(Gst.State.PLAYING)
+        try:
+            self.loop.run()
+        except KeyboardInterrupt:
+            self.stop("interrupted")
+        self.pipeline.set_state(Gst.State.NULL)
+        if stats_reporter is not None:
+            stats_reporter.stop()
+        if self.tracer is not None:
+            self.tracer.stop()
+        if self.eye_data_controller is not None:
+            self.run_control(self.stop_control())
+            self.eye_data_controller.close()
+        self.print_summary()
+
+    def print_summary(self):
+        stats = self.user_data.stats
+        elapsed = (self.run_end or time.perf_counter()) - self.run_start
+        print(f"Stopped after {self.end_reason}")
+        print(f"Frames: {stats.frames} in {elapsed:.2f} s ({stats.frames / elapsed if elapsed > 0 else 0:.1f} FPS)")
+        if len(self.sources) > 1:
+            print("Frames per source: " + ", ".join(f"{i} ({video_source}): {count}" for i, ((_, video_source), count)
+                                                    in enumerate(zip(self.sources, stats.stream_frames))))
+        if stats.frames:
+            print(f"Detections: {stats.detections / stats.frames:.2f}/frame, persons in "
+                  f"{100.0 * stats.frames_with_person / stats.frames:.0f}% of frames")
+        print(f"Probe time: {format_latency(stats.probe_time.summary())}")
+        print(f"Capture to callback: {format_latency(stats.pipeline_latency.summary())}")
+        if self.eye_data_controller is not None:
+            servo_controller = self.eye_data_controller.servo_controller
+            print(f"Frame to servo write: {format_latency(servo_controller.frame_latency.summary())}")
+            print(f"Servo tick: {servo_controller.get_tick_stats()}")
+        if self.tracer is not None:
+            self.tracer.report()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if not args.frames and not args.seconds:
+        print("Running until end of stream or Ctrl-C; use --frames or --seconds to limit the run")
+    try:
+        app = HeadlessApp(args)
+    except PipelineError as e:
+        print(e)
+        exit(1)
+    app.run()
@@ -0,0 +1,69 @@
+import math
+import numpy as np
+
+
+class LatencyHistogram:
+    # Log-spaced histogram of durations in seconds. record() is one log10 and an increment, cheap
+    # enough for a GStreamer streaming thread or the control tick. One writer; summary() from
+    # another thread sees a slightly stale but consistent-enough view.
+    def __init__(self, min_value=1e-6, max_value=10.0, bins_per_decade=20):
+        self.min_value = min_value
+        self.bins_per_decade = bins_per_decade
+        # Bin 0 is underflow (below min_value), the last bin overflow (above max_value)
+        self.num_bins = int(math.ceil(math.log10(max_value / min_value) * bins_per_decade)) + 2
+        self.upper_edges = min_value * 10 ** (np.arange(self.num_bins) / bins_per_decade)
+        self.upper_edges[-1] = np.inf
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        if value < self.min_value:
+            index = 0
+        else:
+            index = min(int(math.log10(value / self.min_value) * self.bins_per_decade) + 1, self.num_bins - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        # Add the samples of another histogram with the same bins (e.g. another writer's)
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def percentile(self, q):
+        # Upper edge of the bin holding the q-th percentile (so within one bin width, rounded up)
+        counts = self.counts.copy()
+        total = counts.sum()
+        if total == 0:
+            return float('nan')
+        index = int(np.searchsorted(np.cumsum(counts), total * q / 100.0))
+        return float(min(self.upper_edges[index], self.max))
+
+    def summary(self):
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+    def buckets(self):
+        # (upper edge in seconds, count) for the non-empty bins
+        return [(float(self.upper_edges[i]), int(self.counts[i])) for i in np.flatnonzero(self.counts)]
@@ -0,0 +1,60 @@
+import time
+import numpy as np
+
+
+class LatestValue:
+    # Single-producer "latest sample" slot for handing values from a streaming thread to the
+    # event loop, guarded by a seqlock: the producer makes the sequence number odd, writes the
+    # sample and its timestamp, and makes it even again, so publish() never blocks. A reader
+    # copies the sample and retries if the sequence was odd or changed during the copy, so a
+    # read always returns one consistent sample and its own timestamp, never a mix.
+    def __init__(self, fields, initial=None, clock=time.perf_counter):
+        self.fields = tuple(fields)
+        self.index = {field: i for i, field in enumerate(self.fields)}
+        self.clock = clock
+        self.values = np.zeros(len(self.fields))
+        self.timestamp = 0.0
+        self.sequence = 0
+        if initial is not None:
+            self.values[:] = list(initial)
+            self.timestamp = clock()
+
+    @property
+    def version(self):
+        # Number of completed publishes
+        return self.sequence >> 1
+
+    def publish(self, values, timestamp=None):
+        # Producer side: write a complete sample (array-like in field order)
+        timestamp = self.clock() if timestamp is None else timestamp
+        self.sequence += 1
+        self.values[:] = values
+        self.timestamp = timestamp
+        self.sequence += 1
+
+    def update(self, timestamp=None, **values):
+        # Producer side: publish the latest sample with some fields replaced
+        sample = self.values.copy()
+        for field, value in values.items():
+            sample[self.index[field]] = value
+        self.publish(sample, timestamp)
+
+    def read(self, last_version=-1, out=None):
+        # Consumer side: returns (version, values, timestamp, is_new), where is_new says whether
+        # anything was published since last_version
+        if out is None:
+            out = np.empty(len(self.fields))
+        while True:
+            sequence = self.sequence
+            if not sequence & 1:
+                out[:] = self.values
+                timestamp = self.timestamp
+                if self.sequence == sequence:
+                    version = sequence >> 1
+                    return version, out, timestamp, version != last_version
+            # A publish is in progress; let the producer thread finish it
+            time.sleep(0)
+
+    def as_dict(self):
+        _, values, _, _ = self.read()
+        return dict(zip(self.fields, values.tolist()))
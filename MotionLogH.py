@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import time
+import numpy as np
+
+# File layout: MAGIC, a little-endian uint32 header length, a JSON header padded so the
+# records start on a HEADER_ALIGN boundary, then fixed-width records appended in chunks.
+# The record region can be mapped with np.memmap while the file is still growing.
+MAGIC = b'EYEMLOG1'
+HEADER_ALIGN = 64
+LOG_VERSION = 2
+
+KIND_EYE_DATA = 0
+KIND_TARGETS = 1
+KIND_COUNTS = 2
+KINDS = {'eye_data': KIND_EYE_DATA, 'targets': KIND_TARGETS, 'counts': KIND_COUNTS}
+
+
+def record_dtype(width, version=LOG_VERSION):
+    # values holds eye data fields, per-channel target angles or per-channel counts depending
+    # on kind; unused and unwritten slots are NaN. timestamp is when the record was written,
+    # on the recorder's clock, so records are in timestamp order. Eye data records also keep
+    # the capture time of their frame (source_time, NaN otherwise) and its PTS in ns (pts, -1
+    # otherwise) at full precision; float32 values cannot hold either.
+    if version == 1:
+        return np.dtype([('timestamp', '<f8'), ('kind', 'u1'), ('values', '<f4', (width,))])
+    return np.dtype([('timestamp', '<f8'), ('source_time', '<f8'), ('pts', '<i8'), ('kind', 'u1'),
+                     ('values', '<f4', (width,))])
+
+
+class MotionRecorder:
+    # Appends eye data inputs, servo targets and written counts to a motion log. Records are
+    # buffered in a preallocated chunk and written out when it fills, so recording on the
+    # control path is an array copy. Call from the event loop thread only.
+    def __init__(self, path, num_channels, eye_fields=(), chunk_records=1024, clock=time.perf_counter):
+        self.path = path
+        self.num_channels = num_channels
+        self.eye_fields = tuple(eye_fields)
+        self.pts_field = self.eye_fields.index('pts') if 'pts' in self.eye_fields else None
+        self.width = max(num_channels, len(self.eye_fields), 1)
+        self.dtype = record_dtype(self.width)
+        self.clock = clock
+        self.chunk = np.zeros(chunk_records, dtype=self.dtype)
+        self.used = 0
+        self.records = 0
+        self.file = open(path, 'wb')
+        self.write_header()
+
+    def write_header(self):
+        header = json.dumps({
+            'version': LOG_VERSION,
+            'num_channels': self.num_channels,
+            'eye_fields': list(self.eye_fields),
+            'width': self.width,
+            'created': time.time(),
+        }).encode()
+        prefix = len(MAGIC) + 4
+        padded = -(-(prefix + len(header)) // HEADER_ALIGN) * HEADER_ALIGN - prefix
+        self.file.write(MAGIC + np.uint32(padded).tobytes() + header.ljust(padded))
+
+    def record(self, kind, values, timestamp=None, channels=None):
+        if self.used == self.chunk.size:
+            self.flush()
+        entry = self.chunk[self.used]
+        entry['timestamp'] = self.clock() if timestamp is None else timestamp
+        entry['source_time'] = np.nan
+        entry['pts'] = -1
+        entry['kind'] = kind
+        entry['values'] = np.nan
+        if channels is None:
+            entry['values'][:len(values)] = values
+        else:
+            entry['values'][channels] = values
+        self.used += 1
+        return entry
+
+    def record_eye_data(self, values, source_time=None, timestamp=None):
+        # source_time is when the frame behind the sample was captured
+        entry = self.record(KIND_EYE_DATA, values, timestamp)
+        if source_time is not None:
+            entry['source_time'] = source_time
+        if self.pts_field is not None:
+            entry['pts'] = int(values[self.pts_field])
+
+    def record_targets(self, targets, timestamp=None):
+        self.record(KIND_TARGETS, targets, timestamp)
+
+    def record_counts(self, channels, counts, timestamp=None):
+        self.record(KIND_COUNTS, counts, timestamp, channels)
+
+    def flush(self):
+        if self.used:
+            self.chunk[:self.used].tofile(self.file)
+            self.records += self.used
+            self.used = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def open_motion_log(path, mode='r'):
+    # Returns (header, records) with records a read-only memmap of the complete records
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a motion log")
+        length = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        header = json.loads(f.read(length).decode().rstrip())
+    offset = len(MAGIC) + 4 + length
+    dtype = record_dtype(header['width'], header.get('version', 1))
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(count,))
+
+
+class MotionPlayer:
+    # Replays a motion log into a ServoController. mode='targets' feeds the recorded targets
+    # through the motion stack again; mode='counts' re-sends the recorded register counts
+    # as-is. With an EyeDataController, recorded eye data is published into its slot too.
+    def __init__(self, path):
+        self.header, self.records = open_motion_log(path)
+        self.num_channels = self.header['num_channels']
+        eye_fields = self.header['eye_fields']
+        self.pts_field = eye_fields.index('pts') if 'pts' in eye_fields and 'pts' in self.records.dtype.names else None
+
+    def events(self, mode, with_eye_data):
+        kinds = [KINDS[mode]] + ([KIND_EYE_DATA] if with_eye_data else [])
+        return self.records[np.isin(self.records['kind'], kinds)]
+
+    def apply(self, record, servo_controller, eye_data_controller):
+        values = record['values']
+        if record['kind'] == KIND_TARGETS:
+            servo_controller.set_absolute_angles(values[:self.num_channels])
+        elif record['kind'] == KIND_COUNTS:
+            channels = np.flatnonzero(~np.isnan(values[:self.num_channels]))
+            servo_controller.open()
+            servo_controller.writer.write(channels, values[channels].astype(np.int64))
+        elif eye_data_controller is not None:
+            sample = values[:len(self.header['eye_fields'])].astype(float)
+            if self.pts_field is not None:
+                sample[self.pts_field] = record['pts']
+            eye_data_controller.eye_data_slot.publish(sample)
+
+    async def play(self, servo_controller, mode='targets', speed=1.0, eye_data_controller=None):
+        # Time-accurate playback: each event is applied at its recorded offset from the first,
+        # on absolute deadlines so per-event cost does not accumulate. The servo control loop
+        # must be running (ServoController.start()) for targets to move anything.
+        events = self.events(mode, eye_data_controller is not None)
+        if events.size == 0:
+            return 0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = events['timestamp'][0]
+        for record in events:
+            delay = start + (record['timestamp'] - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.apply(record, servo_controller, eye_data_controller)
+        return events.size
+
+    def play_fast(self, servo_controller, mode='targets'):
+        # As fast as possible, for analysis: between events the controller is stepped for as
+        # many ticks as the recorded gap spans, so motion matches a realtime run tick for tick
+        events = self.events(mode, False)
+        period = servo_controller.scheduler.period
+        ticks = 0
+        for i, record in enumerate(events):
+            self.apply(record, servo_controller, None)
+            if mode == 'targets':
+                gap = events['timestamp'][i + 1] - record['timestamp'] if i + 1 < events.size else None
+                steps = int(round(gap / period)) if gap is not None else None
+                step = 0
+                while (steps is None or step < steps) and servo_controller.step():
+                    step += 1
+                ticks += step
+        return ticks
@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# PCA9685 register layout: four bytes per channel (ON_L, ON_H, OFF_L, OFF_H) starting at LED0_ON_L
+MODE1 = 0x00
+MODE1_AI = 0x20
+LED0_ON_L = 0x06
+REGISTERS_PER_CHANNEL = 4
+FULL_ON = 0x1000
+
+# Bytes on the wire for one write transaction, excluding the payload (device address + register pointer)
+TRANSACTION_OVERHEAD_BYTES = 2
+# What starting another transaction costs, in byte times on the wire: the overhead bytes,
+# START/STOP, and the write() syscall and bus lock (about 100 us, some 4-5 byte times at 400 kHz)
+TRANSACTION_COST_BYTES = 8
+
+
+class BusStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.transactions_saved = 0
+        self.bytes_saved = 0
+        self.channels_skipped = 0
+
+    def as_dict(self):
+        return {
+            'transactions': self.transactions,
+            'bytes': self.bytes,
+            'transactions_saved': self.transactions_saved,
+            'bytes_saved': self.bytes_saved,
+            'channels_skipped': self.channels_skipped,
+        }
+
+
+class AggregateBusStats:
+    # Totals over several boards' BusStats, with the same reset()/as_dict() interface
+    def __init__(self, stats):
+        self.stats = stats
+
+    def reset(self):
+        for stats in self.stats:
+            stats.reset()
+
+    def as_dict(self):
+        per_board = [stats.as_dict() for stats in self.stats]
+        result = {key: sum(board[key] for board in per_board) for key in per_board[0]}
+        if len(per_board) > 1:
+            result['boards'] = per_board
+        return result
+
+
+def counts_to_registers(counts):
+    # Mirror adafruit_pca9685 duty_cycle: 0xFFFF is full on, everything else is a 12-bit OFF time
+    counts = np.asarray(counts, dtype=np.int64)
+    on = np.where(counts == 0xFFFF, FULL_ON, 0)
+    off = np.where(counts == 0xFFFF, 0, (counts + 1) >> 4)
+    return np.stack([on, off], axis=-1).astype('<u2')
+
+
+class BurstWriter:
+    def __init__(self, pca, num_channels=16):
+        self.pca = pca
+        self.num_channels = num_channels
+        # Last (ON, OFF) pair sent per channel; -1 means the channel has never been written
+        self.registers = np.full((num_channels, 2), -1, dtype=np.int64)
+        self.stats = BusStats()
+        self.enable_auto_increment()
+
+    def enable_auto_increment(self):
+        mode1 = self.pca.mode1_reg
+        if not mode1 & MODE1_AI:
+            self.pca.mode1_reg = mode1 | MODE1_AI
+
+    def write(self, channels, counts):
+        channels = np.asarray(channels, dtype=np.int64)
+        if channels.size == 0:
+            return
+        registers = counts_to_registers(counts)
+        dirty = np.any(registers != self.registers[channels], axis=1)
+        self.stats.channels_skipped += int(channels.size - np.count_nonzero(dirty))
+
+        # What the per-channel duty_cycle path would have cost for the same update
+        naive_transactions = channels.size
+        naive_bytes = channels.size * (TRANSACTION_OVERHEAD_BYTES + REGISTERS_PER_CHANNEL)
+
+        sent_transactions = 0
+        sent_bytes = 0
+        if dirty.any():
+            self.registers[channels[dirty]] = registers[dirty]
+            for first, last in self.burst_ranges(np.sort(channels[dirty])):
+                payload = self.registers[first:last + 1].astype('<u2').tobytes()
+                self.send(LED0_ON_L + REGISTERS_PER_CHANNEL * first, payload)
+                sent_transactions += 1
+                sent_bytes += TRANSACTION_OVERHEAD_BYTES + len(payload)
+
+        self.stats.transactions += sent_transactions
+        self.stats.bytes += sent_bytes
+        self.stats.transactions_saved += naive_transactions - sent_transactions
+        self.stats.bytes_saved += naive_bytes - sent_bytes
+
+    def burst_ranges(self, dirty_channels):
+        # Cover the dirty channels with contiguous bursts. Clean channels in between are resent
+        # from the cache when their bytes take less time than starting a new transaction (a
+        # single clean channel, with the cost above); a never-written channel always splits.
+        ranges = []
+        first = last = int(dirty_channels[0])
+        for channel in dirty_channels[1:]:
+            channel = int(channel)
+            gap = self.registers[last + 1:channel]
+            if len(gap) * REGISTERS_PER_CHANNEL >= TRANSACTION_COST_BYTES or np.any(gap < 0):
+                ranges.append((first, last))
+                first = channel
+            last = channel
+        ranges.append((first, last))
+        return ranges
+
+    def send(self, register, payload):
+        buffer = bytearray(1 + len(payload))
+        buffer[0] = register
+        buffer[1:] = payload
+        with self.pca.i2c_device as i2c:
+            i2c.write(buffer)
+
+
+class ChannelMap:
+    # Maps logical servo channels onto (board, PCA9685 pin) pairs. Boards are dicts with
+    # 'address' (default 0x40), 'bus' (I2C bus number, None for the default board.SCL/SDA bus)
+    # and either 'channels' (use pins 0..channels-1, default 16) or an explicit 'pins' list.
+    # Logical channels are numbered consecutively across the boards in order.
+    def __init__(self, boards):
+        self.boards = []
+        board_of, pin_of = [], []
+        for board_index, board in enumerate(boards):
+            pins = list(board.get('pins', range(board.get('channels', 16))))
+            if any(not 0 <= pin < 16 for pin in pins) or len(set(pins)) != len(pins):
+                raise ValueError(f"Board {board_index} has invalid PCA9685 pins: {pins}")
+            self.boards.append({'address': board.get('address', 0x40), 'bus': board.get('bus'), 'pins': pins})
+            board_of += [board_index] * len(pins)
+            pin_of += pins
+        seen = set()
+        for board in self.boards:
+            key = (board['bus'], board['address'])
+            if key in seen:
+                raise ValueError(f"Duplicate PCA9685 at address {board['address']:#x} on bus {board['bus']}")
+            seen.add(key)
+        self.board_of = np.array(board_of, dtype=np.int64)
+        self.pin_of = np.array(pin_of, dtype=np.int64)
+        self.num_channels = len(pin_of)
+
+
+class MultiBoardWriter:
+    # Splits each tick's writes by board and sends every board's burst through its own
+    # BurstWriter. Boards on different buses are written in parallel, one worker thread per
+    # bus; boards sharing a bus go out back to back on that bus's worker.
+    def __init__(self, pcas, channel_map):
+        self.channel_map = channel_map
+        self.writers = [BurstWriter(pca) for pca in pcas]
+        self.stats = AggregateBusStats([writer.stats for writer in self.writers])
+        buses = [board['bus'] for board in channel_map.boards]
+        self.buses = list(dict.fromkeys(buses))
+        self.bus_of = np.array([self.buses.index(bus) for bus in buses], dtype=np.int64)
+        self.executors = None
+        if len(self.buses) > 1:
+            self.executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"i2c-{bus}") for bus in self.buses]
+
+    def write(self, channels, counts):
+        channels = np.asarray(channels, dtype=np.int64)
+        if channels.size == 0:
+            return
+        counts = np.asarray(counts)
+        boards = self.channel_map.board_of[channels]
+        pins = self.channel_map.pin_of[channels]
+        if self.executors is None:
+            for board in np.unique(boards):
+                selected = boards == board
+                self.writers[board].write(pins[selected], counts[selected])
+            return
+        jobs = {}
+        for board in np.unique(boards):
+            selected = boards == board
+            jobs.setdefault(int(self.bus_of[board]), []).append((self.writers[board], pins[selected], counts[selected]))
+        futures = [self.executors[bus].submit(self.write_bus, bus_jobs) for bus, bus_jobs in jobs.items()]
+        # The tick is done once every bus has finished its bursts
+        for future in futures:
+            future.result()
+
+    def write_bus(self, jobs):
+        for writer, pins, counts in jobs:
+            writer.write(pins, counts)
+
+    def close(self):
+        if self.executors is not None:
+            for executor in self.executors:
+                executor.shutdown()
+            self.executors = None
@@ -0,0 +1,315 @@
+import os
+
+# Tuning per site lives in these profiles; anything not set falls back to 'default', which
+# matches the original hand-written pipeline. Queues on the inference path (between the tee
+# and hailomuxer) never leak, since a dropped buffer there would desynchronize the muxer.
+PROFILES = {
+    'default': {
+        'network_width': 640,
+        'network_height': 640,
+        'network_format': 'RGB',
+        'queue_size': 3,
+        'leaky': 'no',
+        'bypass_size': 20,
+        'batch_size': 1,
+        'decode_threads': 2,
+        'scale_threads': 2,
+        'convert_threads': 3,
+        'sync': True,
+    },
+    'low-latency': {
+        'queue_size': 1,
+        'leaky': 'downstream',
+        'bypass_size': 1,
+        'batch_size': 1,
+        'sync': False,
+    },
+    'throughput': {
+        'queue_size': 8,
+        'bypass_size': 40,
+        'batch_size': 4,
+        'decode_threads': 4,
+        'scale_threads': 4,
+        'convert_threads': 4,
+    },
+}
+LEAKY_MODES = ('no', 'upstream', 'downstream')
+
+# hailonet NMS settings. If TAPPAS version is 3.26.0 or higher, use the following parameters:
+DEFAULT_THRESHOLDS = {
+    'nms_score_threshold': 0.3,
+    'nms_iou_threshold': 0.45,
+    'output_format_type': 'HAILO_FORMAT_TYPE_FLOAT32',
+}
+# else (TAPPAS version is 3.25.0)
+# DEFAULT_THRESHOLDS = {}
+
+
+def get_source_type(input_source):
+    # This function will return the source type based on the input source
+    # return values can be "file", "rpi", "usb" or "test" (videotestsrc)
+    if input_source.startswith("/dev/video"):
+        return 'usb'
+    if input_source.startswith("rpi"):
+        return 'rpi'
+    if input_source in ('test', 'videotestsrc'):
+        return 'test'
+    return 'file'
+
+
+def get_profile(name='default', **overrides):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown pipeline profile: {name} (expected one of {', '.join(PROFILES)})")
+    profile = dict(PROFILES['default'])
+    profile.update(PROFILES[name])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    return profile
+
+
+class PipelineError(ValueError):
+    pass
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    value = str(value)
+    if not value or any(c in value for c in ' !,="<>'):
+        return '"' + value.replace('"', '\\"') + '"'
+    return value
+
+
+class Element:
+    # One GStreamer element: factory name, optional element name and properties. Property
+    # names use underscores in Python and are written with dashes (max_size_buffers ->
+    # max-size-buffers).
+    def __init__(self, factory, name=None, **properties):
+        self.factory = factory
+        self.name = name
+        self.properties = properties
+
+    def describe(self):
+        parts = [self.factory]
+        if self.name is not None:
+            parts.append(f"name={self.name}")
+        # Pad properties keep the pad name: src_0::input_streams -> src_0::input-streams
+        parts += [f"{key.rpartition('::')[0] + '::' if '::' in key else ''}{key.rpartition('::')[2].replace('_', '-')}="
+                  f"{format_value(value)}" for key, value in self.properties.items()]
+        return ' '.join(parts)
+
+
+class Caps:
+    # A caps filter between two elements, e.g. Caps('video/x-raw', format='RGB', width=640)
+    def __init__(self, media_type, **fields):
+        self.media_type = media_type
+        self.fields = fields
+
+    def describe(self):
+        fields = [f"{key.replace('_', '-')}={value}" for key, value in self.fields.items()]
+        return ', '.join([self.media_type] + fields)
+
+
+class Pad:
+    # A reference to a named element's pad: Pad('hmux', 'sink_0') is hmux.sink_0, Pad('t') is
+    # 't.' (any free pad of t)
+    def __init__(self, element, pad=''):
+        self.element = element
+        self.pad = pad
+
+    def describe(self):
+        return f"{self.element}.{self.pad}"
+
+
+class PipelineDescription:
+    # A pipeline as a list of branches, each a chain of Elements and Caps that may start and/or
+    # end at a Pad of an element defined in another branch. validate() checks the graph before
+    # anything is handed to Gst.parse_launch; to_string() renders the launch line.
+    def __init__(self):
+        self.branches = []
+
+    def add_branch(self, *items):
+        self.branches.append(list(items))
+        return self
+
+    def elements(self):
+        return [item for branch in self.branches for item in branch if isinstance(item, Element)]
+
+    def find(self, name):
+        for element in self.elements():
+            if element.name == name:
+                return element
+        return None
+
+    def validate(self, gst=None):
+        # Structural checks always; with the Gst module passed in, also that every factory is
+        # installed. Raises PipelineError listing every problem found.
+        errors = []
+        names = [element.name for element in self.elements() if element.name is not None]
+        for name in sorted(set(name for name in names if names.count(name) > 1)):
+            errors.append(f"element name {name} is used more than once")
+        for i, branch in enumerate(self.branches):
+            if not branch:
+                errors.append(f"branch {i} is empty")
+                continue
+            for position, item in enumerate(branch):
+                if isinstance(item, Pad):
+                    if item.element not in names:
+                        errors.append(f"branch {i} links to {item.describe()}, but there is no element {item.element}")
+                    if 0 < position < len(branch) - 1:
+                        errors.append(f"branch {i} has pad {item.describe()} in the middle")
+                elif isinstance(item, Caps):
+                    if position == 0 or position == len(branch) - 1:
+                        errors.append(f"branch {i} starts or ends with caps {item.describe()}")
+            for previous, item in zip(branch, branch[1:]):
+                if isinstance(previous, Caps) and isinstance(item, Caps):
+                    errors.append(f"branch {i} has two caps filters in a row")
+        for element in self.elements():
+            if element.factory == 'queue':
+                for key in ('max_size_buffers', 'max_size_bytes', 'max_size_time'):
+                    if element.properties.get(key, 0) < 0:
+                        errors.append(f"queue {element.name} has negative {key}")
+                if element.properties.get('leaky', 'no') not in LEAKY_MODES:
+                    errors.append(f"queue {element.name} has unknown leaky mode {element.properties['leaky']}")
+            if element.factory == 'hailonet':
+                hef_path = element.properties.get('hef_path')
+                if not hef_path or not os.path.exists(hef_path):
+                    errors.append(f"hailonet hef-path {hef_path} does not exist")
+                if element.properties.get('batch_size', 1) < 1:
+                    errors.append(f"hailonet batch-size must be at least 1")
+            if element.factory == 'hailofilter' and not os.path.exists(element.properties.get('so_path', '')):
+                errors.append(f"hailofilter so-path {element.properties.get('so_path')} does not exist")
+            if gst is not None and gst.ElementFactory.find(element.factory) is None:
+                errors.append(f"GStreamer element {element.factory} is not installed")
+        if errors:
+            raise PipelineError("Invalid pipeline:\n  " + "\n  ".join(errors))
+        return self
+
+    def to_string(self):
+        branches = []
+        for branch in self.branches:
+            branches.append(' ! '.join(item.describe() for item in branch))
+        return ' '.join(branches)
+
+
+def callback_names(streams=1):
+    # Names of the identity elements the callback probes: one per stream
+    if streams == 1:
+        return ['identity_callback']
+    return [f'identity_callback_{i}' for i in range(streams)]
+
+
+def queue(name, profile, max_size_buffers=None, leaky=None):
+    # Queue sized by the profile; leaky=False keeps it lossless whatever the profile says
+    properties = {
+        'max_size_buffers': profile['queue_size'] if max_size_buffers is None else max_size_buffers,
+        'max_size_bytes': 0,
+        'max_size_time': 0,
+    }
+    mode = profile['leaky'] if leaky is None else ('no' if leaky is False else leaky)
+    if mode != 'no':
+        properties['leaky'] = mode
+    return Element('queue', name, **properties)
+
+
+def source_branch(source_type, video_source, profile, suffix=''):
+    # Source, scale and convert to the network format. suffix distinguishes several sources.
+    if source_type == 'rpi':
+        items = [Element('libcamerasrc', f'src{suffix or "_0"}', auto_focus_mode=2),
+                 Caps('video/x-raw', format=profile['network_format'], width=1536, height=864),
+                 queue(f'queue_src_scale{suffix}', profile),
+                 Element('videoscale'),
+                 Caps('video/x-raw', format=profile['network_format'], width=profile['network_width'],
+                      height=profile['network_height'], framerate='30/1')]
+    elif source_type == 'usb':
+        items = [Element('v4l2src', f'src{suffix or "_0"}', device=video_source),
+                 Caps('video/x-raw', width=640, height=480, framerate='30/1')]
+    elif source_type == 'test':
+        # Moving test pattern at camera rate, for runs without a camera
+        items = [Element('videotestsrc', f'src{suffix or "_0"}', is_live=True, pattern='ball'),
+                 Caps('video/x-raw', width=640, height=480, framerate='30/1')]
+    else:
+        items = [Element('filesrc', f'src{suffix or "_0"}', location=video_source),
+                 queue(f'queue_dec264{suffix}', profile),
+                 Element('qtdemux'), Element('h264parse'),
+                 Element('avdec_h264', max_threads=profile['decode_threads']),
+                 Caps('video/x-raw', format='I420')]
+    items += [queue(f'queue_scale{suffix}', profile),
+              Element('videoscale', n_threads=profile['scale_threads']),
+              queue(f'queue_src_convert{suffix}', profile),
+              Element('videoconvert', f'src_convert{suffix}', n_threads=profile['convert_threads']),
+              Caps('video/x-raw', format=profile['network_format'], width=profile['network_width'],
+                   height=profile['network_height'], pixel_aspect_ratio='1/1')]
+    return items
+
+
+def detection_pipeline(source_type, video_source, hef_path, postprocess_so, network_name, profile,
+                       thresholds=None, sink=None, show_fps=False, overlay=True):
+    # The detection app's graph: source -> tee -> (bypass | hailonet -> hailofilter) ->
+    # hailomuxer -> identity_callback -> overlay -> sink. sink is a list of items ending the
+    # display branch; by default fpsdisplaysink on xvimagesink. overlay=False drops the
+    # overlay and its conversion when nobody looks at the output.
+    thresholds = thresholds or {}
+    if sink is None:
+        sink = [Element('fpsdisplaysink', 'hailo_display', video_sink='xvimagesink', sync=profile['sync'],
+                        text_overlay=show_fps, signal_fps_measurements=True)]
+    description = PipelineDescription()
+    description.add_branch(Element('hailomuxer', 'hmux'))
+    description.add_branch(*source_branch(source_type, video_source, profile),
+                           Element('tee', 't'),
+                           queue('bypass_queue', profile, profile['bypass_size'], leaky=False), Pad('hmux', 'sink_0'))
+    description.add_branch(Pad('t'), queue('queue_hailonet', profile, leaky=False),
+                           Element('videoconvert', n_threads=profile['convert_threads']),
+                           Element('hailonet', 'hailonet', hef_path=hef_path, batch_size=profile['batch_size'], **thresholds),
+                           queue('queue_hailofilter', profile, leaky=False),
+                           Element('hailofilter', 'hailofilter', function_name=network_name, so_path=postprocess_so, qos=False),
+                           queue('queue_hmuc', profile, leaky=False), Pad('hmux', 'sink_1'))
+    display = [Pad('hmux'), queue('queue_hailo_python', profile), queue('queue_user_callback', profile),
+               Element('identity', 'identity_callback')]
+    if overlay:
+        display += [queue('queue_hailooverlay', profile), Element('hailooverlay'),
+                    queue('queue_videoconvert', profile),
+                    Element('videoconvert', n_threads=profile['convert_threads'])]
+    description.add_branch(*display, queue('queue_hailo_display', profile), *sink)
+    return description
+
+
+def multi_source_pipeline(sources, hef_path, postprocess_so, network_name, profile, thresholds=None, sink=None,
+                          show_fps=False, overlay=True):
+    # Several cameras sharing one hailonet. sources is a list of (source_type, video_source);
+    # each gets its own source/scale/convert branch into hailoroundrobin, which interleaves
+    # the streams and tags every buffer with its sink pad (the stream id). hailonet runs them
+    # batch-size=len(sources) at a time, and hailostreamrouter splits the result back into one
+    # display branch per stream, each with its own identity_callback_<i> (see callback_names).
+    # sink is a function of the stream index returning the items ending that stream's branch.
+    # With a single source this is just detection_pipeline.
+    if len(sources) == 1:
+        source_type, video_source = sources[0]
+        return detection_pipeline(source_type, video_source, hef_path, postprocess_so, network_name, profile,
+                                  thresholds, None if sink is None else sink(0), show_fps, overlay)
+    thresholds = thresholds or {}
+    if sink is None:
+        def sink(i):
+            return [Element('fpsdisplaysink', f'hailo_display_{i}', video_sink='xvimagesink', sync=profile['sync'],
+                            text_overlay=show_fps, signal_fps_measurements=True)]
+    routes = {f'src_{i}::input_streams': f'<sink_{i}>' for i in range(len(sources))}
+    description = PipelineDescription()
+    # mode=0 waits for every stream in turn, so a batch holds one frame of each camera
+    description.add_branch(Element('hailoroundrobin', 'fun', mode=0),
+                           queue('queue_hailonet', profile, leaky=False),
+                           Element('videoconvert', n_threads=profile['convert_threads']),
+                           Element('hailonet', 'hailonet', hef_path=hef_path, batch_size=len(sources), **thresholds),
+                           queue('queue_hailofilter', profile, leaky=False),
+                           Element('hailofilter', 'hailofilter', function_name=network_name, so_path=postprocess_so, qos=False),
+                           queue('queue_hailo_router', profile, leaky=False),
+                           Element('hailostreamrouter', 'sid', **routes))
+    names = callback_names(len(sources))
+    for i, (source_type, video_source) in enumerate(sources):
+        description.add_branch(*source_branch(source_type, video_source, profile, f'_{i}'), Pad('fun', f'sink_{i}'))
+        display = [Pad('sid', f'src_{i}'), queue(f'queue_hailo_python_{i}', profile),
+                   queue(f'queue_user_callback_{i}', profile), Element('identity', names[i])]
+        if overlay:
+            display += [queue(f'queue_hailooverlay_{i}', profile), Element('hailooverlay'),
+                        queue(f'queue_videoconvert_{i}', profile),
+                        Element('videoconvert', n_threads=profile['convert_threads'])]
+        description.add_branch(*display, queue(f'queue_hailo_display_{i}', profile), *sink(i))
+    return description
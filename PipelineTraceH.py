@@ -0,0 +1,188 @@
+import threading
+import time
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+import numpy as np
+from HistogramH import LatencyHistogram
+
+# Trace points along the detection path (see PipelineH.detection_pipeline), in order. Each is
+# the src pad of the named element; the stage between two points is named after the later one.
+# Points missing from the pipeline are skipped.
+DETECTION_TRACE_POINTS = (
+    ('src_0', 'capture'),
+    ('src_convert', 'scale + convert'),
+    ('queue_hailonet', 'tee + queue_hailonet'),
+    ('hailonet', 'hailonet'),
+    ('hailofilter', 'queue + hailofilter'),
+    ('hmux', 'queue + hailomuxer'),
+    ('identity_callback', 'queues + python callback'),
+    ('queue_hailo_display', 'overlay + convert + queue'),
+)
+
+
+def stream_trace_points(source_id):
+    # The same path for one camera of PipelineH.multi_source_pipeline. The shared stages key
+    # buffers by PTS too, so streams are told apart only as long as their PTS differ (true for
+    # live cameras, not for files started together).
+    return (
+        (f'src_{source_id}', 'capture'),
+        (f'src_convert_{source_id}', 'scale + convert'),
+        ('queue_hailonet', 'roundrobin + queue_hailonet'),
+        ('hailonet', 'hailonet'),
+        ('hailofilter', 'queue + hailofilter'),
+        (f'identity_callback_{source_id}', 'router + queues + python callback'),
+        (f'queue_hailo_display_{source_id}', 'overlay + convert + queue'),
+    )
+
+
+class PipelineTracer:
+    # Per-stage latency and queue occupancy for a running pipeline. A buffer probe on each trace
+    # point stamps the time a buffer passed, keyed by its PTS (which the elements on the path
+    # keep); once a buffer reaches the last point, the gaps between consecutive points go into
+    # one LatencyHistogram per stage. A background thread samples every queue's fill level.
+    # The probes cost a dict lookup and an array store per buffer per point.
+    def __init__(self, pipeline, points=DETECTION_TRACE_POINTS, max_in_flight=256, sample_interval=0.1,
+                 history=600, report_interval=0, log=print):
+        self.pipeline = pipeline
+        # With report_interval set, the sampler thread also logs report() that often
+        self.report_interval = report_interval
+        self.log = log
+        self.points = []
+        for name, stage in points:
+            element = pipeline.get_by_name(name)
+            if element is not None and element.get_static_pad('src') is not None:
+                self.points.append((name, stage, element.get_static_pad('src')))
+        self.stages = {stage: LatencyHistogram() for _, stage, _ in self.points[1:]}
+        self.total = LatencyHistogram()
+        self.max_in_flight = max_in_flight
+        # PTS -> time at each point (NaN where the buffer has not been seen)
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.evicted = 0
+        self.probe_ids = []
+
+        # Queue fill levels: one row per sample, ring of `history` samples
+        self.queues = [element for element in self.iterate_elements()
+                       if element.get_factory() is not None and element.get_factory().get_name() == 'queue']
+        self.queue_names = [queue.get_name() for queue in self.queues]
+        self.queue_capacity = np.array([queue.get_property('max-size-buffers') for queue in self.queues])
+        self.sample_interval = sample_interval
+        self.levels = np.zeros((history, len(self.queues)), dtype=np.int32)
+        self.sample_times = np.zeros(history)
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def iterate_elements(self):
+        elements = []
+        iterator = self.pipeline.iterate_recurse()
+        while True:
+            result, element = iterator.next()
+            if result != Gst.IteratorResult.OK:
+                break
+            elements.append(element)
+        return elements
+
+    def start(self):
+        for index, (_, _, pad) in enumerate(self.points):
+            self.probe_ids.append((pad, pad.add_probe(Gst.PadProbeType.BUFFER, self.on_buffer, index)))
+        if self.thread is None and (self.queues or self.report_interval):
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        for pad, probe_id in self.probe_ids:
+            pad.remove_probe(probe_id)
+        self.probe_ids = []
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def on_buffer(self, pad, info, index):
+        now = time.perf_counter()
+        buffer = info.get_buffer()
+        if buffer is None or buffer.pts == Gst.CLOCK_TIME_NONE:
+            return Gst.PadProbeReturn.OK
+        pts = buffer.pts
+        with self.lock:
+            times = self.in_flight.get(pts)
+            if times is None:
+                if len(self.in_flight) >= self.max_in_flight:
+                    # Buffers dropped on the way (leaky queues) never reach the last point
+                    del self.in_flight[next(iter(self.in_flight))]
+                    self.evicted += 1
+                times = self.in_flight[pts] = np.full(len(self.points), np.nan)
+            times[index] = now
+            if index == len(self.points) - 1:
+                del self.in_flight[pts]
+                self.completed += 1
+            else:
+                return Gst.PadProbeReturn.OK
+        self.record(times)
+        return Gst.PadProbeReturn.OK
+
+    def record(self, times):
+        seen = np.flatnonzero(~np.isnan(times))
+        for before, after in zip(seen, seen[1:]):
+            # A gap over skipped points is charged to the later stage
+            self.stages[self.points[after][1]].record(times[after] - times[before])
+        if seen.size > 1:
+            self.total.record(times[seen[-1]] - times[seen[0]])
+
+    def run(self):
+        last_report = time.perf_counter()
+        while not self.stop_event.wait(self.sample_interval):
+            self.sample()
+            if self.report_interval and time.perf_counter() - last_report >= self.report_interval:
+                last_report = time.perf_counter()
+                self.report()
+
+    def sample(self):
+        row = self.samples % len(self.levels)
+        self.levels[row] = [queue.get_property('current-level-buffers') for queue in self.queues]
+        self.sample_times[row] = time.perf_counter()
+        self.samples += 1
+
+    def queue_levels(self, last=None):
+        # (times, levels) of the last `last` samples (all kept ones by default), oldest first
+        count = min(self.samples, len(self.levels))
+        if last is not None:
+            count = min(count, last)
+        rows = np.arange(self.samples - count, self.samples) % len(self.levels)
+        return self.sample_times[rows], self.levels[rows]
+
+    def summary(self):
+        _, levels = self.queue_levels()
+        queues = {}
+        for i, name in enumerate(self.queue_names):
+            column = levels[:, i] if levels.size else np.zeros(1)
+            queues[name] = {
+                'capacity': int(self.queue_capacity[i]),
+                'mean': float(column.mean()),
+                'max': int(column.max()),
+                'full_fraction': float(np.mean(column >= self.queue_capacity[i])) if self.queue_capacity[i] else 0.0,
+            }
+        return {
+            'stages': {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            'total': self.total.summary(),
+            'completed': self.completed,
+            'evicted': self.evicted,
+            'queues': queues,
+        }
+
+    def report(self, log=None):
+        log = log or self.log
+        summary = self.summary()
+        log(f"Pipeline trace: {summary['completed']} buffers traced, {summary['evicted']} lost on the way")
+        for stage, stats in list(summary['stages'].items()) + [('total', summary['total'])]:
+            if stats['count']:
+                log(f"  {stage:28s} mean {stats['mean'] * 1000:7.2f} ms  p50 {stats['p50'] * 1000:7.2f} ms  "
+                    f"p99 {stats['p99'] * 1000:7.2f} ms  max {stats['max'] * 1000:7.2f} ms")
+        for name, stats in summary['queues'].items():
+            log(f"  {name:28s} fill mean {stats['mean']:5.2f} max {stats['max']:3d} / {stats['capacity']:3d}, "
+                f"full {stats['full_fraction'] * 100:3.0f}% of samples")
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class AlphaBetaPredictor:
+    # Constant-velocity alpha-beta filter, one per element, all updated with one set of array
+    # operations. Measurements carry the time their frame was captured, and predict(t)
+    # extrapolates the filtered state to any later time, so the gaze loop can aim at where the
+    # target will be when the servos get there instead of where it was when the frame was taken.
+    # Gaps are handled by the variable dt; after max_gap without a measurement (lost track) the
+    # filter restarts from the next one, and extrapolation never runs further than max_horizon
+    # past the last measurement, so a dropped or lost target coasts briefly and then holds.
+    def __init__(self, size, alpha=0.5, beta=0.1, max_gap=0.5, max_horizon=0.25, reset_distance=np.inf):
+        self.alpha = alpha
+        self.beta = beta
+        self.max_gap = max_gap
+        self.max_horizon = max_horizon
+        # A residual this large is a new target rather than motion: jump to it, zero velocity
+        self.reset_distance = reset_distance
+        self.position = np.zeros(size)
+        self.velocity = np.zeros(size)
+        self.time = None
+        # Smoothed capture-to-arrival latency, from the received times passed to update()
+        self.latency = 0.0
+        self.latency_samples = 0
+        self.latency_smoothing = 0.1
+
+    def reset(self, position, timestamp):
+        self.position[:] = position
+        self.velocity[:] = 0.0
+        self.time = timestamp
+
+    def update(self, measurement, timestamp, received=None):
+        # measurement may contain NaN for elements not seen in this frame; they keep predicting
+        if received is not None and received >= timestamp:
+            latency = received - timestamp
+            weight = 1.0 if self.latency_samples == 0 else self.latency_smoothing
+            self.latency += weight * (latency - self.latency)
+            self.latency_samples += 1
+        measurement = np.asarray(measurement, dtype=float)
+        if self.time is None or timestamp - self.time > self.max_gap:
+            self.reset(np.where(np.isnan(measurement), self.position, measurement), timestamp)
+            return self.position
+        dt = timestamp - self.time
+        if dt <= 0:
+            # Out of order or repeated frame
+            return self.position
+        predicted = self.position + self.velocity * dt
+        residual = np.nan_to_num(measurement - predicted)
+        jumped = np.abs(residual) > self.reset_distance
+        self.position = np.where(jumped, measurement, predicted + self.alpha * residual)
+        self.velocity = np.where(jumped, 0.0, self.velocity + (self.beta / dt) * residual)
+        self.time = timestamp
+        return self.position
+
+    def predict(self, at):
+        if self.time is None:
+            return self.position.copy()
+        horizon = min(max(at - self.time, 0.0), self.max_horizon)
+        return self.position + self.velocity * horizon
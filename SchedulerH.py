@@ -0,0 +1,102 @@
+import asyncio
+import time
+import numpy as np
+
+
+class TickStats:
+    def __init__(self, history=1024):
+        # Ring buffers of the most recent tick periods and deadline lateness, in seconds
+        self.periods = np.zeros(history)
+        self.lateness = np.zeros(history)
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_start = None
+
+    def record(self, start, deadline):
+        index = self.ticks % self.history
+        self.lateness[index] = start - deadline
+        self.periods[index] = np.nan if self.last_start is None else start - self.last_start
+        self.last_start = start
+        self.ticks += 1
+
+    def summary(self):
+        n = min(self.ticks, self.history)
+        result = {'ticks': self.ticks, 'overruns': self.overruns, 'skipped': self.skipped}
+        # Ticks right after a (re)start have no previous start, so they carry no period
+        periods = self.periods[:n][~np.isnan(self.periods[:n])]
+        for name, values in (('period', periods), ('jitter', self.lateness[:n])):
+            if values.size == 0:
+                continue
+            result[f'{name}_min'] = float(values.min())
+            result[f'{name}_mean'] = float(values.mean())
+            result[f'{name}_p99'] = float(np.percentile(values, 99))
+            result[f'{name}_max'] = float(values.max())
+        return result
+
+
+class FixedRateScheduler:
+    # Paces a loop on absolute deadlines (start + n * period) instead of sleeping a fixed
+    # delay after the work, so the cost of each tick does not accumulate as drift.
+    # On overrun, 'skip' drops the missed ticks and realigns to the grid, 'catchup' runs
+    # the missed ticks back to back (at most max_catchup of them).
+    def __init__(self, rate_hz=100, overrun_policy='skip', max_catchup=3, history=1024, clock=time.perf_counter):
+        if overrun_policy not in ('skip', 'catchup'):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        self.period = 1.0 / rate_hz
+        self.overrun_policy = overrun_policy
+        self.max_catchup = max_catchup
+        self.clock = clock
+        self.stats = TickStats(history)
+        self.next_deadline = None
+
+    def set_rate(self, rate_hz):
+        # Safe while a loop sleeps in wait(): the grid is re-anchored one new period from now
+        # instead of dropped, and that tick carries on from there at the new rate
+        self.period = 1.0 / rate_hz
+        if self.next_deadline is not None:
+            self.next_deadline = self.clock() + self.period
+        self.stats.last_start = None
+
+    def restart(self):
+        # Start a fresh deadline grid, e.g. when a loop resumes after idling
+        self.next_deadline = None
+        self.stats.last_start = None
+
+    def reset(self):
+        self.stats.reset()
+        self.next_deadline = None
+
+    async def wait(self):
+        # Sleep until the next deadline; returns the number of ticks skipped to get there
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now + self.period
+        skipped = 0
+        if now > self.next_deadline:
+            self.stats.overruns += 1
+            missed = int((now - self.next_deadline) // self.period)
+            if self.overrun_policy == 'skip':
+                skipped = missed + 1
+            else:
+                skipped = max(0, missed - self.max_catchup)
+            self.next_deadline += skipped * self.period
+            self.stats.skipped += skipped
+        deadline = self.next_deadline
+        delay = deadline - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Catching up: still yield so other tasks are not starved
+            await asyncio.sleep(0)
+        # set_rate() or restart() may have moved the grid while this tick slept; keep theirs
+        if self.next_deadline is None:
+            self.next_deadline = self.clock() + self.period
+        elif self.next_deadline == deadline:
+            self.next_deadline += self.period
+        self.stats.record(self.clock(), deadline)
+        return skipped
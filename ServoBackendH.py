@@ -0,0 +1,165 @@
+import os
+import time
+import numpy as np
+from PCA9685BusH import MODE1, LED0_ON_L, REGISTERS_PER_CHANNEL
+
+# Select the PCA9685 driver: 'hardware' (adafruit_pca9685 on the Pi I2C bus) or 'simulated'
+BACKEND_ENV = 'SERVO_BACKEND'
+BACKENDS = ('hardware', 'simulated')
+
+PRESCALE = 0xFE
+REFERENCE_CLOCK_SPEED = 25000000
+# Start + stop conditions, and 9 clocks (8 data bits + ACK) per byte including the address byte
+I2C_FRAMING_BITS = 2
+I2C_BITS_PER_BYTE = 9
+
+
+class SimulatedI2CDevice:
+    # Stands in for adafruit_bus_device.I2CDevice. Every write is recorded as
+    # (timestamp, register, payload bytes). With clock_hz set, the transfer time of each write
+    # is added to bus_time, and with realtime=True the write also blocks for that long.
+    def __init__(self, registers, clock_hz=None, realtime=False, clock=time.perf_counter):
+        self.registers = registers
+        self.clock_hz = clock_hz
+        self.realtime = realtime
+        self.clock = clock
+        self.writes = []
+        self.bus_time = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def transfer_time(self, length):
+        if not self.clock_hz:
+            return 0.0
+        return (I2C_FRAMING_BITS + I2C_BITS_PER_BYTE * (1 + length)) / self.clock_hz
+
+    def write(self, buffer, start=0, end=None):
+        data = bytes(buffer[start:end])
+        duration = self.transfer_time(len(data))
+        if self.realtime and duration:
+            time.sleep(duration)
+        self.bus_time += duration
+        register, payload = data[0], data[1:]
+        self.writes.append((self.clock(), register, payload))
+        # The simulated chip always auto-increments
+        self.registers[register:register + len(payload)] = payload
+
+    def write_then_readinto(self, out_buffer, in_buffer, out_start=0, out_end=None, in_start=0, in_end=None):
+        register = out_buffer[out_start]
+        end = len(in_buffer) if in_end is None else in_end
+        in_buffer[in_start:end] = self.registers[register:register + end - in_start]
+
+    def clear(self):
+        self.writes = []
+        self.bus_time = 0.0
+
+
+class SimulatedChannel:
+    def __init__(self, pca, index):
+        self.pca = pca
+        self.index = index
+
+    @property
+    def duty_cycle(self):
+        base = LED0_ON_L + REGISTERS_PER_CHANNEL * self.index
+        on, off = np.frombuffer(bytes(self.pca.registers[base:base + 4]), dtype='<u2')
+        if on & 0x1000:
+            return 0xFFFF
+        return int(off) << 4
+
+    @duty_cycle.setter
+    def duty_cycle(self, value):
+        # Same register encoding and one-transaction-per-channel cost as adafruit_pca9685
+        if value == 0xFFFF:
+            on, off = 0x1000, 0
+        else:
+            on, off = 0, (value + 1) >> 4
+        buffer = bytes([LED0_ON_L + REGISTERS_PER_CHANNEL * self.index]) + np.array([on, off], dtype='<u2').tobytes()
+        with self.pca.i2c_device as i2c:
+            i2c.write(buffer)
+
+
+class SimulatedPCA9685:
+    # Register-level model of the parts of adafruit_pca9685.PCA9685 that ServoController uses
+    def __init__(self, i2c=None, address=0x40, reference_clock_speed=REFERENCE_CLOCK_SPEED, clock_hz=None,
+                 realtime=False):
+        self.address = address
+        self.reference_clock_speed = reference_clock_speed
+        self.registers = bytearray(256)
+        self.i2c_device = SimulatedI2CDevice(self.registers, clock_hz, realtime)
+        self.channels = [SimulatedChannel(self, i) for i in range(16)]
+        self.reset()
+
+    def reset(self):
+        self.mode1_reg = 0x00
+
+    def read_register(self, register):
+        buffer = bytearray(1)
+        with self.i2c_device as i2c:
+            i2c.write_then_readinto(bytes([register]), buffer)
+        return buffer[0]
+
+    def write_register(self, register, value):
+        with self.i2c_device as i2c:
+            i2c.write(bytes([register, value]))
+
+    @property
+    def mode1_reg(self):
+        return self.read_register(MODE1)
+
+    @mode1_reg.setter
+    def mode1_reg(self, value):
+        self.write_register(MODE1, value)
+
+    @property
+    def frequency(self):
+        return self.reference_clock_speed / 4096 / self.read_register(PRESCALE)
+
+    @frequency.setter
+    def frequency(self, freq):
+        prescale = int(self.reference_clock_speed / 4096.0 / freq + 0.5)
+        if prescale < 3:
+            raise ValueError("PCA9685 cannot output at the given frequency")
+        old_mode = self.mode1_reg
+        self.mode1_reg = (old_mode & 0x7F) | 0x10  # Sleep
+        self.write_register(PRESCALE, prescale)
+        self.mode1_reg = old_mode
+        self.mode1_reg = old_mode | 0xA0  # Restart, auto-increment
+
+    def deinit(self):
+        self.reset()
+
+
+def get_backend(backend=None):
+    backend = backend or os.environ.get(BACKEND_ENV, 'hardware')
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown servo backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def create_i2c(bus=None, backend=None):
+    # Open an I2C bus for the hardware backend: the default board.SCL/SDA bus, or a numbered
+    # /dev/i2c-N bus through adafruit_extended_bus. The simulated backend needs no bus object.
+    if get_backend(backend) == 'simulated':
+        return None
+    if bus is None:
+        import busio
+        from board import SCL, SDA
+        return busio.I2C(SCL, SDA)
+    from adafruit_extended_bus import ExtendedI2C
+    return ExtendedI2C(bus)
+
+
+def create_pca(i2c=None, backend=None, address=0x40, bus=None, **simulation_options):
+    # Build the PCA9685 driver for the selected backend. The hardware modules are only
+    # imported here so the simulated backend runs on machines without board/busio.
+    if get_backend(backend) == 'simulated':
+        return SimulatedPCA9685(i2c, address, **simulation_options)
+    from adafruit_pca9685 import PCA9685
+    if i2c is None:
+        i2c = create_i2c(bus, backend)
+    return PCA9685(i2c, address=address)
@@ -0,0 +1,129 @@
+import threading
+import time
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('channel', '<u2'),
+    ('angle', '<f4'),
+    ('count', '<u2'),
+])
+
+
+class TelemetryRecorder:
+    # Preallocated ring of (timestamp, channel, angle, count) records. The control loop only
+    # copies arrays in; formatting and I/O happen in a drain, off the control path.
+    def __init__(self, capacity=8192, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        # Total records ever written and read; positions in the ring are these modulo capacity
+        self.written = 0
+        self.read = 0
+        self.dropped = 0
+
+    def record(self, channels, angles, counts, timestamp=None):
+        n = len(channels)
+        if n == 0:
+            return
+        if n > self.capacity:
+            channels, angles, counts = channels[-self.capacity:], angles[-self.capacity:], counts[-self.capacity:]
+            n = self.capacity
+        start = self.written % self.capacity
+        index = (start + np.arange(n)) % self.capacity if start + n > self.capacity else slice(start, start + n)
+        self.records['timestamp'][index] = self.clock() if timestamp is None else timestamp
+        self.records['channel'][index] = channels
+        self.records['angle'][index] = angles
+        self.records['count'][index] = counts
+        # Publish only after the records are in place
+        self.written += n
+
+    def drain(self):
+        # Returns the records written since the last drain, oldest first. Records overwritten
+        # before they could be read are counted in dropped.
+        written = self.written
+        first = max(self.read, written - self.capacity)
+        self.dropped += first - self.read
+        positions = np.arange(first, written) % self.capacity
+        records = self.records[positions]
+        # The writer may have lapped us while copying; discard anything it overwrote
+        overwritten = self.written - self.capacity - first
+        if overwritten > 0:
+            records = records[overwritten:]
+            self.dropped += min(overwritten, written - first)
+        self.read = written
+        return records
+
+    def latest(self):
+        # Most recent angle and count per channel seen in the ring, without consuming it
+        n = min(self.written, self.capacity)
+        records = self.records[np.arange(self.written - 1, self.written - n - 1, -1) % self.capacity]
+        channels, first = np.unique(records['channel'], return_index=True)
+        return {int(channel): (float(records['angle'][i]), int(records['count'][i])) for channel, i in zip(channels, first)}
+
+
+class TelemetryDrain:
+    # Background thread that periodically drains a recorder into a sink: sink(records) is
+    # called with each non-empty batch. Without a sink the batches are kept in self.batches.
+    def __init__(self, recorder, interval=0.5, sink=None):
+        self.recorder = recorder
+        self.interval = interval
+        self.batches = []
+        self.sink = sink if sink is not None else self.batches.append
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        records = self.recorder.drain()
+        if records.size:
+            self.handle(records)
+
+    def handle(self, records):
+        self.sink(records)
+
+
+class BinaryTelemetryDrain(TelemetryDrain):
+    # Appends raw RECORD_DTYPE records to a file; read back with np.fromfile(path, RECORD_DTYPE)
+    def __init__(self, recorder, path, interval=0.5):
+        TelemetryDrain.__init__(self, recorder, interval)
+        self.path = path
+        self.file = open(path, 'ab')
+
+    def handle(self, records):
+        records.tofile(self.file)
+        self.file.flush()
+
+    def stop(self):
+        TelemetryDrain.stop(self)
+        self.file.close()
+
+
+class LogTelemetryDrain(TelemetryDrain):
+    # At most one line per interval: record count and the last angle written per channel
+    def __init__(self, recorder, interval=1.0, log=print):
+        TelemetryDrain.__init__(self, recorder, interval)
+        self.log = log
+
+    def handle(self, records):
+        # Last occurrence of each channel in this batch
+        channels, last = np.unique(records['channel'][::-1], return_index=True)
+        angles = ", ".join(f"{channel}: {records['angle'][::-1][i]:.1f}" for channel, i in zip(channels, last))
+        self.log(f"Servo writes: {records.size} (dropped {self.recorder.dropped}) angles {{{angles}}}")
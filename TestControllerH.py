@@ -1,13 +1,14 @@
-from servo_controller import ServoController
+from ControllerH import ServoController
+from TelemetryH import LogTelemetryDrain
 import asyncio
 import time
-import busio
-from board import SCL, SDA
 
 async def main():
     # Create an instance of the ServoController
-    i2c = busio.I2C(SCL, SDA)
-    servo_controller = ServoController(i2c)
+    servo_controller = ServoController()
+
+    # Print a once-a-second summary of the servo writes instead of one line per step
+    LogTelemetryDrain(servo_controller.telemetry).start()
 
     # Set the minimum and maximum angles for each servo
     min_angles = [0, 0, 0, 0, 0, 0, 0, 0]
@@ -20,8 +21,8 @@ async def main():
     servo_controller.set_absolute_angle(0, 90)  # Set servo 0 to 90 degrees
     servo_controller.set_fractional_angle(1, 0.25)  # Set servo 1 to 25% of its range
 
-    # Start the servo controller
-    asyncio.create_task(servo_controller.run())
+    # Start the persistent control loop; it picks up every new target below as it is set
+    servo_controller.start()
 
     # Continuously update target angles in a loop
     while True:
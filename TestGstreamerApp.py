@@ -1,115 +1,31 @@
+import time
+# Launch time, for the startup report (time to first servo command and first frame)
+START_TIME = time.perf_counter()
 import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gst', '1.0')
 from gi.repository import Gtk, Gdk, GLib, Gst
-from servo_controller import ServoController
-from eye_data_controller import EyeDataController
+from EyeControllerH import EyeDataController
+from DetectionBridgeH import DetectionBridge
+from CallbackStatsH import StatsReporter
+from PipelineTraceH import DETECTION_TRACE_POINTS, PipelineTracer, stream_trace_points
+from PipelineH import DEFAULT_THRESHOLDS, PROFILES, PipelineError, callback_names, get_profile, get_source_type, \
+    multi_source_pipeline
+from DetectionCallbackH import app_callback_class, attach_callbacks
 import asyncio
-import busio
-from board import SCL, SDA
 import threading
 import os
 import argparse
-import multiprocessing
-import numpy as np
-import setproctitle
-import cv2
-import time
+# cv2 is only needed with --use-frame and is slow to import; see import_frame_modules()
+cv2 = None
 
-# Try to import hailo python module
-try:
-    import hailo
-except ImportError:
-    exit("Failed to import hailo python module. Make sure you are in hailo virtual environment.")
-from hailo_common_funcs import get_numpy_from_buffer, disable_qos
-
-# -----------------------------------------------------------------------------------------------
-# User defined class to be used in the callback function
-# -----------------------------------------------------------------------------------------------
-# a sample class to be used in the callback function alowwing to count the number of frames
-class app_callback_class:
-    def __init__(self):
-        self.frame_count = 0
-        self.use_frame = False
-        self.frame_queue = multiprocessing.Queue(maxsize=3)
-        self.running = True
-
-    def increment(self):
-        self.frame_count += 1
-
-    def get_count(self):
-        return self.frame_count 
-
-    def set_frame(self, frame):
-        if not self.frame_queue.full():
-            self.frame_queue.put(frame)
-
-        
-    def get_frame(self):
-        if not self.frame_queue.empty():
-            return self.frame_queue.get()
-        else:
-            return None
+def import_frame_modules():
+    global cv2
+    import cv2
 
 # Create an instance of the class
 user_data = app_callback_class()
-
-# -----------------------------------------------------------------------------------------------
-# User defined callback function
-# -----------------------------------------------------------------------------------------------
-
-# This is the callback function that will be called when data is available from the pipeline
-
-def app_callback(pad, info, user_data):
-    # Get the GstBuffer from the probe info
-    buffer = info.get_buffer()
-    # Check if the buffer is valid
-    if buffer is None:
-        return Gst.PadProbeReturn.OK
-        
-    # using the user_data to count the number of frames
-    user_data.increment()
-    string_to_print = f"Frame count: {user_data.get_count()}\n"
-    
-    caps = pad.get_current_caps()
-    if caps:
-        # We can now extract information from the caps
-        structure = caps.get_structure(0)
-        if structure:
-            # Extracting some common properties
-            format = structure.get_value('format')
-            width = structure.get_value('width')
-            height = structure.get_value('height')
-            # string_to_print += (f"Frame format: {format}, width: {width}, height: {height}\n")
-                    
-    # If the user_data.use_frame is set to True, we can get the video frame from the buffer
-    frame = None
-    if user_data.use_frame:
-        # get video frame
-        frame = get_numpy_from_buffer(buffer, format, width, height)
-    
-    # get the detections from the buffer
-    roi = hailo.get_roi_from_buffer(buffer)
-    detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-    
-    # parse the detections
-    for detection in detections:
-        label = detection.get_label()
-        bbox = detection.get_bbox()
-        confidence = detection.get_confidence()
-        if label == "person":
-            string_to_print += (f"Detection: {label} {confidence:.2f}\n")
-    
-    if user_data.use_frame:
-        # Note: using imshow will not work here, as the callback function is not running in the main thread
-    	# Convert the frame to BGR
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        user_data.set_frame(frame)
-
-    print(string_to_print)
-    return Gst.PadProbeReturn.OK
-    # Additional option is Gst.PadProbeReturn.DROP to drop the buffer not passing in to the rest of the pipeline
-    # See more options in Gstreamer documentation
+user_data.start_time = START_TIME
 
 # This function is used to display the user data frame
 def display_user_data_frame(user_data):
@@ -120,61 +36,43 @@ def display_user_data_frame(user_data):
             cv2.waitKey(1)
         time.sleep(0.02)
     
-# Default parameters
-
-network_width = 640
-network_height = 640
-network_format = "RGB"
-video_sink = "xvimagesink"
-batch_size = 1
-
-# If TAPPAS version is 3.26.0 or higher, use the following parameters:
-nms_score_threshold=0.3 
-nms_iou_threshold=0.45
-thresholds_str=f"nms-score-threshold={nms_score_threshold} nms-iou-threshold={nms_iou_threshold} output-format-type=HAILO_FORMAT_TYPE_FLOAT32"
-# else (TAPPAS version is 3.25.0)
-# thresholds_str=""
+# Network size, queue depths, batch size and thread counts come from the pipeline profile
+# (see PipelineH.PROFILES, picked with --profile); NMS thresholds from PipelineH.DEFAULT_THRESHOLDS
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Detection App")
-    parser.add_argument("--input", "-i", type=str, default="/dev/video0", help="Input source. Can be a file, USB or RPi camera (CSI camera module). \
-                        For RPi camera use '-i rpi'. \
+    parser.add_argument("--input", "-i", type=str, action="append", help="Input source. Can be a file, USB or RPi camera (CSI camera module). \
+                        For RPi camera use '-i rpi'. Repeat for several cameras, batched through one hailonet. \
                         Defaults to /dev/video0")
     parser.add_argument("--use-frame", "-u", action="store_true", help="Use frame from the callback function")
     parser.add_argument("--show-fps", "-f", action="store_true", help="Print FPS on sink")
     parser.add_argument("--disable-sync", action="store_true", help="Disables display sink sync, will run as fast possible.")
     parser.add_argument("--dump-dot", action="store_true", help="Dump the pipeline graph to a dot file pipeline.dot")
-    return parser.parse_args()
-
-def QUEUE(name, max_size_buffers=3, max_size_bytes=0, max_size_time=0):
-    return f"queue name={name} max-size-buffers={max_size_buffers} max-size-bytes={max_size_bytes} max-size-time={max_size_time} ! "
-
-def get_source_type(input_source):
-    # This function will return the source type based on the input source
-    # return values can be "file", "mipi" or "usb"
-    if input_source.startswith("/dev/video"):
-        # check if the device is available
-
-        return 'usb'
-    else:
-        if input_source.startswith("rpi"):
-            return 'rpi'
-        else:
-            return 'file'
-  
+    parser.add_argument("--profile", default="default", choices=list(PROFILES), help="Pipeline tuning profile")
+    parser.add_argument("--hef-path", default=None, help="HEF file; can also be chosen in the app")
+    parser.add_argument("--trace", action="store_true", help="Trace per-stage latency and queue fill levels, reported every 5 s")
+    args = parser.parse_args()
+    args.input = args.input or ["/dev/video0"]
+    return args
 
 class GStreamerApp(Gtk.Window):
     def __init__(self, args):
         Gtk.Window.__init__(self, title="Hailo Detection App")
+        self.options_menu = args
         self.set_default_size(800, 600)
         self.set_border_width(10)
         self.set_icon_from_file("path/to/icon.png")
 
-        # Create an instance of the ServoController or EyeDataController
-        i2c = busio.I2C(SCL, SDA)
-        self.servo_controller = ServoController(i2c)
-        # or
-        # self.eye_data_controller = EyeDataController()
+        # Detections drive the gaze through the EyeDataController and its ServoController.
+        # The PCA9685 backend is picked by $SERVO_BACKEND ('hardware' or 'simulated'); the I2C
+        # bus is only opened when the servos first move
+        self.eye_data_controller = EyeDataController()
+        self.servo_controller = self.eye_data_controller.servo_controller
+        user_data.bridge = DetectionBridge(self.eye_data_controller)
+
+        # The servo and gaze loops run on their own asyncio loop thread, next to the GLib loop
+        self.control_loop = asyncio.new_event_loop()
+        threading.Thread(target=self.control_loop.run_forever, daemon=True).start()
 
         # Create a vertical box to hold the widgets
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
@@ -246,6 +144,7 @@ class GStreamerApp(Gtk.Window):
         vbox.pack_end(self.status_bar, False, False, 0)
 
         # Set the process title
+        import setproctitle
         setproctitle.setproctitle("Hailo Detection App")
         
         # Initialize variables
@@ -257,31 +156,27 @@ class GStreamerApp(Gtk.Window):
         self.postprocess_dir = os.path.join(tappas_workspace, 'apps/h8/gstreamer/libs/post_processes')
         self.default_postprocess_so = os.path.join(self.postprocess_dir, 'libyolo_hailortpp_post.so')
         self.default_network_name = "yolov5"
-        self.video_source = self.options_menu.input
-        self.source_type = get_source_type(self.video_source)
-        self.hef_path = None
+        self.sources = [(get_source_type(video_source), video_source) for video_source in self.options_menu.input]
+        user_data.set_streams(len(self.sources))
+        user_data.live_source = all(source_type != 'file' for source_type, _ in self.sources)
+        self.hef_path = self.options_menu.hef_path
+        if self.hef_path is not None:
+            self.hef_label.set_label(self.hef_path)
+        # --disable-sync overrides the profile's display sync
+        self.profile = get_profile(self.options_menu.profile, sync=False if self.options_menu.disable_sync else None)
         
         # Set user data parameters
         user_data.use_frame = self.options_menu.use_frame
-
-        if (self.options_menu.disable_sync):
-            self.sync = "false" 
-        else:
-            self.sync = "true"
+        if user_data.use_frame:
+            import_frame_modules()
+            user_data.open_frame_ring((self.profile['network_height'], self.profile['network_width'], 3))
         
         if (self.options_menu.dump_dot):
             os.environ["GST_DEBUG_DUMP_DOT_DIR"] = self.current_path
         
-        # Initialize GStreamer        
+        # Initialize GStreamer; the pipeline is created once a HEF file is chosen (see prepare_pipeline)
         Gst.init(None)
-        
-        # Create a GStreamer pipeline 
-        self.pipeline = self.create_pipeline()
-        
-        # connect to hailo_display fps-measurements
-        if (self.options_menu.show_fps):
-            print("Showing FPS")
-            self.pipeline.get_by_name("hailo_display").connect("fps-measurements", self.on_fps_measurement)
+        self.pipeline = None
 
         # Create a GLib Main Loop
         self.loop = GLib.MainLoop()
@@ -320,6 +215,14 @@ class GStreamerApp(Gtk.Window):
         # Set the HEF path in the options menu
         self.options_menu.hef_path = self.hef_path
 
+        # Build and validate the pipeline for this HEF file
+        try:
+            self.prepare_pipeline()
+        except PipelineError as e:
+            print(e)
+            self.update_status(str(e))
+            return
+
         # Create a new thread to run the detection pipeline
         detection_thread = threading.Thread(target=self.run_detection)
         detection_thread.daemon = True
@@ -327,10 +230,11 @@ class GStreamerApp(Gtk.Window):
 
     def on_stop_button_clicked(self, button):
         # Stop the detection pipeline
-        self.pipeline.set_state(Gst.State.NULL)
+        if self.pipeline is not None:
+            self.pipeline.set_state(Gst.State.NULL)
         
-        # Reset the servo positions
-        asyncio.run(self.servo_controller.homing())
+        # Stop tracking and reset the servo positions
+        self.run_control(self.stop_control())
 
     def on_open_clicked(self, menu_item):
         # Handle the "Open" menu item click
@@ -338,10 +242,11 @@ class GStreamerApp(Gtk.Window):
 
     def on_quit_clicked(self, menu_item):
         # Stop the detection pipeline
-        self.pipeline.set_state(Gst.State.NULL)
+        if self.pipeline is not None:
+            self.pipeline.set_state(Gst.State.NULL)
         
-        # Reset the servo positions
-        asyncio.run(self.servo_controller.homing())
+        # Stop tracking and reset the servo positions
+        self.run_control(self.stop_control())
         
         # Quit the app
         Gtk.main_quit()
@@ -356,12 +261,33 @@ class GStreamerApp(Gtk.Window):
         about_dialog.run()
         about_dialog.destroy()
 
+    def run_control(self, coroutine):
+        # Run coroutine on the control loop thread and wait for it
+        return asyncio.run_coroutine_threadsafe(coroutine, self.control_loop).result()
+
+    async def start_control(self):
+        # Move the servos to their default positions, then start tracking
+        await self.servo_controller.homing()
+        self.eye_data_controller.start()
+
+    async def stop_control(self):
+        await self.eye_data_controller.stop()
+        await self.servo_controller.homing()
+
+    def print_latency_report(self):
+        latency = self.servo_controller.frame_latency
+        print(f"Frame to servo write latency: {latency.summary()}")
+        for upper_edge, count in latency.buckets():
+            print(f"  <= {upper_edge * 1000:8.2f} ms: {count}")
+
     def run_detection(self):
-        # Move the servos to their default positions
-        asyncio.run(self.servo_controller.homing())
+        self.run_control(self.start_control())
+        if self.servo_controller.first_write_time is not None:
+            print(f"Startup: first servo command {self.servo_controller.first_write_time - START_TIME:.3f} s after launch")
 
         # Run the detection pipeline
         self.run()
+        self.print_latency_report()
 
     def update_status(self, message):
         context_id = self.status_bar.get_context_id("status")
@@ -371,14 +297,27 @@ class GStreamerApp(Gtk.Window):
         print(f"FPS: {fps:.2f}, Droprate: {droprate:.2f}, Avg FPS: {avgfps:.2f}")
         return True
 
+    def prepare_pipeline(self):
+        if self.pipeline is not None:
+            self.pipeline.set_state(Gst.State.NULL)
+        self.pipeline = self.create_pipeline()
+        user_data.pipeline = self.pipeline
+
+        # connect to hailo_display fps-measurements
+        if (self.options_menu.show_fps):
+            print("Showing FPS")
+            for name in self.display_names():
+                self.pipeline.get_by_name(name).connect("fps-measurements", self.on_fps_measurement)
+
     def create_pipeline(self):
-        pipeline_string = self.get_pipeline_string()
+        # The description is validated (graph, files, installed elements) before parse_launch
+        description = self.get_pipeline_description().validate(Gst)
+        pipeline_string = description.to_string()
+        print(pipeline_string)
         try:
             pipeline = Gst.parse_launch(pipeline_string)
         except Exception as e:
-            print(e)
-            print(pipeline_string)
-            exit(1)
+            raise PipelineError(f"{e}\n{pipeline_string}")
         return pipeline
     
     def bus_call(self, bus, message, loop):
@@ -392,50 +331,19 @@ class GStreamerApp(Gtk.Window):
             loop.quit()
         return True
     
+    def display_names(self):
+        # One fpsdisplaysink per camera
+        if len(self.sources) == 1:
+            return ["hailo_display"]
+        return [f"hailo_display_{i}" for i in range(len(self.sources))]
+
+    def get_pipeline_description(self):
+        return multi_source_pipeline(self.sources, self.hef_path, self.default_postprocess_so,
+                                     self.default_network_name, self.profile, DEFAULT_THRESHOLDS,
+                                     show_fps=self.options_menu.show_fps)
+
     def get_pipeline_string(self):
-        if (self.source_type == "rpi"):
-            source_element = f"libcamerasrc name=src_0 auto-focus-mode=2 ! "
-            source_element += f"video/x-raw, format={network_format}, width=1536, height=864 ! "
-            source_element += QUEUE("queue_src_scale")
-            source_element += f"videoscale ! "
-            source_element += f"video/x-raw, format={network_format}, width={network_width}, height={network_height}, framerate=30/1 ! "
-        
-        elif (self.source_type == "usb"):
-            source_element = f"v4l2src device={self.video_source} name=src_0 ! "
-            source_element += f"video/x-raw, width=640, height=480, framerate=30/1 ! "
-        else:  
-            source_element = f"filesrc location={self.video_source} name=src_0 ! "
-            source_element += QUEUE("queue_dec264")
-            source_element += f" qtdemux ! h264parse ! avdec_h264 max-threads=2 ! "
-            source_element += f" video/x-raw,format=I420 ! "
-        source_element += QUEUE("queue_scale")
-        source_element += f" videoscale n-threads=2 ! "
-        source_element += QUEUE("queue_src_convert")
-        source_element += f" videoconvert n-threads=3 name=src_convert ! "
-        source_element += f"video/x-raw, format={network_format}, width={network_width}, height={network_height}, pixel-aspect-ratio=1/1 ! "
-        
-        
-        pipeline_string = "hailomuxer name=hmux "
-        pipeline_string += source_element
-        pipeline_string += "tee name=t ! "
-        pipeline_string += QUEUE("bypass_queue", max_size_buffers=20) + "hmux.sink_0 "
-        pipeline_string += "t. ! " + QUEUE("queue_hailonet")
-        pipeline_string += "videoconvert n-threads=3 ! "
-        pipeline_string += f"hailonet hef-path={self.hef_path} batch-size={batch_size} {thresholds_str} ! "
-        pipeline_string += QUEUE("queue_hailofilter")
-        pipeline_string += f"hailofilter function-name={self.default_network_name} so-path={self.default_postprocess_so} qos=false ! "
-        pipeline_string += QUEUE("queue_hmuc") + " hmux.sink_1 "
-        pipeline_string += "hmux. ! " + QUEUE("queue_hailo_python")
-        pipeline_string += QUEUE("queue_user_callback")
-        pipeline_string += f"identity name=identity_callback ! "
-        pipeline_string += QUEUE("queue_hailooverlay")
-        pipeline_string += f"hailooverlay ! "
-        pipeline_string += QUEUE("queue_videoconvert")
-        pipeline_string += f"videoconvert n-threads=3 ! "
-        pipeline_string += QUEUE("queue_hailo_display")
-        pipeline_string += f"fpsdisplaysink video-sink={video_sink} name=hailo_display sync={self.sync} text-overlay={self.options_menu.show_fps} signal-fps-measurements=true "
-        print(pipeline_string)
-        return pipeline_string
+        return self.get_pipeline_description().to_string()
     
     def dump_dot_file(self):
         print("Dumping dot file...")
@@ -448,24 +356,30 @@ class GStreamerApp(Gtk.Window):
         bus.add_signal_watch()
         bus.connect("message", self.bus_call, self.loop)
 
-        # Connect pad probe to the identity element
-        identity = self.pipeline.get_by_name("identity_callback")
-        identity_pad = identity.get_static_pad("src")
-        identity_pad.add_probe(Gst.PadProbeType.BUFFER, app_callback, user_data)
+        # Connect pad probes to the identity elements, one per camera
+        attach_callbacks(self.pipeline, user_data, callback_names(len(self.sources)))
+        stats_reporter = StatsReporter(user_data.stats).start()
+        # With several cameras, the first one's path is traced
+        trace_points = DETECTION_TRACE_POINTS if len(self.sources) == 1 else stream_trace_points(0)
+        tracer = PipelineTracer(self.pipeline, trace_points, report_interval=5).start() if self.options_menu.trace else None
         
         # get xvimagesink element and disable qos
         # xvimagesink is instantiated by fpsdisplaysink
-        hailo_display = self.pipeline.get_by_name("hailo_display")
-        xvimagesink = hailo_display.get_by_name("xvimagesink0")
-        xvimagesink.set_property("qos", False)
+        for name in self.display_names():
+            xvimagesink = self.pipeline.get_by_name(name).get_property("video-sink")
+            xvimagesink.set_property("qos", False)
         
-        # Disable QoS to prevent frame drops
+        # Disable QoS to prevent frame drops. Imported here, once the window is up, because it
+        # pulls in the Hailo modules
+        from hailo_common_funcs import disable_qos
         disable_qos(self.pipeline)
 
         
-        # Set Timed callback to display user data frame
+        # Display the user data frames from their own thread
+        display_thread = None
         if (self.options_menu.use_frame):
-            GLib.timeout_add_seconds(0.03, display_user_data_frame, user_data)
+            display_thread = threading.Thread(target=display_user_data_frame, args=(user_data,), daemon=True)
+            display_thread.start()
 
         # Set pipeline to PLAYING state
         self.pipeline.set_state(Gst.State.PLAYING)
@@ -482,6 +396,15 @@ class GStreamerApp(Gtk.Window):
 
         # Clean up
         self.pipeline.set_state(Gst.State.NULL)
+        stats_reporter.stop()
+        if tracer is not None:
+            tracer.stop()
+            tracer.report()
+        user_data.running = False
+        # The display thread may be copying out of the ring; let it finish before closing it
+        if display_thread is not None:
+            display_thread.join()
+        user_data.close_frame_ring()
 
 if __name__ == "__main__":
     args = parse_arguments()
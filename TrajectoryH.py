@@ -0,0 +1,168 @@
+import numpy as np
+
+PROFILES = ('trapezoidal', 'minimum_jerk')
+
+
+def sample_segments(start, segments, dt):
+    # segments: list of (duration, start_velocity, acceleration) constant-acceleration pieces.
+    # Returns positions and velocities sampled every dt, the last sample landing on the end.
+    durations = np.array([segment[0] for segment in segments], dtype=float)
+    total = durations.sum()
+    if total <= 0:
+        return np.zeros(0), np.zeros(0)
+    count = max(1, int(np.ceil(total / dt - 1e-9)))
+    times = np.minimum(np.arange(1, count + 1) * dt, total)
+
+    velocities = np.array([segment[1] for segment in segments], dtype=float)
+    accelerations = np.array([segment[2] for segment in segments], dtype=float)
+    ends = np.cumsum(durations)
+    starts = ends - durations
+    # Position at the start of each segment
+    offsets = start + np.concatenate([[0.0], np.cumsum(velocities * durations + 0.5 * accelerations * durations ** 2)[:-1]])
+
+    index = np.minimum(np.searchsorted(ends, times, side='left'), len(segments) - 1)
+    tau = times - starts[index]
+    positions = offsets[index] + velocities[index] * tau + 0.5 * accelerations[index] * tau ** 2
+    speeds = velocities[index] + accelerations[index] * tau
+    return positions, speeds
+
+
+def trapezoidal_segments(distance, start_velocity, max_velocity, max_acceleration):
+    # Time-optimal segments from (0, start_velocity) to (distance, 0) under the velocity and
+    # acceleration limits.
+    if distance < 0 or (distance == 0 and start_velocity < 0):
+        mirrored = trapezoidal_segments(-distance, -start_velocity, max_velocity, max_acceleration)
+        return [(duration, -velocity, -acceleration) for duration, velocity, acceleration in mirrored]
+    a = max_acceleration
+    if start_velocity < 0 or start_velocity ** 2 / (2 * a) > distance:
+        # Moving away, or too fast to stop in time: brake to rest first, then plan from there
+        stop_time = abs(start_velocity) / a
+        braking = (stop_time, start_velocity, -np.sign(start_velocity) * a)
+        remaining = distance - start_velocity * stop_time / 2
+        return [braking] + trapezoidal_segments(remaining, 0.0, max_velocity, max_acceleration)
+
+    segments = []
+    peak = min(max_velocity, np.sqrt(a * distance + start_velocity ** 2 / 2))
+    ramp_time = abs(peak - start_velocity) / a
+    ramp_distance = (start_velocity + peak) / 2 * ramp_time
+    stop_time = peak / a
+    cruise_distance = max(0.0, distance - ramp_distance - peak * stop_time / 2)
+    if ramp_time > 0:
+        segments.append((ramp_time, start_velocity, np.sign(peak - start_velocity) * a))
+    if cruise_distance > 0 and peak > 0:
+        segments.append((cruise_distance / peak, peak, 0.0))
+    if stop_time > 0:
+        segments.append((stop_time, peak, -a))
+    return segments
+
+
+def trapezoidal_profile(start, end, max_velocity, max_acceleration, dt, start_velocity=0.0):
+    segments = trapezoidal_segments(end - start, start_velocity, max_velocity, max_acceleration)
+    positions, velocities = sample_segments(start, segments, dt)
+    if positions.size:
+        positions[-1] = end
+        velocities[-1] = 0.0
+    return positions, velocities
+
+
+def minimum_jerk_profile(start, end, max_velocity, max_acceleration, dt, start_velocity=0.0):
+    # Quintic from (start, start_velocity, 0) to (end, 0, 0). The duration is the shortest one
+    # whose rest-to-rest peak velocity (1.875 D/T) and acceleration (5.774 D/T^2) stay in limits.
+    distance = end - start
+    if distance == 0 and start_velocity == 0:
+        return np.zeros(0), np.zeros(0)
+    duration = max(1.875 * abs(distance) / max_velocity,
+                   np.sqrt(5.7735 * abs(distance) / max_acceleration),
+                   abs(start_velocity) / max_acceleration,
+                   dt)
+    count = int(np.ceil(duration / dt - 1e-9))
+    duration = count * dt
+    t = np.arange(1, count + 1) * dt
+    T = duration
+    a3 = (20 * distance - 12 * start_velocity * T) / (2 * T ** 3)
+    a4 = (-30 * distance + 16 * start_velocity * T) / (2 * T ** 4)
+    a5 = (12 * distance - 6 * start_velocity * T) / (2 * T ** 5)
+    positions = start + start_velocity * t + a3 * t ** 3 + a4 * t ** 4 + a5 * t ** 5
+    velocities = start_velocity + 3 * a3 * t ** 2 + 4 * a4 * t ** 3 + 5 * a5 * t ** 4
+    positions[-1] = end
+    velocities[-1] = 0.0
+    return positions, velocities
+
+
+class TrajectoryPlanner:
+    # Plans one profile per channel when its target changes and plays the precomputed
+    # samples back one per tick. Profiles live in a (channels x samples) buffer so a tick
+    # samples every channel with a single fancy-indexing lookup.
+    def __init__(self, num_channels=8, capacity=256):
+        self.num_channels = num_channels
+        self.enabled = np.zeros(num_channels, dtype=bool)
+        self.max_velocities = np.full(num_channels, 180.0)  # degrees per second
+        self.max_accelerations = np.full(num_channels, 720.0)  # degrees per second squared
+        self.profiles = ['trapezoidal'] * num_channels
+        self.goals = np.full(num_channels, np.nan)
+        self.positions = np.zeros((num_channels, capacity))
+        self.velocities = np.zeros((num_channels, capacity))
+        self.lengths = np.zeros(num_channels, dtype=np.int64)
+        self.indices = np.zeros(num_channels, dtype=np.int64)
+        # Tick period each profile was sampled at
+        self.periods = np.zeros(num_channels)
+
+    def configure(self, channel, max_velocity, max_acceleration, profile='trapezoidal'):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown trajectory profile: {profile}")
+        if max_velocity <= 0 or max_acceleration <= 0:
+            raise ValueError("max_velocity and max_acceleration must be positive")
+        self.enabled[channel] = True
+        self.max_velocities[channel] = max_velocity
+        self.max_accelerations[channel] = max_acceleration
+        self.profiles[channel] = profile
+        self.goals[channel] = np.nan
+
+    def disable(self, channel):
+        self.enabled[channel] = False
+        self.lengths[channel] = 0
+        self.indices[channel] = 0
+        self.goals[channel] = np.nan
+
+    def current_velocity(self, channel):
+        index = self.indices[channel]
+        if 0 < index < self.lengths[channel]:
+            return float(self.velocities[channel, index - 1])
+        return 0.0
+
+    def plan(self, channel, start, goal, dt):
+        if self.profiles[channel] == 'minimum_jerk':
+            build = minimum_jerk_profile
+        else:
+            build = trapezoidal_profile
+        positions, velocities = build(float(start), float(goal), self.max_velocities[channel],
+                                      self.max_accelerations[channel], dt, self.current_velocity(channel))
+        if positions.size > self.positions.shape[1]:
+            self.grow(positions.size)
+        self.positions[channel, :positions.size] = positions
+        self.velocities[channel, :velocities.size] = velocities
+        self.lengths[channel] = positions.size
+        self.indices[channel] = 0
+        self.goals[channel] = goal
+        self.periods[channel] = dt
+
+    def stale(self, dt):
+        # Channels whose profile is still playing but was sampled at another tick period; replan
+        # them from where they are, or every remaining sample moves them at the wrong speed
+        return (self.indices < self.lengths) & (self.periods != dt)
+
+    def grow(self, capacity):
+        capacity = max(capacity, 2 * self.positions.shape[1])
+        for name in ('positions', 'velocities'):
+            old = getattr(self, name)
+            new = np.zeros((self.num_channels, capacity))
+            new[:, :old.shape[1]] = old
+            setattr(self, name, new)
+
+    def advance(self, mask):
+        # Returns the channels that play a sample this tick, their positions, and whether
+        # each still has samples left afterwards
+        channels = np.flatnonzero(mask & (self.indices < self.lengths))
+        positions = self.positions[channels, self.indices[channels]]
+        self.indices[channels] += 1
+        return channels, positions, self.indices[channels] < self.lengths[channels]
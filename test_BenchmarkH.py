@@ -0,0 +1,29 @@
+import argparse
+from BenchmarkH import STANDARD_MOVES, run_benchmarks
+
+
+def small_args(**overrides):
+    args = dict(channels=4, rate=1000, ticks=200, repeats=1, smoothing=0.3, max_velocity=0, max_acceleration=720,
+                profile='trapezoidal', boards=2, bus_clock=400000, realtime_bus=False, startup_runs=1, output=None)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_benchmarks_report_every_section():
+    results = run_benchmarks(small_args())
+    assert results['tick_rate']['ticks'] == 200
+    assert set(results['moves']) == set(STANDARD_MOVES)
+    large, small = results['moves']['large'], results['moves']['small']
+    assert large['ticks'] >= small['ticks']
+    assert large['recorded_writes'] == large['transactions']
+    assert large['bus_time_s'] > 0
+    assert results['latency']['target_to_first_write_s']['count'] == len(STANDARD_MOVES)
+    assert results['startup']['first_command_s']['count'] == 1
+
+
+def test_planned_moves_respect_the_velocity_limit():
+    results = run_benchmarks(small_args(max_velocity=900, max_acceleration=18000, startup_runs=0))
+    large = results['moves']['large']
+    assert large['settle_time_s'] >= STANDARD_MOVES['large'] / 900
+    # Mostly cruising at the limit; the ramps at this acceleration add little
+    assert large['settle_time_s'] < 2 * STANDARD_MOVES['large'] / 900
@@ -0,0 +1,68 @@
+import asyncio
+import time
+import numpy as np
+from BlinkH import BLINK_SHAPES, BlinkPlayer
+from ControllerH import ServoController
+
+
+def blink_ticks(controller, player):
+    player.trigger('blink')
+    ticks = 0
+    while controller.step():
+        ticks += 1
+        assert ticks < 10000
+    return ticks
+
+
+def make_player(rate_hz):
+    controller = ServoController(num_channels=2, rate_hz=rate_hz, backend='simulated')
+    player = BlinkPlayer(controller, [0, 1], closed_fraction=1.0, auto_blink=False)
+    return controller, player
+
+
+def blink_seconds(name='blink'):
+    close, hold, open_, _ = BLINK_SHAPES[name][0]
+    return close + hold + open_
+
+
+def test_blink_lasts_its_duration():
+    controller, player = make_player(100)
+    assert abs(blink_ticks(controller, player) * controller.scheduler.period - blink_seconds()) < 0.02
+
+
+def test_blink_duration_follows_tick_rate_changes():
+    controller, player = make_player(100)
+    controller.set_tick_rate(50)
+    assert abs(blink_ticks(controller, player) * controller.scheduler.period - blink_seconds()) < 0.04
+
+
+def test_lids_return_to_base():
+    controller, player = make_player(100)
+    controller.set_absolute_angles([90, 90])
+    while controller.step():
+        pass
+    blink_ticks(controller, player)
+    assert np.all(controller.output_offsets == 0)
+
+
+def test_rate_change_during_blink_in_running_loop():
+    async def run():
+        controller, player = make_player(100)
+        controller.start()
+        await asyncio.wait_for(controller.wait_idle(), 2.0)
+        start = time.perf_counter()
+        player.trigger('slow_blink')
+        await asyncio.sleep(0.2)
+        assert player.is_blinking()
+        controller.set_tick_rate(200)
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(controller.wait_idle(), 2.0)
+        elapsed = time.perf_counter() - start
+        assert controller.is_running()
+        assert player.period == controller.scheduler.period == 0.005
+        # The blink kept its length in time, not in ticks
+        assert abs(elapsed - blink_seconds('slow_blink')) < 0.1
+        assert np.all(controller.output_offsets == 0)
+        await controller.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from CalibrationH import MAX_COUNT, ServoCalibration
+from EyeControllerH import EyeDataController
+
+
+def test_default_map_matches_old_table():
+    calibration = ServoCalibration(2)
+    assert list(calibration.to_counts([0, 90])) == [0, round(90 / 180 * MAX_COUNT)]
+
+
+def test_angles_clamp_to_limits():
+    calibration = ServoCalibration(1)
+    calibration.set_limits(0, 30, 60)
+    assert calibration.to_counts([0])[0] == calibration.to_counts([30])[0]
+    assert calibration.to_counts([170])[0] == calibration.to_counts([60])[0]
+
+
+def test_limits_outside_pulse_range_raise():
+    calibration = ServoCalibration(1)
+    with pytest.raises(ValueError):
+        calibration.set_limits(0, 0, 250)
+    # The failed call leaves the limits as they were
+    assert calibration.max_angles[0] == 180
+
+
+def test_baseline_config_gives_servo_pulses():
+    controller = EyeDataController(backend='simulated')
+    servo_controller = controller.servo_controller
+    for fraction in np.linspace(0, 1, 5):
+        angles = servo_controller.min_angles + (servo_controller.max_angles - servo_controller.min_angles) * fraction
+        counts = servo_controller.calibration.to_counts(angles)
+        # 1-2.5 ms pulses in the 20 ms period, nowhere near FULL_ON
+        pulse_ms = counts / MAX_COUNT * 20
+        assert np.all(counts < MAX_COUNT)
+        assert np.all((pulse_ms > 1.0) & (pulse_ms < 2.5))
+
+
+def test_config_reload_rejects_bad_limits():
+    controller = EyeDataController(backend='simulated')
+    with pytest.raises(ValueError):
+        controller.apply_config({'servo_0_max': 5000.0})
+    assert controller.ConfigData['servo_0_max'] == 390.0
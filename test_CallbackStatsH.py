@@ -0,0 +1,67 @@
+import time
+from CallbackStatsH import AggregateCallbackStats, CallbackStats, StatsReporter
+
+
+def test_aggregate_sums_per_source_stats():
+    sources = [CallbackStats(), CallbackStats()]
+    sources[0].frames, sources[0].detections = 3, 6
+    sources[1].frames, sources[1].detections = 2, 1
+    sources[0].probe_time.record(1e-4)
+    sources[1].probe_time.record(2e-4)
+    stats = AggregateCallbackStats(sources)
+    assert stats.frames == 5
+    assert stats.detections == 7
+    assert stats.stream_frames == [3, 2]
+    assert stats.probe_time.summary()['count'] == 2
+    assert stats.snapshot()[1:] == (5, 7, 0, 0, (3, 2))
+
+
+def test_reporter_logs_fps_per_source():
+    sources = [CallbackStats(), CallbackStats()]
+    stats = AggregateCallbackStats(sources)
+    lines = []
+    reporter = StatsReporter(stats, log=lines.append)
+    for source in sources:
+        source.frames += 10
+        source.probe_time.record(1e-5)
+    reporter.report()
+    assert len(lines) == 2
+    assert lines[1].startswith("FPS per source")
+
+
+def count_frames(stats, frames, detections, persons, frames_with_person):
+    stats.frames += frames
+    stats.detections += detections
+    stats.persons += persons
+    stats.frames_with_person += frames_with_person
+    for _ in range(frames):
+        stats.probe_time.record(5e-5)
+
+
+def test_reporter_logs_rates_since_the_last_report():
+    stats = CallbackStats()
+    count_frames(stats, 10, 40, 40, 10)
+    lines = []
+    reporter = StatsReporter(stats, log=lines.append)
+    count_frames(stats, 30, 15, 10, 6)
+    reporter.report()
+    assert len(lines) == 1
+    assert "detections/frame: 0.50, persons/frame: 0.33 (in 20% of frames)" in lines[0]
+    assert "probe: p50 50 us" in lines[0]
+    # Nothing new, nothing logged
+    reporter.report()
+    assert len(lines) == 1
+
+
+def test_reporter_thread_reports_until_stopped():
+    stats = CallbackStats()
+    lines = []
+    reporter = StatsReporter(stats, interval=0.01, log=lines.append).start()
+    count_frames(stats, 5, 0, 0, 0)
+    time.sleep(0.05)
+    count_frames(stats, 5, 0, 0, 0)
+    reporter.stop()
+    assert reporter.thread is None
+    assert len(lines) >= 1
+    # stop() logs whatever arrived after the last periodic report
+    assert reporter.previous[1] == 10
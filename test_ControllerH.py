@@ -0,0 +1,138 @@
+import asyncio
+import numpy as np
+import pytest
+from ControllerH import ServoController
+
+
+def make_controller(num_channels=8):
+    controller = ServoController(num_channels=num_channels, backend='simulated')
+    controller.open()
+    return controller
+
+
+def test_short_list_sets_first_channels():
+    controller = make_controller()
+    controller.set_absolute_angles([10, 20, 30])
+    assert list(controller.target_angles) == [10, 20, 30, 0, 0, 0, 0, 0]
+
+
+def test_channel_selection_and_nan():
+    controller = make_controller()
+    controller.set_absolute_angles(90)
+    controller.set_absolute_angles([45, np.nan], channels=[2, 3])
+    mask = np.zeros(8, dtype=bool)
+    mask[5] = True
+    controller.set_fractional_angles(0.0, mask=mask)
+    assert list(controller.target_angles) == [90, 90, 45, 90, 90, 0, 90, 90]
+
+
+def test_mask_picks_from_full_length_values():
+    controller = make_controller()
+    controller.set_angle_limits(3, 20, 120)
+    mask = np.zeros(8, dtype=bool)
+    mask[[1, 3]] = True
+    controller.set_fractional_angles(np.linspace(0, 1, 8), mask=mask)
+    assert controller.target_angles[1] == pytest.approx(180 / 7)
+    assert controller.target_angles[3] == pytest.approx(20 + 100 * 3 / 7)
+    assert np.count_nonzero(controller.target_angles) == 2
+
+
+def test_masked_update_is_swapped_in_whole():
+    controller = make_controller()
+    before = controller.target_angles
+    controller.set_absolute_angles([30, 60], channels=[4, 5])
+    # Ticks keep the array they started with; the update is a new one
+    assert controller.target_angles is not before
+    assert not before.any()
+
+
+def test_targets_clamp_to_limits():
+    controller = make_controller()
+    controller.set_angle_limits(0, 20, 160)
+    controller.set_absolute_angles([200, -10], channels=[0, 1])
+    assert controller.target_angles[0] == 160
+    assert controller.target_angles[1] == 0
+
+
+def test_control_loop_reaches_targets():
+    controller = make_controller()
+    controller.set_absolute_angles([30, 60])
+    ticks = 0
+    while controller.step() and ticks < 1000:
+        ticks += 1
+    assert list(controller.current_angles[:2]) == [30, 60]
+    # The chip holds 12-bit off times, written as (count + 1) >> 4
+    written = [controller.pca.channels[i].duty_cycle >> 4 for i in range(2)]
+    assert written == list((controller.calibration.to_counts([30, 60], [0, 1]) + 1) >> 4)
+
+
+def test_frame_latency_only_for_moved_channels():
+    controller = make_controller()
+    controller.set_absolute_angles([0, 0], channels=[0, 1], source_time=1.0)
+    # Nothing moved, so the update carries no latency sample
+    assert controller.source_time is None
+    controller.set_absolute_angles([10], channels=[0], source_time=2.0)
+    # A write of another channel (e.g. a blink) is not charged with it
+    controller.write_channels(np.array([5]))
+    assert controller.frame_latency.summary()['count'] == 0
+    controller.step()
+    assert controller.frame_latency.summary()['count'] == 1
+    assert controller.source_time is None
+
+
+def test_rate_change_replans_active_profiles():
+    controller = make_controller()
+    controller.set_motion_limits(0, 90.0, 360.0)
+    controller.set_absolute_angles(90, channels=[0])
+    positions = []
+    for _ in range(30):
+        controller.step()
+        positions.append((controller.current_angles[0], controller.scheduler.period))
+    controller.set_tick_rate(400)
+    ticks = 0
+    while controller.step() and ticks < 10000:
+        positions.append((controller.current_angles[0], controller.scheduler.period))
+        ticks += 1
+    assert controller.current_angles[0] == 90
+    angles = np.array([angle for angle, _ in positions])
+    periods = np.array([period for _, period in positions])
+    velocities = np.diff(angles) / periods[1:]
+    assert np.all(np.abs(velocities) <= 90.0 + 1e-6)
+    # Speed carries over the rate change instead of dropping to rest
+    assert abs(velocities[29] - velocities[28]) <= 360.0 * 0.01
+    assert np.all(np.abs(np.diff(velocities[29:])) / 0.0025 <= 360.0 * 1.01)
+
+
+def test_control_loop_retargets_without_restarting():
+    async def run():
+        controller = make_controller()
+        task = controller.start()
+        controller.set_absolute_angles([40, 80])
+        await asyncio.wait_for(controller.wait_idle(), 5.0)
+        assert list(controller.current_angles[:2]) == [40, 80]
+        # A new target wakes the same loop; there is no second task
+        controller.set_absolute_angles([10], channels=[1])
+        assert not controller.idle.is_set()
+        await asyncio.wait_for(controller.wait_idle(), 5.0)
+        assert controller.current_angles[1] == 10
+        assert controller.loop_task is task and not task.done()
+        await controller.stop()
+        assert task.done() and controller.loop_task is None
+
+    asyncio.run(run())
+
+
+def test_paused_loop_holds_position_until_resumed():
+    async def run():
+        controller = make_controller()
+        controller.start()
+        controller.pause()
+        controller.set_absolute_angles([90])
+        await asyncio.wait_for(controller.wait_idle(), 1.0)
+        assert controller.current_angles[0] == 0
+        controller.resume()
+        await asyncio.wait_for(controller.wait_idle(), 5.0)
+        assert controller.current_angles[0] == 90
+        await controller.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,94 @@
+from DetectionBridgeH import EYE_DATA_SCALE, DetectionBridge
+
+
+class Box:
+    def __init__(self, x, y, size=0.1):
+        self.x, self.y, self.size = x, y, size
+
+    def xmin(self):
+        return self.x - self.size / 2
+
+    def ymin(self):
+        return self.y - self.size / 2
+
+    def width(self):
+        return self.size
+
+    def height(self):
+        return self.size
+
+
+class Detection:
+    def __init__(self, x, y, label='person', confidence=0.9):
+        self.box = Box(x, y)
+        self.label = label
+        self.confidence = confidence
+
+    def get_label(self):
+        return self.label
+
+    def get_confidence(self):
+        return self.confidence
+
+    def get_bbox(self):
+        return self.box
+
+
+class EyeData:
+    def __init__(self):
+        self.samples = []
+
+    def update_eye_data(self, timestamp=None, **values):
+        self.samples.append(values)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_bridge(**options):
+    eye_data, clock = EyeData(), Clock()
+    return DetectionBridge(eye_data, clock=clock, **options), eye_data, clock
+
+
+def test_publishes_person_centre():
+    bridge, eye_data, _ = make_bridge()
+    assert bridge.process([Detection(0.25, 0.5, label='dog'), Detection(0.25, 0.5)], pts=7) == \
+        (0.25 * EYE_DATA_SCALE, 0.5 * EYE_DATA_SCALE)
+    assert eye_data.samples[-1]['pts'] == 7.0
+
+
+def test_new_person_gets_new_track():
+    bridge, eye_data, _ = make_bridge()
+    bridge.process([Detection(0.2, 0.5)])
+    bridge.process([Detection(0.22, 0.5)])
+    assert eye_data.samples[0]['track'] == eye_data.samples[1]['track']
+    bridge.process([Detection(0.8, 0.5)])
+    assert eye_data.samples[2]['track'] != eye_data.samples[1]['track']
+
+
+def test_other_camera_waits_while_active_camera_delivers():
+    bridge, eye_data, clock = make_bridge(source_timeout=0.5)
+    bridge.process([Detection(0.2, 0.5)], source_id=0)
+    clock.now = 0.3
+    assert bridge.process([Detection(0.8, 0.5)], source_id=1) is None
+    bridge.process([Detection(0.2, 0.5)], source_id=0)
+    clock.now = 0.6
+    assert bridge.process([Detection(0.8, 0.5)], source_id=1) is None
+
+
+def test_stalled_camera_releases_the_gaze():
+    bridge, eye_data, clock = make_bridge(source_timeout=0.5)
+    bridge.process([Detection(0.2, 0.5)], source_id=0)
+    clock.now = 1.0
+    assert bridge.process([Detection(0.8, 0.5)], source_id=1) is not None
+    assert eye_data.samples[-1]['source'] == 1.0
+
+
+def test_source_maps_place_each_camera():
+    bridge, _, _ = make_bridge(source_maps={1: (0.5, 0.5, 1.0, 0.0)})
+    assert bridge.process([Detection(0.0, 0.5)], source_id=1) == (0.5 * EYE_DATA_SCALE, 0.5 * EYE_DATA_SCALE)
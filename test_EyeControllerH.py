@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from ConfigH import save_config
+from EyeControllerH import EyeDataController
+from GazeControllerH import AXES
+
+
+def make_controller(tmp_path):
+    path = str(tmp_path / 'config.json')
+    controller = EyeDataController(backend='simulated', config_path=path)
+    save_config(path, controller.ConfigData)
+    return controller, path
+
+
+def test_gaze_rate_reload_keeps_the_loops_running(tmp_path):
+    async def run():
+        controller, path = make_controller(tmp_path)
+        controller.start()
+        await asyncio.sleep(0.1)
+        save_config(path, dict(controller.ConfigData, gaze_rate=100.0))
+        controller.on_config_file_changed()
+        ticks = controller.gaze_controller.scheduler.stats.ticks
+        await asyncio.sleep(0.1)
+        assert controller.gaze_controller.scheduler.period == pytest.approx(0.01)
+        assert not controller.gaze_controller.loop_task.done()
+        assert controller.servo_controller.is_running()
+        # About 10 ticks at the new rate; 3 at the old one
+        assert controller.gaze_controller.scheduler.stats.ticks - ticks > 5
+        await controller.stop()
+        controller.close()
+
+    asyncio.run(run())
+
+
+def test_bad_gaze_rate_is_rejected(tmp_path):
+    controller, path = make_controller(tmp_path)
+    save_config(path, dict(controller.ConfigData, gaze_rate=0.0, eye_x_p=0.3))
+    controller.on_config_file_changed()
+    assert controller.ConfigData['gaze_rate'] == 30.0
+    assert controller.ConfigData['eye_x_p'] == 0.0
+    assert controller.gaze_controller.scheduler.period == pytest.approx(1 / 30.0)
+
+
+def test_reload_applies_only_changed_keys(tmp_path):
+    controller, path = make_controller(tmp_path)
+    save_config(path, dict(controller.ConfigData, eye_y_p=0.25, servo_2_max=400.0, lid_closed=0.2))
+    changes = controller.reload_config()
+    assert sorted(changes) == ['eye_y_p', 'lid_closed', 'servo_2_max']
+    assert controller.gaze_controller.pid.kp[AXES.index('eye_y')] == 0.25
+    assert controller.servo_controller.max_angles[2] == 400.0
+    assert controller.blink_player.closed_fraction == 0.2
+    assert controller.reload_config() == {}
+
+
+def test_failed_reload_rolls_nothing_forward(tmp_path):
+    controller, path = make_controller(tmp_path)
+    before = dict(controller.ConfigData)
+    # Out of the PCA9685 pulse range, next to a valid change
+    save_config(path, dict(controller.ConfigData, servo_1_max=5000.0, cam_x_p=0.3))
+    controller.on_config_file_changed()
+    assert controller.ConfigData == before
+    assert controller.servo_controller.max_angles[1] == before['servo_1_max']
+    assert controller.gaze_controller.pid.kp[AXES.index('cam_x')] == 0.0
+    with open(path, 'w') as f:
+        f.write('{"cam_x_p": "fast"}')
+    controller.on_config_file_changed()
+    assert controller.ConfigData == before
+
+
+def test_new_servo_keys_wait_for_a_restart(tmp_path):
+    controller, path = make_controller(tmp_path)
+    save_config(path, dict(controller.ConfigData, servo_8_min=280.0, servo_8_max=400.0))
+    assert controller.reload_config() == {}
+    assert controller.num_servos == 8
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pytest
+from FrameRingH import FrameReader, FrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing((4, 6, 3), slots=3, name=f'eyecatcher_test_{os.getpid()}')
+    yield ring
+    ring.close()
+
+
+def test_reader_gets_newest_frame(ring):
+    reader = FrameReader(ring)
+    assert reader.read() is None
+    ring.write(np.full(ring.shape, 1, dtype=np.uint8), pts=10)
+    assert reader.read()[1] == 10
+    for i in range(2, 5):
+        ring.write(np.full(ring.shape, i, dtype=np.uint8), pts=i * 10)
+    frame, pts, _ = reader.read()
+    assert pts == 40
+    assert np.all(frame == 4)
+    assert reader.dropped == 2
+    assert reader.read() is None
+
+
+def test_swap_reverses_channels(ring):
+    frame = np.zeros(ring.shape, dtype=np.uint8)
+    frame[..., 0] = 1
+    ring.write(frame)
+    assert np.all(FrameReader(ring, convert='swap').read()[0][..., 2] == 1)
+
+
+def test_attach_by_name(ring):
+    ring.write(np.full(ring.shape, 7, dtype=np.uint8), pts=1)
+    other = FrameRing.attach(ring.name)
+    try:
+        assert np.all(FrameReader(other).read()[0] == 7)
+    finally:
+        other.close()
+
+
+def test_existing_ring_is_not_torn_down(ring):
+    with pytest.raises(FileExistsError):
+        FrameRing(ring.shape, name=ring.name)
+    ring.write(np.full(ring.shape, 3, dtype=np.uint8))
+    assert np.all(FrameReader(ring).read()[0] == 3)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from EyeControllerH import EyeDataController
+from GazeControllerH import AXES, PIDArray
+
+
+def test_proportional_output_is_centred_and_clamped():
+    pid = PIDArray(3)
+    pid.set_gains(0.4, 0.0, 0.0)
+    output = pid.update(np.array([0.0, 0.5, -2.0]), 0.01)
+    assert list(output) == pytest.approx([0.5, 0.7, 0.0])
+
+
+def test_integral_stops_while_saturated():
+    pid = PIDArray(1)
+    pid.set_gains(0.8, 2.0, 0.0)
+    for _ in range(500):
+        output = pid.update(np.array([1.0]), 0.01)
+    assert output[0] == 1.0
+    # Without anti-windup the integral would have reached 5
+    assert pid.integral[0] < 0.01
+    # So the output leaves saturation as soon as the error reverses
+    assert pid.update(np.array([-0.2]), 0.01)[0] < 0.5
+
+
+def test_reset_clears_only_masked_axes():
+    pid = PIDArray(2)
+    pid.set_gains(0.0, 1.0, 0.0)
+    pid.update(np.array([0.1, 0.1]), 0.1)
+    pid.reset(np.array([True, False]))
+    assert list(pid.integral) == pytest.approx([0.0, 0.01])
+
+
+def test_gains_from_config_drive_the_axis_channels():
+    controller = EyeDataController(backend='simulated')
+    controller.apply_config({'predict': 0.0, 'eye_x_p': 0.5, 'cam_y_p': 0.5})
+    gaze = controller.gaze_controller
+    controller.update_eye_data(eye_x=768.0, cam_y=256.0)
+    outputs = gaze.step()
+    assert list(outputs) == pytest.approx([0.5, 0.25, 0.75, 0.5])
+    servo = controller.servo_controller
+    for axis, output in zip(AXES, outputs):
+        channel = int(controller.ConfigData[f'{axis}_servo'])
+        expected = servo.min_angles[channel] + (servo.max_angles[channel] - servo.min_angles[channel]) * output
+        assert servo.target_angles[channel] == pytest.approx(expected)
@@ -0,0 +1,43 @@
+import pytest
+
+# HeadlessApp drives GStreamer and the Hailo callback, so it needs the gi and hailo modules even
+# for the parts tested here
+pytest.importorskip('gi')
+pytest.importorskip('hailo')
+from HeadlessApp import output_sink, parse_arguments
+from PipelineH import get_profile, multi_source_pipeline
+from ServoBackendH import BACKEND_ENV
+
+
+def test_defaults_run_the_test_source_on_simulated_servos(monkeypatch):
+    monkeypatch.delenv(BACKEND_ENV, raising=False)
+    args = parse_arguments(['--hef-path', 'model.hef'])
+    assert args.input == ['test']
+    assert args.sink == 'fakesink'
+    assert args.servo_backend == 'simulated'
+    assert not args.no_servos
+
+
+def test_servo_backend_from_environment_or_flag(monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV, 'hardware')
+    assert parse_arguments(['--hef-path', 'model.hef']).servo_backend == 'hardware'
+    args = parse_arguments(['--hef-path', 'model.hef', '--servo-backend', 'simulated', '-i', 'a.mp4', '-i', 'test'])
+    assert args.servo_backend == 'simulated'
+    assert args.input == ['a.mp4', 'test']
+    with pytest.raises(SystemExit):
+        parse_arguments(['--hef-path', 'model.hef', '--servo-backend', 'mock'])
+
+
+def test_sink_selection(tmp_path):
+    fakesink, = output_sink('fakesink', 'app_sink')
+    assert fakesink.describe() == 'fakesink name=app_sink sync=false'
+    appsink, = output_sink('appsink', 'app_sink_1')
+    assert appsink.describe() == 'appsink name=app_sink_1 sync=false drop=true max-buffers=1'
+    hef_path, postprocess_so = tmp_path / 'model.hef', tmp_path / 'post.so'
+    hef_path.touch()
+    postprocess_so.touch()
+    description = multi_source_pipeline([('test', 'test'), ('test', 'test')], str(hef_path), str(postprocess_so),
+                                        'filter', get_profile(), sink=lambda i: output_sink('appsink', f'app_sink_{i}'),
+                                        overlay=False)
+    description.validate()
+    assert description.find('app_sink_1').factory == 'appsink'
@@ -0,0 +1,52 @@
+import threading
+import numpy as np
+from LatestValueH import LatestValue
+
+
+def test_update_keeps_other_fields():
+    slot = LatestValue(('x', 'y'), (1.0, 2.0))
+    slot.update(5.0, y=3.0)
+    version, values, timestamp, is_new = slot.read()
+    assert list(values) == [1.0, 3.0]
+    assert timestamp == 5.0
+    assert is_new
+    assert not slot.read(version)[3]
+
+
+def test_read_waits_for_a_publish_in_progress():
+    slot = LatestValue(('x',), (1.0,))
+    # What a reader sees while the producer is between the two sequence bumps
+    slot.sequence += 1
+    slot.values[:] = 2.0
+    result = []
+    reader = threading.Thread(target=lambda: result.append(slot.read()))
+    reader.start()
+    reader.join(0.05)
+    assert not result
+    slot.timestamp = 7.0
+    slot.sequence += 1
+    reader.join()
+    assert result[0][1][0] == 2.0
+    assert result[0][2] == 7.0
+
+
+def test_reads_are_never_torn():
+    slot = LatestValue(('a', 'b', 'c', 'd'))
+    stop = threading.Event()
+
+    def produce():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            slot.publish(np.full(4, float(i)), float(i))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    try:
+        out = np.empty(4)
+        for _ in range(20000):
+            _, values, timestamp, _ = slot.read(out=out)
+            assert np.all(values == timestamp)
+    finally:
+        stop.set()
+        producer.join()
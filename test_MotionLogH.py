@@ -0,0 +1,64 @@
+import asyncio
+import numpy as np
+from ControllerH import ServoController
+from MotionLogH import KIND_COUNTS, KIND_EYE_DATA, KIND_TARGETS, MotionPlayer, MotionRecorder, open_motion_log
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.01
+        return self.now
+
+
+def test_round_trip_keeps_pts_and_order(tmp_path):
+    path = tmp_path / 'motion.log'
+    recorder = MotionRecorder(path, 2, ('cam_x', 'pts'), chunk_records=2, clock=Clock())
+    # An hour into the stream; float32 would round this to whole minutes
+    pts = 3600123456789
+    recorder.record_eye_data(np.array([100.0, float(pts)]), source_time=-5.0)
+    recorder.record_targets(np.array([10.0, 20.0]))
+    recorder.record_counts(np.array([1]), np.array([3000]))
+    recorder.close()
+    header, records = open_motion_log(path)
+    assert header['eye_fields'] == ['cam_x', 'pts']
+    assert list(records['kind']) == [KIND_EYE_DATA, KIND_TARGETS, KIND_COUNTS]
+    # Written in order on one clock; the capture time is kept apart
+    assert np.all(np.diff(records['timestamp']) > 0)
+    assert records['source_time'][0] == -5.0
+    assert np.isnan(records['source_time'][1])
+    assert records['pts'][0] == pts
+    assert records['pts'][1] == -1
+    assert np.isnan(records['values'][2][0]) and records['values'][2][1] == 3000
+
+
+def test_replay_targets(tmp_path):
+    path = tmp_path / 'motion.log'
+    recorder = MotionRecorder(path, 2)
+    recorder.record_targets(np.array([30.0, 60.0]))
+    recorder.close()
+    controller = ServoController(num_channels=2, backend='simulated')
+    MotionPlayer(path).play_fast(controller)
+    assert list(controller.current_angles) == [30.0, 60.0]
+
+
+def test_timed_replay(tmp_path):
+    path = tmp_path / 'motion.log'
+    recorder = MotionRecorder(path, 1)
+    recorder.record_targets(np.array([10.0]), timestamp=0.0)
+    recorder.record_targets(np.array([20.0]), timestamp=0.05)
+    recorder.close()
+    controller = ServoController(num_channels=1, backend='simulated')
+
+    async def replay():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        count = await MotionPlayer(path).play(controller)
+        return count, loop.time() - start
+
+    count, elapsed = asyncio.run(replay())
+    assert count == 2
+    assert elapsed >= 0.045
+    assert controller.target_angles[0] == 20.0
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from PCA9685BusH import LED0_ON_L, TRANSACTION_COST_BYTES, TRANSACTION_OVERHEAD_BYTES, BurstWriter, \
+    ChannelMap, MultiBoardWriter, counts_to_registers
+from ServoBackendH import create_i2c, create_pca
+
+
+def make_writer():
+    pca = create_pca(create_i2c(None, 'simulated'), 'simulated')
+    writer = BurstWriter(pca)
+    pca.i2c_device.clear()
+    return writer, pca.i2c_device
+
+
+def test_adjacent_channels_go_out_in_one_burst():
+    writer, device = make_writer()
+    writer.write([0, 1, 2], [1000, 2000, 3000])
+    assert len(device.writes) == 1
+    assert device.writes[0][1] == LED0_ON_L
+    assert device.writes[0][2] == counts_to_registers([1000, 2000, 3000]).tobytes()
+
+
+def test_unchanged_channels_are_skipped():
+    writer, device = make_writer()
+    writer.write([0, 1], [1000, 2000])
+    device.clear()
+    writer.write([0, 1], [1000, 2000])
+    assert device.writes == []
+    assert writer.stats.channels_skipped == 2
+
+
+def test_distant_channels_are_not_bridged():
+    writer, device = make_writer()
+    writer.write(np.arange(16), np.full(16, 1000))
+    writer.stats.reset()
+    device.clear()
+    writer.write([0, 15], [2000, 2000])
+    assert [register for _, register, _ in device.writes] == [LED0_ON_L, LED0_ON_L + 4 * 15]
+    assert writer.stats.bytes == 12
+    assert writer.stats.bytes_saved >= 0
+
+
+def test_single_clean_channel_is_bridged():
+    writer, device = make_writer()
+    writer.write(np.arange(16), np.full(16, 1000))
+    device.clear()
+    writer.write([0, 2, 5], [2000, 2000, 2000])
+    # 0..2 in one burst resending channel 1; the two clean channels before 5 split it
+    writes = [(register, len(payload)) for _, register, payload in device.writes]
+    assert writes == [(LED0_ON_L, 12), (LED0_ON_L + 4 * 5, 4)]
+    assert writer.registers[1, 1] == (1000 + 1) >> 4
+
+
+def test_never_written_channel_is_not_bridged():
+    writer, device = make_writer()
+    writer.write([0, 2], [2000, 2000])
+    assert len(device.writes) == 2
+
+
+def test_bus_time_saved_never_negative():
+    # Bridging may send more bytes than the per-channel path, but never takes longer than the
+    # transactions it avoids
+    writer, device = make_writer()
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        channels = np.flatnonzero(rng.random(16) < 0.3)
+        writer.write(channels, rng.integers(1000, 8000, channels.size))
+        stats = writer.stats
+        extra_cost = TRANSACTION_COST_BYTES - TRANSACTION_OVERHEAD_BYTES
+        assert stats.bytes_saved + stats.transactions_saved * extra_cost >= 0
+
+
+def test_channel_map_rejects_duplicate_boards():
+    with pytest.raises(ValueError):
+        ChannelMap([{'address': 0x40}, {'address': 0x40}])
+    with pytest.raises(ValueError):
+        ChannelMap([{'pins': [0, 16]}])
+    # The same address is fine on another bus
+    assert ChannelMap([{'address': 0x40, 'bus': 1}, {'address': 0x40, 'bus': 3}]).num_channels == 32
+
+
+def test_channel_map_numbers_channels_across_boards():
+    channel_map = ChannelMap([{'channels': 3}, {'address': 0x41, 'pins': [15, 4]}])
+    assert channel_map.num_channels == 5
+    assert list(channel_map.board_of) == [0, 0, 0, 1, 1]
+    assert list(channel_map.pin_of) == [0, 1, 2, 15, 4]
+
+
+def make_boards(boards):
+    channel_map = ChannelMap(boards)
+    pcas = [create_pca(None, 'simulated', board['address']) for board in channel_map.boards]
+    writer = MultiBoardWriter(pcas, channel_map)
+    for pca in pcas:
+        pca.i2c_device.clear()
+    return writer, [pca.i2c_device for pca in pcas]
+
+
+def test_writes_are_routed_to_each_board_and_pin():
+    writer, devices = make_boards([{'channels': 2}, {'address': 0x41, 'pins': [7, 8]}])
+    writer.write([0, 2, 3], [1000, 2000, 3000])
+    assert [register for _, register, _ in devices[0].writes] == [LED0_ON_L]
+    assert [register for _, register, _ in devices[1].writes] == [LED0_ON_L + 4 * 7]
+    assert devices[1].writes[0][2] == counts_to_registers([2000, 3000]).tobytes()
+    stats = writer.stats.as_dict()
+    assert stats['transactions'] == 2
+    assert [board['transactions'] for board in stats['boards']] == [1, 1]
+    writer.close()
+
+
+def test_boards_on_separate_buses_use_one_worker_each():
+    writer, devices = make_boards([{'bus': 1, 'channels': 4}, {'bus': 3, 'channels': 4}, {'bus': 3, 'address': 0x41}])
+    assert len(writer.executors) == 2
+    assert list(writer.bus_of) == [0, 1, 1]
+    writer.write(np.arange(24), np.full(24, 1000))
+    assert [len(device.writes) for device in devices] == [1, 1, 1]
+    writer.close()
+    assert writer.executors is None
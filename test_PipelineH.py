@@ -0,0 +1,90 @@
+import pytest
+from PipelineH import Element, PipelineDescription, PipelineError, callback_names, detection_pipeline, \
+    format_value, get_profile, get_source_type, multi_source_pipeline, queue
+
+
+@pytest.fixture
+def model_files(tmp_path):
+    hef_path = tmp_path / 'yolov8s.hef'
+    postprocess_so = tmp_path / 'libyolo_hailortpp_post.so'
+    hef_path.touch()
+    postprocess_so.touch()
+    return str(hef_path), str(postprocess_so)
+
+
+def test_format_value():
+    assert format_value(True) == 'true'
+    assert format_value(3) == '3'
+    assert format_value('xvimagesink') == 'xvimagesink'
+    assert format_value('<sink_0>') == '"<sink_0>"'
+    assert format_value('') == '""'
+
+
+def test_source_type_and_profile():
+    assert get_source_type('/dev/video0') == 'usb'
+    assert get_source_type('rpi') == 'rpi'
+    assert get_source_type('test') == 'test'
+    assert get_source_type('clip.mp4') == 'file'
+    profile = get_profile('low-latency', queue_size=2, batch_size=None)
+    assert profile['queue_size'] == 2
+    assert profile['batch_size'] == 1
+    assert profile['network_width'] == 640
+    with pytest.raises(ValueError):
+        get_profile('fastest')
+
+
+def test_detection_pipeline(model_files):
+    hef_path, postprocess_so = model_files
+    description = detection_pipeline('test', 'test', hef_path, postprocess_so, 'filter', get_profile('low-latency'))
+    description.validate()
+    launch = description.to_string()
+    assert launch.startswith('hailomuxer name=hmux videotestsrc name=src_0 is-live=true pattern=ball')
+    assert f'hailonet name=hailonet hef-path={hef_path} batch-size=1' in launch
+    # The inference path never leaks, whatever the profile says
+    assert description.find('queue_hailonet').properties.get('leaky') is None
+    assert description.find('queue_hailo_python').properties['leaky'] == 'downstream'
+    assert launch.count('identity name=identity_callback') == 1
+
+
+def test_overlay_can_be_dropped(model_files):
+    hef_path, postprocess_so = model_files
+    description = detection_pipeline('usb', '/dev/video0', hef_path, postprocess_so, 'filter', get_profile(),
+                                     sink=[Element('fakesink', 'hailo_display')], overlay=False)
+    description.validate()
+    assert 'hailooverlay' not in description.to_string()
+    assert description.find('hailo_display').factory == 'fakesink'
+
+
+def test_multi_source_pipeline(model_files):
+    hef_path, postprocess_so = model_files
+    description = multi_source_pipeline([('test', 'test'), ('usb', '/dev/video2')], hef_path, postprocess_so,
+                                        'filter', get_profile())
+    description.validate()
+    launch = description.to_string()
+    assert 'hailoroundrobin name=fun mode=0' in launch
+    assert 'batch-size=2' in launch
+    assert 'hailostreamrouter name=sid src_0::input-streams="<sink_0>" src_1::input-streams="<sink_1>"' in launch
+    assert 'v4l2src name=src_1 device=/dev/video2' in launch
+    for name in callback_names(2):
+        assert description.find(name).factory == 'identity'
+
+
+def test_single_source_is_detection_pipeline(model_files):
+    hef_path, postprocess_so = model_files
+    profile = get_profile()
+    single = multi_source_pipeline([('file', 'clip.mp4')], hef_path, postprocess_so, 'filter', profile)
+    assert single.to_string() == detection_pipeline('file', 'clip.mp4', hef_path, postprocess_so, 'filter',
+                                                    profile).to_string()
+
+
+def test_validate_reports_every_problem(tmp_path):
+    description = PipelineDescription()
+    description.add_branch(Element('videotestsrc', 'src'), queue('q', get_profile(), leaky='sideways'),
+                           Element('hailonet', 'hailonet', hef_path=str(tmp_path / 'missing.hef')),
+                           Element('fakesink', 'src'))
+    with pytest.raises(PipelineError) as error:
+        description.validate()
+    message = str(error.value)
+    assert 'element name src is used more than once' in message
+    assert 'unknown leaky mode sideways' in message
+    assert 'missing.hef does not exist' in message
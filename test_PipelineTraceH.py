@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+# The tracer installs GStreamer pad probes, so it needs the gi bindings even when fed by hand
+pytest.importorskip('gi')
+from gi.repository import Gst
+from PipelineTraceH import PipelineTracer
+
+POINTS = (('src_0', 'capture'), ('hailonet', 'hailonet'), ('identity_callback', 'callback'))
+
+
+class FakeBuffer:
+    def __init__(self, pts):
+        self.pts = pts
+
+
+class FakeInfo:
+    def __init__(self, pts):
+        self.buffer = FakeBuffer(pts)
+
+    def get_buffer(self):
+        return self.buffer
+
+
+class FakeFactory:
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class FakeElement:
+    def __init__(self, name, factory='identity', properties=None):
+        self.name = name
+        self.factory = FakeFactory(factory)
+        self.properties = properties or {}
+        self.pad = object()
+
+    def get_name(self):
+        return self.name
+
+    def get_factory(self):
+        return self.factory
+
+    def get_static_pad(self, name):
+        return self.pad
+
+    def get_property(self, name):
+        return self.properties[name]
+
+
+class FakeIterator:
+    def __init__(self, elements):
+        self.elements = list(elements)
+
+    def next(self):
+        if not self.elements:
+            return Gst.IteratorResult.DONE, None
+        return Gst.IteratorResult.OK, self.elements.pop(0)
+
+
+class FakePipeline:
+    def __init__(self, elements):
+        self.elements = {element.get_name(): element for element in elements}
+
+    def get_by_name(self, name):
+        return self.elements.get(name)
+
+    def iterate_recurse(self):
+        return FakeIterator(self.elements.values())
+
+
+def make_tracer(queues=(), **options):
+    elements = [FakeElement(name) for name, _ in POINTS] + list(queues)
+    return PipelineTracer(FakePipeline(elements), POINTS, **options)
+
+
+def test_stage_latencies_from_point_times():
+    tracer = make_tracer()
+    tracer.record(np.array([1.000, 1.010, 1.015]))
+    # hailonet missing: the whole gap goes to the callback stage
+    tracer.record(np.array([2.000, np.nan, 2.030]))
+    summary = tracer.summary()
+    assert summary['stages']['hailonet']['count'] == 1
+    assert summary['stages']['hailonet']['max'] == pytest.approx(0.010, rel=0.05)
+    assert summary['stages']['callback']['count'] == 2
+    assert summary['stages']['callback']['max'] == pytest.approx(0.030, rel=0.05)
+    assert summary['total']['count'] == 2
+
+
+def test_buffers_complete_at_the_last_point_and_lost_ones_are_evicted():
+    tracer = make_tracer(max_in_flight=2)
+    for pts in (100, 200, 300):
+        tracer.on_buffer(None, FakeInfo(pts), 0)
+    tracer.on_buffer(None, FakeInfo(300), 1)
+    assert tracer.on_buffer(None, FakeInfo(300), 2) == Gst.PadProbeReturn.OK
+    # PTS 100 was pushed out by 300; 200 is still on its way
+    assert (tracer.completed, tracer.evicted) == (1, 1)
+    assert list(tracer.in_flight) == [200]
+    assert tracer.summary()['total']['count'] == 1
+
+
+def test_queue_levels_are_sampled_into_a_ring():
+    queue = FakeElement('queue_hailonet', 'queue', {'max-size-buffers': 3, 'current-level-buffers': 0})
+    tracer = make_tracer([queue], history=4)
+    for level in (0, 1, 3, 3, 2, 3):
+        queue.properties['current-level-buffers'] = level
+        tracer.sample()
+    times, levels = tracer.queue_levels()
+    assert list(levels[:, 0]) == [3, 3, 2, 3]
+    assert np.all(np.diff(times) >= 0)
+    stats = tracer.summary()['queues']['queue_hailonet']
+    assert stats == {'capacity': 3, 'mean': 2.75, 'max': 3, 'full_fraction': 0.75}
+    lines = []
+    tracer.report(lines.append)
+    assert any('queue_hailonet' in line for line in lines)
@@ -0,0 +1,40 @@
+import numpy as np
+from EyeControllerH import EyeDataController
+from PredictorH import AlphaBetaPredictor
+
+
+def test_tracks_constant_velocity():
+    predictor = AlphaBetaPredictor(1)
+    for i in range(60):
+        predictor.update([100.0 * i / 30], i / 30)
+    assert abs(predictor.predict(2.0 + 0.1)[0] - 100.0 * 2.1) < 2.0
+
+
+def test_jump_beyond_reset_distance_does_not_overshoot():
+    predictor = AlphaBetaPredictor(1, reset_distance=150.0)
+    for i in range(30):
+        predictor.update([200.0], i / 30)
+    predictor.update([800.0], 1.0)
+    assert predictor.velocity[0] == 0.0
+    assert predictor.predict(1.2)[0] == 800.0
+
+
+def test_gaze_controller_restarts_predictor_on_new_track():
+    controller = EyeDataController(backend='simulated')
+    # With no reset distance, only the track id tells the jump from motion
+    controller.ConfigData['predict_reset_distance'] = np.inf
+    gaze = controller.gaze_controller
+    gaze.load_config(controller.ConfigData)
+    now = controller.eye_data_slot.clock()
+    for i in range(10):
+        controller.update_eye_data(now - (10 - i) / 30, cam_x=200.0, track=1.0)
+        gaze.read_targets()
+    controller.update_eye_data(now, cam_x=800.0, track=2.0)
+    targets = gaze.read_targets()
+    assert targets[0] == 800.0
+    assert gaze.predictor.velocity[0] == 0.0
+
+
+def test_config_exposes_finite_reset_distance():
+    controller = EyeDataController(backend='simulated')
+    assert np.isfinite(controller.gaze_controller.predictor.reset_distance)
@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from ControllerH import ServoController
+from SchedulerH import FixedRateScheduler, TickStats
+
+
+class TickCounter:
+    # A mixer that keeps the control loop ticking and counts the ticks
+    def __init__(self):
+        self.ticks = 0
+
+    def mix(self, controller, offsets):
+        self.ticks += 1
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_and_period():
+    scheduler = FixedRateScheduler(rate_hz=50)
+    assert scheduler.period == pytest.approx(0.02)
+    scheduler.set_rate(200)
+    assert scheduler.period == pytest.approx(0.005)
+    assert scheduler.next_deadline is None
+    with pytest.raises(ValueError):
+        FixedRateScheduler(overrun_policy='drop')
+
+
+def test_deadlines_do_not_drift():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(rate_hz=1000, clock=clock)
+    asyncio.run(scheduler.wait())
+    # The tick took longer than expected, but less than a period: the next deadline stays on
+    # the grid
+    clock.now = 0.0015
+    assert asyncio.run(scheduler.wait()) == 0
+    assert scheduler.next_deadline == pytest.approx(0.003)
+    assert scheduler.stats.overruns == 0
+
+
+def test_skip_realigns_to_the_grid():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(rate_hz=100, overrun_policy='skip', clock=clock)
+    asyncio.run(scheduler.wait())
+    clock.now = 0.055
+    assert asyncio.run(scheduler.wait()) == 4
+    assert scheduler.next_deadline == pytest.approx(0.07)
+    assert scheduler.stats.overruns == 1
+    assert scheduler.stats.skipped == 4
+
+
+def test_catchup_runs_at_most_max_catchup_ticks():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(rate_hz=100, overrun_policy='catchup', max_catchup=1, clock=clock)
+    asyncio.run(scheduler.wait())
+    clock.now = 0.055
+    # Three ticks missed, one is run back to back and the other two are dropped
+    assert asyncio.run(scheduler.wait()) == 2
+    assert scheduler.next_deadline == pytest.approx(0.05)
+    assert asyncio.run(scheduler.wait()) == 0
+    assert scheduler.stats.skipped == 2
+
+
+def test_rate_change_while_waiting_keeps_the_grid():
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(rate_hz=100, clock=clock)
+
+    async def tick_with_rate_change():
+        waiting = asyncio.ensure_future(scheduler.wait())
+        await asyncio.sleep(0)
+        clock.now = 0.004
+        scheduler.set_rate(500)
+        return await waiting
+
+    assert asyncio.run(tick_with_rate_change()) == 0
+    # Re-anchored one new period after the change; the tick that slept keeps it
+    assert scheduler.next_deadline == pytest.approx(0.006)
+    clock.now = 0.006
+    asyncio.run(scheduler.wait())
+    assert scheduler.next_deadline == pytest.approx(0.008)
+
+
+def test_rate_change_keeps_the_control_loop_ticking():
+    async def run():
+        controller = ServoController(num_channels=2, backend='simulated')
+        counter = TickCounter()
+        controller.add_mixer(counter)
+        task = controller.start()
+        await asyncio.sleep(0.05)
+        controller.set_tick_rate(400)
+        before = counter.ticks
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        assert counter.ticks - before > 10
+        await controller.stop()
+
+    asyncio.run(run())
+
+
+def test_stats_summary():
+    stats = TickStats(history=4)
+    for i in range(6):
+        stats.record(i * 0.01 + 0.001, i * 0.01)
+    summary = stats.summary()
+    assert summary['ticks'] == 6
+    assert summary['period_mean'] == pytest.approx(0.01)
+    assert summary['jitter_max'] == pytest.approx(0.001)
+    stats.reset()
+    stats.record(1.0, 1.0)
+    # The first tick after a reset has no previous start to measure a period from
+    assert 'period_mean' not in stats.summary()
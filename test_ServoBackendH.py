@@ -0,0 +1,51 @@
+import time
+import numpy as np
+import pytest
+from PCA9685BusH import LED0_ON_L
+from ServoBackendH import BACKEND_ENV, SimulatedPCA9685, create_i2c, create_pca, get_backend
+
+
+def test_writes_are_logged_and_land_in_the_registers():
+    clock_times = iter([1.0, 2.0])
+    pca = SimulatedPCA9685()
+    pca.i2c_device.clock = lambda: next(clock_times)
+    pca.i2c_device.clear()
+    pca.channels[1].duty_cycle = 0x2000
+    pca.channels[2].duty_cycle = 0xFFFF
+    assert [(timestamp, register) for timestamp, register, _ in pca.i2c_device.writes] == \
+        [(1.0, LED0_ON_L + 4), (2.0, LED0_ON_L + 8)]
+    assert pca.i2c_device.writes[0][2] == np.array([0, 0x200], dtype='<u2').tobytes()
+    assert pca.channels[1].duty_cycle == 0x2000
+    assert pca.channels[2].duty_cycle == 0xFFFF
+
+
+def test_bus_time_follows_the_i2c_clock():
+    pca = SimulatedPCA9685(clock_hz=400000)
+    pca.i2c_device.clear()
+    pca.channels[0].duty_cycle = 0x1000
+    # START/STOP plus address, register and 4 payload bytes at 9 clocks each
+    assert pca.i2c_device.bus_time == pytest.approx((2 + 9 * 6) / 400000)
+
+
+def test_realtime_bus_blocks_for_the_transfer():
+    pca = SimulatedPCA9685(clock_hz=10000, realtime=True)
+    start = time.perf_counter()
+    pca.channels[0].duty_cycle = 0x1000
+    assert time.perf_counter() - start >= (2 + 9 * 6) / 10000
+
+
+def test_frequency_programs_the_prescaler():
+    pca = create_pca(create_i2c(None, 'simulated'), 'simulated')
+    pca.frequency = 50
+    assert pca.read_register(0xFE) == 122
+    assert pca.frequency == pytest.approx(50, rel=0.01)
+    with pytest.raises(ValueError):
+        pca.frequency = 5000
+
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV, 'simulated')
+    assert get_backend() == 'simulated'
+    assert get_backend('hardware') == 'hardware'
+    with pytest.raises(ValueError):
+        get_backend('mock')
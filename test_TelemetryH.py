@@ -0,0 +1,32 @@
+import numpy as np
+from TelemetryH import TelemetryDrain, TelemetryRecorder
+
+
+def test_ring_drops_overwritten_records():
+    recorder = TelemetryRecorder(capacity=4, clock=lambda: 1.0)
+    recorder.record(np.arange(3), np.full(3, 10.0), np.full(3, 300))
+    recorder.record(np.arange(3), np.full(3, 20.0), np.full(3, 310))
+    records = recorder.drain()
+    assert recorder.dropped == 2
+    assert list(records['channel']) == [2, 0, 1, 2]
+    assert recorder.latest()[2] == (20.0, 310)
+    assert recorder.drain().size == 0
+
+
+def test_drain_passes_batches_to_the_sink():
+    recorder = TelemetryRecorder()
+    batches = []
+    drain = TelemetryDrain(recorder, sink=batches.append)
+    recorder.record(np.array([0, 1]), np.array([45.0, 90.0]), np.array([300, 350]))
+    drain.flush()
+    drain.flush()
+    assert len(batches) == 1
+    assert list(batches[0]['angle']) == [45.0, 90.0]
+
+
+def test_drain_keeps_batches_by_default():
+    recorder = TelemetryRecorder()
+    drain = TelemetryDrain(recorder, interval=0.01).start()
+    recorder.record(np.array([3]), np.array([12.0]), np.array([280]))
+    drain.stop()
+    assert sum(batch.size for batch in drain.batches) == 1
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from TrajectoryH import TrajectoryPlanner, minimum_jerk_profile, trapezoidal_profile
+
+DT = 0.01
+
+
+def check_limits(positions, velocities, start, max_velocity, max_acceleration, start_velocity=0.0):
+    steps = np.diff(np.concatenate([[start], positions])) / DT
+    assert np.all(np.abs(velocities) <= max_velocity + 1e-9)
+    # Average speed over each tick stays within the limit too
+    assert np.all(np.abs(steps) <= max_velocity + 1e-6)
+    accelerations = np.diff(np.concatenate([[start_velocity], velocities])) / DT
+    assert np.all(np.abs(accelerations[:-1]) <= max_acceleration * 1.01)
+
+
+@pytest.mark.parametrize('build', [trapezoidal_profile, minimum_jerk_profile])
+@pytest.mark.parametrize('start, end', [(0.0, 90.0), (120.0, 30.0), (10.0, 11.0)])
+def test_profile_reaches_goal_within_limits(build, start, end):
+    positions, velocities = build(start, end, 180.0, 720.0, DT)
+    assert positions[-1] == end
+    assert velocities[-1] == 0.0
+    check_limits(positions, velocities, start, 180.0, 720.0)
+
+
+def test_trapezoidal_cruises_at_max_velocity():
+    positions, velocities = trapezoidal_profile(0.0, 180.0, 100.0, 1000.0, DT)
+    assert velocities.max() == pytest.approx(100.0)
+    # 0.1 s ramps at both ends and 1.7 s of cruise
+    assert positions.size == 190
+
+
+def test_trapezoidal_brakes_when_moving_away():
+    positions, velocities = trapezoidal_profile(0.0, 50.0, 180.0, 720.0, DT, start_velocity=-90.0)
+    assert positions.min() < 0.0
+    assert positions[-1] == 50.0
+    check_limits(positions, velocities, 0.0, 180.0, 720.0, start_velocity=-90.0)
+
+
+def test_no_motion_gives_empty_profile():
+    for build in (trapezoidal_profile, minimum_jerk_profile):
+        positions, velocities = build(45.0, 45.0, 180.0, 720.0, DT)
+        assert positions.size == 0 and velocities.size == 0
+
+
+def test_planner_plays_back_to_goal():
+    planner = TrajectoryPlanner(num_channels=4, capacity=8)
+    planner.configure(1, 90.0, 360.0)
+    planner.configure(2, 90.0, 360.0, profile='minimum_jerk')
+    planner.plan(1, 0.0, 60.0, DT)
+    planner.plan(2, 60.0, 0.0, DT)
+    # Longer than the initial capacity
+    assert planner.positions.shape[1] >= planner.lengths.max() > 8
+    mask = planner.enabled.copy()
+    last = {}
+    while True:
+        channels, positions, remaining = planner.advance(mask)
+        if channels.size == 0:
+            break
+        last.update(zip(channels.tolist(), positions.tolist()))
+    assert last == {1: 60.0, 2: 0.0}
+
+
+def test_replan_keeps_current_velocity():
+    planner = TrajectoryPlanner(num_channels=1)
+    planner.configure(0, 90.0, 360.0)
+    planner.plan(0, 0.0, 90.0, DT)
+    for _ in range(20):
+        planner.advance(planner.enabled)
+    velocity = planner.current_velocity(0)
+    assert velocity > 0
+    planner.plan(0, float(planner.positions[0, 19]), 0.0, DT)
+    # Reversing starts from the velocity it had, not from rest
+    assert planner.velocities[0, 0] == pytest.approx(velocity - 360.0 * DT)
+
+
+def test_configure_rejects_bad_limits():
+    planner = TrajectoryPlanner(num_channels=1)
+    with pytest.raises(ValueError):
+        planner.configure(0, 90.0, 360.0, profile='cubic')
+    with pytest.raises(ValueError):
+        planner.configure(0, 0.0, 360.0)